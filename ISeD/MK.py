@@ -7,42 +7,51 @@ Vključeno:
 - Dialog + Dock (GURS, Urejanje grafike, Simbologija, Izvoz)
 - Prenesi parcele GURS (standard)
 - Prenesi stavbe GURS
-- Izdelava praznega ISeD sloja, edit_type
-- Kopiranje izbranih parcel/stavb v ISeD
+- Lokalna kopija slojev GURS (GeoPackage z indeksi)
+- Izdelava praznega ISeD sloja (GeoPackage z dnevnikom ali memory), edit_type
+- Kopiranje izbranih parcel/stavb v ISeD (z izvorom parcel in preverjanjem sprememb)
+- Sloji v različnih CRS (D96/TM, D48/GK, WGS84) se pretvorijo v CRS sloja ISeD
 - Union, Buffer, obrezovanje vplivnega območja
 - Izbor/obrezovanje cone VOD
 - Simbologija ISeD/OPN_PNRP_OZN
+- Kontrola topologije pred izvozom (prekrivanja, vrzeli, drobci, veljavnost)
+- Poenostavitev oglišč z ohranjanjem skupnih mej (urejanje in izvoz)
 - Izvoz v SHP + ZIP
+- Poročilo o pokritih parcelah (CSV/XLSX, tabela)
 - Uvoz WMS
+- Processing ponudnik ISeD (processing_provider.py, algorithms.py)
 """
 
 import os
-import zipfile
-import requests
-import xml.etree.ElementTree as ET
-import urllib.parse
+import time
 
-# QGIS
+_IMPORT_START = time.perf_counter()
+
+# QGIS (mreža, XML, ZIP in izvoz se uvozijo šele ob prvi uporabi orodja)
 from qgis.core import (
-    QgsProject, QgsVectorLayer, QgsRasterLayer,
-    QgsPrintLayout, QgsLayoutItemMap, QgsReadWriteContext,
-    QgsVectorFileWriter, QgsField, QgsFeature,
-    QgsGeometry, QgsFields
+    QgsProject, QgsVectorLayer, QgsField, QgsFields,
+    QgsMessageLog, Qgis, QgsApplication, QgsWkbTypes
 )
 from qgis.utils import iface
 
 # PyQt
-from qgis.PyQt.QtCore import QVariant, Qt, QSize, QRect, QPoint
-from qgis.PyQt.QtGui import QIcon, QPixmap, QPainter, QImage, QColor
-from qgis.PyQt.QtSvg import QSvgRenderer
+from qgis.PyQt.QtCore import QVariant, Qt, QSize, QRect, QPoint, QTimer, QCoreApplication
+from qgis.PyQt.QtGui import QIcon, QPixmap
 from qgis.PyQt.QtWidgets import (
     QAction, QInputDialog, QFileDialog, QMessageBox,
     QProgressDialog, QDialog, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QGroupBox, QLayout, QStyle,
     QSizePolicy, QSpacerItem, QDockWidget, QWidget, QScrollArea,
-    QRadioButton, QLineEdit, QTextEdit, QFormLayout, QComboBox
+    QRadioButton, QLineEdit, QTextEdit, QFormLayout, QComboBox,
+    QPlainTextEdit, QCheckBox
 )
 
+# moduli orodij (core, styles, gurs, local_store, provenance ...) se uvozijo ob prvi uporabi
+from . import icons
+from . import tools
+
+_IMPORT_TIME = time.perf_counter() - _IMPORT_START
+
 # ---------------- FlowLayout ----------------
 class FlowLayout(QLayout):
     """Postavitev, ki razporedi gumbe v tok (kot besede v vrstici)."""
@@ -116,6 +125,13 @@ class FlowLayout(QLayout):
             lineHeight = max(lineHeight, item.sizeHint().height())
         return y + lineHeight - rect.y() + bottom
 
+
+STORAGE_OPTIONS = [
+    "GeoPackage (trajno, z dnevnikom sprememb)",
+    "Začasni sloj (memory)",
+]
+
+
 # ---------------- Glavni razred vtičnika ----------------
 class MK:
     def __init__(self, iface_):
@@ -123,12 +139,23 @@ class MK:
         self.action = None
         self.dock = None
         self._icons_dir = os.path.join(os.path.dirname(__file__), 'Resources', 'icons')
+        self._startup_times = {'import': _IMPORT_TIME}
+        self._panel = None
+        self._dialog = None
+        self._metrics_dock = None
+        self._metrics_text = None
+        self.provider = None
+        self._check_task = None
+        self._qa_task = None
+        self._snap_warmer = None
+        self._journals = {}
 
     def _resources(self, *parts):
         base_dir = os.path.dirname(__file__)
         return os.path.join(base_dir, 'Resources', *parts)
 
     def initGui(self):
+        t0 = time.perf_counter()
         # Ikona za toolbar - okrogla verzija
         icon_path = os.path.join(os.path.dirname(__file__), 'Resources', 'ised_logo_round.png')
         if os.path.exists(icon_path):
@@ -139,49 +166,67 @@ class MK:
         self.action.triggered.connect(self.toggle_dock)
         self.iface.addPluginToMenu("&ISeD", self.action)
         self.iface.addToolBarIcon(self.action)
+        self.initProcessing()
+        project = QgsProject.instance()
+        project.layersAdded.connect(self._on_layers_added)
+        project.layersWillBeRemoved.connect(self._on_layers_will_be_removed)
+        project.transformContextChanged.connect(self._on_transform_context_changed)
+        self._startup_times['initGui'] = time.perf_counter() - t0
+        # dock zgradimo šele, ko je glavno okno QGIS pripravljeno in prosto
+        try:
+            self.iface.initializationCompleted.connect(self._schedule_dock_prebuild)
+        except Exception:
+            pass
+        self._schedule_dock_prebuild()
+
+    def initProcessing(self):
+        from .processing_provider import IsedProvider
+        self.provider = IsedProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
+    def _on_transform_context_changed(self):
+        from . import core
+        core.clear_transforms()
+
+    def _schedule_dock_prebuild(self):
+        QTimer.singleShot(0, self._prebuild_dock)
+
+    def _prebuild_dock(self):
+        if self.dock is not None or self.action is None:
+            return
+        try:
+            mw = self.iface.mainWindow()
+            if mw is None or not mw.isVisible():
+                return
+        except Exception:
+            return
+        t0 = time.perf_counter()
+        self.create_dock_widget()
+        self.dock.hide()
+        self._startup_times['dock'] = time.perf_counter() - t0
+        self._log_startup_report()
+
+    def _log_startup_report(self):
+        parts = []
+        for key in ('import', 'initGui', 'dock'):
+            if key in self._startup_times:
+                parts.append(key + "=" + "%.1f ms" % (self._startup_times[key] * 1000.0))
+        try:
+            QgsMessageLog.logMessage("Zagon vtičnika: " + ", ".join(parts), "ISeD", Qgis.Info)
+        except Exception:
+            pass
+        return parts
 
     def _set_button_icon(self, btn, name, fallback=QStyle.SP_FileIcon):
         icon_size = QSize(16, 16)
-        target_color = QColor('#143845')  # definiran, da ne povzroča napak
         try:
-            png_path = os.path.join(self._icons_dir, name + ".png")
-            if os.path.exists(png_path):
-                btn.setIcon(QIcon(png_path))
-                btn.setIconSize(icon_size)
-                return
-            svg_path = os.path.join(self._icons_dir, name + ".svg")
-            if os.path.exists(svg_path):
-                try:
-                    renderer = QSvgRenderer(svg_path)
-                    pix = QPixmap(icon_size)
-                    pix.fill(Qt.transparent)
-                    painter = QPainter(pix)
-                    renderer.render(painter)
-                    painter.end()
-                    img = pix.toImage().convertToFormat(QImage.Format_ARGB32)
-                    res = QImage(img.size(), QImage.Format_ARGB32)
-                    res.fill(Qt.transparent)
-                    h = img.height()
-                    w = img.width()
-                    for yy in range(h):
-                        for xx in range(w):
-                            col = img.pixelColor(xx, yy)
-                            a = col.alpha()
-                            if a > 0:
-                                c = QColor(target_color)
-                                c.setAlpha(a)
-                                res.setPixelColor(xx, yy, c)
-                    final_pix = QPixmap.fromImage(res)
-                    btn.setIcon(QIcon(final_pix))
-                    btn.setIconSize(icon_size)
-                    return
-                except Exception:
-                    btn.setIcon(QIcon(svg_path))
-                    btn.setIconSize(icon_size)
-                    return
-            ico_path = os.path.join(self._icons_dir, name + ".ico")
-            if os.path.exists(ico_path):
-                btn.setIcon(QIcon(ico_path))
+            ratio = self.iface.mainWindow().devicePixelRatioF()
+        except Exception:
+            ratio = None
+        try:
+            icon = icons.find_icon(self._icons_dir, name, icons.DEFAULT_COLOR, icon_size, ratio)
+            if icon is not None:
+                btn.setIcon(icon)
                 btn.setIconSize(icon_size)
                 return
         except Exception:
@@ -194,6 +239,48 @@ class MK:
             pass
 
     def unload(self):
+        try:
+            self.iface.initializationCompleted.disconnect(self._schedule_dock_prebuild)
+        except Exception:
+            pass
+        if self._panel is not None:
+            self._panel.disconnect_signals()
+            self._panel = None
+        if self._dialog is not None:
+            self._dialog.deleteLater()
+            self._dialog = None
+        if self._metrics_dock is not None:
+            from . import instrument
+            instrument.remove_listener(self._on_metrics_record)
+            self.iface.mainWindow().removeDockWidget(self._metrics_dock)
+            self._metrics_dock.deleteLater()
+            self._metrics_dock = None
+            self._metrics_text = None
+        self._stop_snapping()
+        project = QgsProject.instance()
+        for signal, slot in ((project.layersAdded, self._on_layers_added),
+                             (project.layersWillBeRemoved, self._on_layers_will_be_removed),
+                             (project.transformContextChanged, self._on_transform_context_changed)):
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        for journal in self._journals.values():
+            journal.stop()
+        self._journals = {}
+        for task in (self._check_task, self._qa_task):
+            if task is None:
+                continue
+            try:
+                task.on_done = None
+                task.cancel()
+            except Exception:
+                pass
+        self._check_task = None
+        self._qa_task = None
+        if self.provider is not None:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
         self.iface.removePluginMenu("&ISeD", self.action)
         self.iface.removeToolBarIcon(self.action)
         try:
@@ -208,7 +295,19 @@ class MK:
         self.toggle_dock()
 
     # ---------------- Dialog ----------------
+    def _tool_panel(self):
+        if self._panel is None:
+            self._panel = tools.ToolPanel(self)
+            self._panel.connect_signals()
+        return self._panel
+
     def show_tool_dialog(self):
+        if self._dialog is not None:
+            self._tool_panel().refresh()
+            self._dialog.exec_()
+            return
+
+        panel = self._tool_panel()
         dlg = QDialog(self.iface.mainWindow())
         dlg.setWindowTitle("ISeD orodja")
         dlg.setMinimumWidth(520)
@@ -225,99 +324,9 @@ class MK:
         help_link.setAlignment(Qt.AlignLeft)
         main_layout.addWidget(help_link)
 
-        # Group 1
-        gb1 = QGroupBox("Izdelava novega sloja ali dodajanje 'edit_type' obstoječemu")
-        gb1_layout = QHBoxLayout()
-        btn_create = QPushButton("Ustvari prazen sloj za ISeD")
-        btn_add_field = QPushButton("Dodaj polje 'edit_type' obstoječemu sloju")
-        self._set_button_icon(btn_create, 'create')
-        self._set_button_icon(btn_add_field, 'add_field')
-        gb1_layout.addWidget(btn_create)
-        gb1_layout.addWidget(btn_add_field)
-        gb1.setLayout(gb1_layout)
-        main_layout.addWidget(gb1)
-
-        # Group 2: GURS
-        gb2 = QGroupBox("GURS")
-        gb2_layout = QHBoxLayout()
-        btn_download = QPushButton("Prenesi aktualne parcele GURS")
-        btn_download_buildings = QPushButton("Prenesi aktualne stavbe GURS")
-        for b, n in [
-            (btn_download, 'download'),
-            (btn_download_buildings, 'download_buildings'),
-        ]:
-            self._set_button_icon(b, n)
-        gb2_layout.addWidget(btn_download)
-        gb2_layout.addWidget(btn_download_buildings)
-        gb2.setLayout(gb2_layout)
-        main_layout.addWidget(gb2)
-
-        # Import
-        btn_import = QPushButton("Uvozi GURS podlage")
-        btn_import.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self._set_button_icon(btn_import, 'import')
-        main_layout.addWidget(btn_import)
-
-        # Group 3: Urejanje grafike
-        gb3 = QGroupBox("Urejanje grafike")
-        
-        
-        main_gb3_layout = QVBoxLayout()
-
-        opis_label = QLabel("Za uporabo spodnjih orodij morate imeti izbran sloj ISeD")
-        opis_label.setWordWrap(True)
-        main_gb3_layout.addWidget(opis_label)
-
-
-        gb3_layout = FlowLayout()
-        btn_select_area = QPushButton("Izberi območje")
-        btn_select_area.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-        gb3_layout.addWidget(btn_select_area)
-        btn_copy = QPushButton("Kopiraj izbrane parcele v sloj ISeD in jih združi")
-        btn_copy_buildings = QPushButton("Kopiraj izbrane stavbe v sloj ISeD")
-        btn_clip = QPushButton("Obreži vplivno območje s spomenikom")
-        btn_edit_graphics = QPushButton("Uredi grafiko")
-        btn_select_vod = QPushButton("Izberi cono VOD")
-        btn_clip_vod = QPushButton("Obreži izbrano cono VOD")
-        btn_buffer = QPushButton("Dodaj buffer izbranemu poligonu v ISeD sloju")
-        btn_union = QPushButton("Združi izbrane poligone parcel brez prenosa")
-        for w, n in [
-            (btn_select_area,'select'),
-            (btn_copy,'copy'),
-            (btn_copy_buildings,'copy_buildings'),
-            (btn_clip,'clip'),
-            (btn_edit_graphics,'edit'),
-            (btn_select_vod,'select_vod'),
-            (btn_clip_vod,'clip_vod'),
-            (btn_buffer,'buffer'),
-            (btn_union,'union'),
-        ]:
-            w.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-            gb3_layout.addWidget(w)
-            self._set_button_icon(w, n)
-        gb3.setLayout(gb3_layout)
-        main_layout.addWidget(gb3)
-
-        # Group 4: simbologija
-        gb4 = QGroupBox("Simbologija slojev")
-        gb4_layout = QHBoxLayout()
-        btn_sym = QPushButton("Nastavi simbologijo ISeD")
-        btn_sym_opn = QPushButton("Nastavi simbologijo OPN_PNRP_OZN")
-        self._set_button_icon(btn_sym, 'sym')
-        self._set_button_icon(btn_sym_opn, 'sym_opn')
-        gb4_layout.addWidget(btn_sym)
-        gb4_layout.addWidget(btn_sym_opn)
-        gb4.setLayout(gb4_layout)
-        main_layout.addWidget(gb4)
-
-        # Group 5: izvoz
-        gb5 = QGroupBox("Izvoz v SHP in ZIP")
-        gb5_layout = QHBoxLayout()
-        btn_export = QPushButton("Izvozi v shapefile + zip")
-        self._set_button_icon(btn_export, 'export')
-        gb5_layout.addWidget(btn_export)
-        gb5.setLayout(gb5_layout)
-        main_layout.addWidget(gb5)
+        for group in (tools.GROUP_LAYER, tools.GROUP_GURS, tools.GROUP_IMPORT,
+                      tools.GROUP_EDIT, tools.GROUP_SYM, tools.GROUP_EXPORT, tools.GROUP_DIAG):
+            main_layout.addWidget(panel.group_widget(group))
 
         main_layout.addItem(QSpacerItem(20, 10, QSizePolicy.Minimum, QSizePolicy.Expanding))
 
@@ -327,32 +336,15 @@ class MK:
         main_layout.addWidget(close_btn)
 
         dlg.setLayout(main_layout)
-
-        # SIGNALI
-        btn_create.clicked.connect(self.create_empty_ised_layer)
-        btn_add_field.clicked.connect(self.add_edit_type_field)
-        btn_download.clicked.connect(self.download_parcels_from_gurs)
-        btn_download_buildings.clicked.connect(self.download_buildings_from_gurs)
-        btn_select_area.clicked.connect(self.activate_select_area_tool)
-        btn_copy.clicked.connect(self.copy_selected_parcels_to_ised)
-        btn_copy_buildings.clicked.connect(self.copy_selected_buildings_to_ised)
-        btn_clip.clicked.connect(self.clip_influence_area)
-        btn_edit_graphics.clicked.connect(self.start_edit_and_vertex_tool)
-        btn_select_vod.clicked.connect(self.select_vod_zone)
-        btn_clip_vod.clicked.connect(self.clip_selected_vod_zone)
-        btn_buffer.clicked.connect(self.add_buffer)
-        btn_union.clicked.connect(self.union_selected_geometries)
-        btn_sym.clicked.connect(self.apply_symbology)
-        btn_sym_opn.clicked.connect(self.apply_opn_symbology)
-        btn_export.clicked.connect(self.export_to_shp_zip)
-        btn_import.clicked.connect(self.import_from_wms)
-
+        self._dialog = dlg
         dlg.exec_()
 
     # ---------------- Dock ----------------
     def toggle_dock(self):
         if self.dock is None:
+            t0 = time.perf_counter()
             self.create_dock_widget()
+            self._startup_times['dock'] = time.perf_counter() - t0
         if self.dock.isVisible():
             self.dock.hide()
         else:
@@ -360,6 +352,7 @@ class MK:
 
     def create_dock_widget(self):
         mw = self.iface.mainWindow()
+        panel = self._tool_panel()
         self.dock = QDockWidget("ISeD orodja", mw)
         self.dock.setObjectName("MK_Tools_Dock")
         self.dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
@@ -391,97 +384,13 @@ class MK:
         help_link.setAlignment(Qt.AlignLeft)
         main_layout.addWidget(help_link)
 
-        # Group 1
-        gb1 = QGroupBox("Izdelava novega sloja ali dodajanje 'edit_type' obstoječemu")
-        gb1_layout = QHBoxLayout()
-        btn_create = QPushButton("Ustvari prazen sloj za ISeD")
-        btn_add_field = QPushButton("Dodaj polje 'edit_type' obstoječemu sloju")
-        gb1_layout.addWidget(btn_create)
-        gb1_layout.addWidget(btn_add_field)
-        gb1.setLayout(gb1_layout)
-        main_layout.addWidget(gb1)
-
-        # Group 2: GURS
-        gb2 = QGroupBox("GURS")
-        gb2_layout = QHBoxLayout()
-        btn_download = QPushButton("Prenesi aktualne parcele GURS")
-        btn_download_buildings = QPushButton("Prenesi aktualne stavbe GURS")
-        for b, n in [
-            (btn_download, 'download'),
-            (btn_download_buildings, 'download_buildings'),
-        ]:
-            self._set_button_icon(b, n)
-        gb2_layout.addWidget(btn_download)
-        gb2_layout.addWidget(btn_download_buildings)
-        gb2.setLayout(gb2_layout)
-        main_layout.addWidget(gb2)
-
-        # Group 3: Urejanje grafike
-        gb3 = QGroupBox("Urejanje grafike")
-        
-        main_gb3_layout = QVBoxLayout()
-        opis_label = QLabel("Za uporabo spodnjih orodij morate imeti izbran sloj ISeD")
-        opis_label.setWordWrap(True)
-        main_gb3_layout.addWidget(opis_label)
-        
-        gb3_layout = FlowLayout()
-        btn_select_area = QPushButton("Izberi območje")
-        btn_select_area.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-        gb3_layout.addWidget(btn_select_area)
-        btn_copy = QPushButton("Kopiraj izbrane parcele v sloj ISeD in jih združi")
-        btn_copy_buildings = QPushButton("Kopiraj izbrane stavbe v sloj ISeD")
-        btn_clip = QPushButton("Obreži vplivno območje s spomenikom")
-        btn_edit_graphics = QPushButton("Uredi grafiko")
-        btn_select_vod = QPushButton("Izberi cono VOD")
-        btn_clip_vod = QPushButton("Obreži izbrano cono VOD")
-        btn_buffer = QPushButton("Dodaj buffer izbranemu poligonu v ISeD sloju")
-        btn_union = QPushButton("Združi izbrane poligone parcel brez prenosa")
-        for w in [btn_copy, btn_copy_buildings, btn_clip, btn_edit_graphics, btn_select_vod, btn_clip_vod, btn_buffer, btn_union]:
-            w.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
-            gb3_layout.addWidget(w)
-        main_gb3_layout.addLayout(gb3_layout)
-        gb3.setLayout(main_gb3_layout)
-        main_layout.addWidget(gb3)
-        self._set_button_icon(btn_select_area, 'select')
-        for w, n in [
-            (btn_copy, 'copy'),
-            (btn_copy_buildings, 'copy_buildings'),
-            (btn_clip, 'clip'),
-            (btn_edit_graphics, 'edit'),
-            (btn_select_vod, 'select_vod'),
-            (btn_clip_vod, 'clip_vod'),
-            (btn_buffer, 'buffer'),
-            (btn_union, 'union'),
-        ]:
-            self._set_button_icon(w, n)
-
-        # Group 4: simbologija
-        gb4 = QGroupBox("Simbologija slojev")
-        gb4_layout = QHBoxLayout()
-        btn_sym = QPushButton("Nastavi simbologijo ISeD")
-        btn_sym_opn = QPushButton("Nastavi simbologijo OPN_PNRP_OZN")
-        self._set_button_icon(btn_sym, 'sym')
-        self._set_button_icon(btn_sym_opn, 'sym_opn')
-        gb4_layout.addWidget(btn_sym)
-        gb4_layout.addWidget(btn_sym_opn)
-        gb4.setLayout(gb4_layout)
-        main_layout.addWidget(gb4)
-
-        # Group 5: izvoz
-        gb5 = QGroupBox("Izvoz v SHP in ZIP")
-        gb5_layout = QHBoxLayout()
-        btn_export = QPushButton("Izvozi v shapefile + zip")
-        self._set_button_icon(btn_export, 'export')
-        gb5_layout.addWidget(btn_export)
-        gb5.setLayout(gb5_layout)
-        main_layout.addWidget(gb5)
+        for group in (tools.GROUP_LAYER, tools.GROUP_GURS, tools.GROUP_EDIT,
+                      tools.GROUP_SYM, tools.GROUP_EXPORT, tools.GROUP_DIAG):
+            main_layout.addWidget(panel.group_widget(group))
 
         main_layout.addItem(QSpacerItem(20, 10, QSizePolicy.Minimum, QSizePolicy.Expanding))
 
-        btn_import = QPushButton("Uvozi GURS podlage")
-        btn_import.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self._set_button_icon(btn_import, 'import')
-        main_layout.addWidget(btn_import)
+        main_layout.addWidget(panel.group_widget(tools.GROUP_IMPORT))
 
         hide_btn = QPushButton("Skrij panel")
         hide_btn.clicked.connect(self.dock.hide)
@@ -496,24 +405,44 @@ class MK:
         self.dock.setWidget(container)
         mw.addDockWidget(Qt.RightDockWidgetArea, self.dock)
 
-        # SIGNALI
-        btn_create.clicked.connect(self.create_empty_ised_layer)
-        btn_add_field.clicked.connect(self.add_edit_type_field)
-        btn_download.clicked.connect(self.download_parcels_from_gurs)
-        btn_download_buildings.clicked.connect(self.download_buildings_from_gurs)
-        btn_select_area.clicked.connect(self.activate_select_area_tool)
-        btn_copy.clicked.connect(self.copy_selected_parcels_to_ised)
-        btn_copy_buildings.clicked.connect(self.copy_selected_buildings_to_ised)
-        btn_clip.clicked.connect(self.clip_influence_area)
-        btn_edit_graphics.clicked.connect(self.start_edit_and_vertex_tool)
-        btn_select_vod.clicked.connect(self.select_vod_zone)
-        btn_clip_vod.clicked.connect(self.clip_selected_vod_zone)
-        btn_buffer.clicked.connect(self.add_buffer)
-        btn_union.clicked.connect(self.union_selected_geometries)
-        btn_sym.clicked.connect(self.apply_symbology)
-        btn_sym_opn.clicked.connect(self.apply_opn_symbology)
-        btn_export.clicked.connect(self.export_to_shp_zip)
-        btn_import.clicked.connect(self.import_from_wms)
+    # ---------------- Meritve ----------------
+    def show_metrics_log(self):
+        from . import instrument
+        if self._metrics_dock is None:
+            mw = self.iface.mainWindow()
+            self._metrics_dock = QDockWidget("ISeD meritve", mw)
+            self._metrics_dock.setObjectName("MK_Metrics_Dock")
+            widget = QWidget()
+            layout = QVBoxLayout()
+            self._metrics_text = QPlainTextEdit()
+            self._metrics_text.setReadOnly(True)
+            self._metrics_text.setMaximumBlockCount(2000)
+            layout.addWidget(self._metrics_text)
+            row = QHBoxLayout()
+            chk_profile = QCheckBox("cProfile za vsak zagon")
+            chk_profile.setChecked(instrument.profiling_enabled())
+            chk_profile.toggled.connect(instrument.set_profiling)
+            row.addWidget(chk_profile)
+            chk_memory = QCheckBox("Poraba pomnilnika (tracemalloc)")
+            chk_memory.setChecked(instrument.memory_tracing_enabled())
+            chk_memory.toggled.connect(instrument.set_memory_tracing)
+            row.addWidget(chk_memory)
+            row.addStretch(1)
+            lbl_dir = QLabel('<a href="file:///' + instrument.log_dir().replace('\\', '/') + '">JSON dnevnik</a>')
+            lbl_dir.setOpenExternalLinks(True)
+            row.addWidget(lbl_dir)
+            layout.addLayout(row)
+            widget.setLayout(layout)
+            self._metrics_dock.setWidget(widget)
+            mw.addDockWidget(Qt.BottomDockWidgetArea, self._metrics_dock)
+            instrument.add_listener(self._on_metrics_record)
+        self._metrics_dock.show()
+        self._metrics_dock.raise_()
+
+    def _on_metrics_record(self, record):
+        from . import instrument
+        if self._metrics_text is not None:
+            self._metrics_text.appendPlainText(instrument.format_record(record))
 
     # ---------------- Orodja ----------------
     def activate_select_area_tool(self):
@@ -530,6 +459,74 @@ class MK:
         except Exception as e:
             QMessageBox.warning(None, "ISeD orodja", "Ni bilo mogoče aktivirati orodja za izbiro: " + str(e))
 
+    # ---------------- Širjenje izbora po grafu sosednosti ----------------
+    def _parcel_graph(self):
+        from . import adjacency
+        from . import core
+        from . import local_store
+        layer = core.find_layer(QgsProject.instance(), name_part="parcele")
+        if layer is None:
+            QMessageBox.warning(None, "ISeD orodja", "Sloj parcel ni najden.")
+            return None, None
+        if layer.selectedFeatureCount() == 0:
+            QMessageBox.warning(None, "ISeD orodja", "Ni označenih parcel.")
+            return None, None
+        extent = None
+        if local_store.is_remote(layer):
+            # WFS sloj: graf le za obseg karte, sicer bi prenesli cel sloj
+            canvas = self.iface.mapCanvas()
+            extent = local_store.layer_extent(layer, canvas.extent(),
+                                              canvas.mapSettings().destinationCrs(), QgsProject.instance())
+        progress = QProgressDialog("Gradim graf sosednosti parcel...", "Prekliči", 0, 100, self.iface.mainWindow())
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        class _Feedback:
+            def isCanceled(self):
+                return progress.wasCanceled()
+
+            def setProgress(self, value):
+                progress.setValue(int(value))
+                QCoreApplication.processEvents()
+
+        try:
+            graph = adjacency.graph_for(layer, extent, _Feedback())
+        finally:
+            progress.close()
+        if progress.wasCanceled():
+            return None, None
+        return layer, graph
+
+    def _select_on_graph(self, layer, ids, label):
+        before = layer.selectedFeatureCount()
+        layer.selectByIds(list(ids))
+        self.iface.messageBar().pushMessage(
+            "ISeD", label + ": izbranih " + str(layer.selectedFeatureCount()) + " parcel (prej " + str(before) + ").",
+            Qgis.Info, 5)
+
+    def select_parcel_neighbours(self):
+        layer, graph = self._parcel_graph()
+        if graph is None:
+            return
+        ids = set(layer.selectedFeatureIds())
+        self._select_on_graph(layer, ids | graph.adjacent(ids), "Dodani sosedje")
+
+    def grow_parcel_selection(self):
+        layer, graph = self._parcel_graph()
+        if graph is None:
+            return
+        rings, ok = QInputDialog.getInt(None, "Razširi izbor", "Število obročev sosedov:", 2, 1, 50, 1)
+        if not ok:
+            return
+        self._select_on_graph(layer, graph.grow(layer.selectedFeatureIds(), rings), "Razširjen izbor")
+
+    def select_enclosed_parcels(self):
+        layer, graph = self._parcel_graph()
+        if graph is None:
+            return
+        ids = set(layer.selectedFeatureIds())
+        self._select_on_graph(layer, ids | graph.enclosed(ids), "Dodane zaprte parcele")
+
     def open_search_parcels_dialog(self):
         # poišči (ali naloži) GURS parcele WFS
         layer = self._find_parcels_layer()
@@ -666,23 +663,8 @@ class MK:
         return None
 
     def _detect_parcel_fields(self, layer):
-        names = [f.name() for f in layer.fields()]
-        low = [n.lower() for n in names]
-        ko_candidates = []
-        for i, n in enumerate(low):
-            if n in ('ko', 'ko_sifra', 'ko__sifra', 'ko_sifko'):
-                ko_candidates.append(names[i])
-            elif ('ko' in n) and ('sifra' in n or 'id' in n or n.endswith('_ko') or n.startswith('ko_')):
-                ko_candidates.append(names[i])
-        parc_candidates = []
-        for i, n in enumerate(low):
-            if n in ('parcela', 'st_parcele', 'stparcele', 'id_parcele'):
-                parc_candidates.append(names[i])
-            elif ('parcel' in n) or ('parc' in n) or ('st_parc' in n):
-                parc_candidates.append(names[i])
-        ko_field = ko_candidates[0] if ko_candidates else None
-        parc_field = parc_candidates[0] if parc_candidates else None
-        return ko_field, parc_field
+        from . import core
+        return core.detect_parcel_fields(layer)
 
     def _ask_fields(self, layer, ko_default=None, parc_default=None):
         dlg = QDialog(self.iface.mainWindow())
@@ -713,50 +695,8 @@ class MK:
         return None, None
 
     def _select_parcels_by_pairs(self, layer, ko_field, parc_field, pairs):
-        # grupiraj
-        from collections import defaultdict
-        grouped = defaultdict(list)
-        for ko, p in pairs:
-            grouped[str(ko)].append(str(p))
-
-        clauses = []
-        CHUNK = 500
-        for ko_val, plist in grouped.items():
-            for i in range(0, len(plist), CHUNK):
-                chunk = plist[i:i + CHUNK]
-                # zgradi varno seznam vrednosti, brez problematičnih escape-ov v f-string
-                vals = []
-                for v in chunk:
-                    vals.append("'" + v.replace("'", "''") + "'")
-                values = ",".join(vals)
-                clause = "(" + "\"" + ko_field + "\"" + " = " + str(ko_val) + " AND " + "\"" + parc_field + "\"" + " IN (" + values + "))"
-                clauses.append(clause)
-
-        if not clauses:
-            layer.removeSelection()
-            return 0
-
-        expr = " OR ".join(clauses)
-        try:
-            layer.selectByExpression(expr)
-        except Exception as e:
-            layer.removeSelection()
-            target = set((str(ko), str(p)) for ko, p in pairs)
-            idx_ko = layer.fields().indexOf(ko_field)
-            idx_parc = layer.fields().indexOf(parc_field)
-            if idx_ko < 0 or idx_parc < 0:
-                raise e
-            ids = []
-            for feat in layer.getFeatures():
-                try:
-                    ko_val = str(feat.attribute(idx_ko))
-                    p_val = str(feat.attribute(idx_parc))
-                    if (ko_val, p_val) in target:
-                        ids.append(feat.id())
-                except Exception:
-                    continue
-            layer.selectByIds(ids)
-        return layer.selectedFeatureCount()
+        from . import core
+        return core.select_parcels_by_pairs(layer, ko_field, parc_field, pairs)
 
     def select_vod_zone(self):
         layer = self.get_active_layer()
@@ -783,33 +723,22 @@ class MK:
         canvas.setMapTool(tool)
 
     def clip_selected_vod_zone(self):
+        from . import core
         layer = self.get_active_layer()
         if not layer:
             return
-        selected = layer.selectedFeatures()
-        if not selected or len(selected) != 1:
+        if layer.selectedFeatureCount() != 1:
             QMessageBox.warning(None, "ISeD orodja", "Izberite natanko en poligon cone VOD.")
             return
-        base_feat = selected[0]
-        base_geom = base_feat.geometry()
-        new_geoms = {}
-        for feat in layer.getFeatures():
-            if feat.id() == base_feat.id():
-                continue
-            geom = feat.geometry()
-            if geom.intersects(base_geom):
-                clipped = geom.difference(base_geom)
-                if not clipped.isEmpty():
-                    new_geoms[feat.id()] = clipped
-        if not new_geoms:
+        edits = core.clip_vod(layer, core.first_selected(layer, core.geometry_request()))
+        if edits.is_empty():
             QMessageBox.information(None, "ISeD orodja", "Ni poligonov za obrezovanje.")
             return
         layer.startEditing()
-        layer.dataProvider().changeGeometryValues(new_geoms)
+        edits.apply(layer, use_provider=True)
         layer.commitChanges()
-        layer.updateExtents()
         layer.triggerRepaint()
-        QMessageBox.information(None, "ISeD orodja", "Obrezanih je bilo " + str(len(new_geoms)) + " poligonov.")
+        QMessageBox.information(None, "ISeD orodja", "Obrezanih je bilo " + str(len(edits.changed)) + " poligonov.")
 
     def start_edit_and_vertex_tool(self):
         layer = self.get_active_layer()
@@ -821,6 +750,7 @@ class MK:
         except Exception as e:
             QMessageBox.critical(None, "ISeD orodja", "Napaka pri zagonu urejanja sloja:\n" + str(e))
             return
+        self._start_snapping(layer)
         try:
             if hasattr(self.iface, 'actionVertexTool') and callable(getattr(self.iface, 'actionVertexTool')):
                 self.iface.actionVertexTool().trigger()
@@ -833,6 +763,29 @@ class MK:
         except Exception:
             QMessageBox.information(None, "ISeD orodja", "Urejanje je aktivirano. Ne morem avtomatsko aktivirati Vertex orodja.")
 
+    def _start_snapping(self, layer):
+        """Pripenjanje na parcele/stavbe in vnaprej zgrajeni indeksi za območje urejanja."""
+        from . import snapping
+        if not isinstance(layer, QgsVectorLayer):
+            return
+        self._stop_snapping()
+        project = QgsProject.instance()
+        configs = None
+        try:
+            layers = snapping.snap_layers(project, layer)
+            configs = snapping.configure(project, layers)
+            self._snap_warmer = snapping.SnapWarmer(self.iface.mapCanvas(), layer, layers, project, configs)
+            self._snap_warmer.start()
+        except Exception as e:
+            if configs is not None:
+                snapping.restore(project, *configs)
+            QgsMessageLog.logMessage("Pripenjanje ni nastavljeno: " + str(e), "ISeD", Qgis.Warning)
+
+    def _stop_snapping(self):
+        if self._snap_warmer is not None:
+            self._snap_warmer.stop()
+            self._snap_warmer = None
+
     def get_active_layer(self):
         layer = self.iface.activeLayer()
         if not layer:
@@ -852,38 +805,68 @@ class MK:
         QMessageBox.information(None, "ISeD orodja", "Polje 'edit_type' je bilo dodano v sloj.")
 
     def apply_symbology(self):
+        from . import styles
         layer = self.get_active_layer()
         if not layer:
             return
-        qml_path = os.path.join(os.path.dirname(__file__), 'Resources', 'ised.qml')
-        if os.path.exists(qml_path):
-            result = layer.loadNamedStyle(qml_path)
-            ok = bool(result[0]) if isinstance(result, tuple) and len(result) >= 1 else bool(result)
-            if not ok and not (isinstance(result, tuple) and any((isinstance(r, bool) and r) or (not isinstance(r, bool) and r) for r in result)):
-                QMessageBox.critical(None, "ISeD orodja", "Napaka pri nalaganju simbologije iz " + qml_path)
-                return
-            layer.triggerRepaint()
-            QMessageBox.information(None, "ISeD orodja", "Simbologija ISeD je bila aplicirana.")
+        if not os.path.exists(styles.resource_path(styles.ISED_QML)):
+            QMessageBox.information(None, "ISeD orodja", "Datoteka 'Resources/ised.qml' ni bila najdena; preskočeno.")
             return
-        QMessageBox.information(None, "ISeD orodja", "Datoteka 'Resources/ised.qml' ni bila najdena; preskočeno.")
+        ok, msg = styles.apply_style(layer, styles.ISED_QML)
+        if not ok:
+            QMessageBox.critical(None, "ISeD orodja", "Napaka pri nalaganju simbologije iz " + styles.resource_path(styles.ISED_QML))
+            return
+        layer.triggerRepaint()
+        QMessageBox.information(None, "ISeD orodja", "Simbologija ISeD je bila aplicirana.")
 
     def apply_opn_symbology(self):
+        from . import styles
         layer = self.get_active_layer()
         if not layer:
             return
-        qml_path = os.path.join(os.path.dirname(__file__), 'Resources', 'OPN_PNRP_OZN.qml')
-        if os.path.exists(qml_path):
-            result = layer.loadNamedStyle(qml_path)
-            ok = bool(result[0]) if isinstance(result, tuple) and len(result) >= 1 else bool(result)
-            if not ok and not (isinstance(result, tuple) and any((isinstance(r, bool) and r) or (not isinstance(r, bool) and r) for r in result)):
-                QMessageBox.critical(None, "ISeD orodja", "Napaka pri nalaganju simbologije iz " + qml_path)
-                return
-            layer.triggerRepaint()
-            QMessageBox.information(None, "ISeD orodja", "Simbologija OPN_PNRP_OZN je bila aplicirana.")
+        if not os.path.exists(styles.resource_path(styles.OPN_QML)):
+            QMessageBox.warning(None, "ISeD orodja", "Datoteka 'Resources/OPN_PNRP_OZN.qml' ni bila najdena.")
+            return
+        options = [
+            "Polna simbologija",
+            "Poenostavljeno pri manjših merilih (hitrejši izris)",
+            "Poenostavljeno pri manjših merilih + poenostavljanje geometrij",
+        ]
+        choice, ok = QInputDialog.getItem(None, "Simbologija OPN_PNRP_OZN", "Način izrisa:", options, 0, False)
+        if not ok:
+            return
+        idx = options.index(choice)
+        ok, msg = styles.apply_opn_style(layer, scale_dependent=idx >= 1, simplify=idx == 2)
+        if not ok:
+            QMessageBox.critical(None, "ISeD orodja", "Napaka pri nalaganju simbologije iz " + styles.resource_path(styles.OPN_QML))
             return
-        QMessageBox.warning(None, "ISeD orodja", "Datoteka 'Resources/OPN_PNRP_OZN.qml' ni bila najdena.")
+        layer.triggerRepaint()
+        QMessageBox.information(None, "ISeD orodja", "Simbologija OPN_PNRP_OZN je bila aplicirana.")
+
+    def apply_symbology_to_matching_layers(self):
+        from . import styles
+        matches = styles.matching_layers()
+        if not matches:
+            QMessageBox.information(None, "ISeD orodja", "V projektu ni slojev, ki bi jim ustrezala simbologija ISeD, OPN_PNRP_OZN ali parcel.")
+            return
+        done = 0
+        failed = []
+        for lyr, qml in matches:
+            ok, msg = styles.apply_style(lyr, qml)
+            if ok:
+                lyr.triggerRepaint()
+                done += 1
+            else:
+                failed.append(lyr.name())
+        text = "Simbologija je bila aplicirana na " + str(done) + " slojev."
+        if failed:
+            text += "\nNi uspelo za: " + ", ".join(failed)
+        QMessageBox.information(None, "ISeD orodja", text)
 
     def download_parcels_from_gurs(self):
+        from . import gurs
+        from . import local_store
+        from . import styles
         canvas = iface.mapCanvas()
         scale = canvas.scale()
         if scale > 10000:
@@ -894,25 +877,20 @@ class MK:
         progress.setMinimumDuration(0)
         progress.setValue(0)
         progress.show()
-        uri = (
-            "pagingEnabled='true' "
-            "restrictToRequestBBOX='1' "
-            "srsname='EPSG:3794' "
-            "typename='SI.GURS.KN:PARCELE' "
-            "url='https://ipi.eprostor.gov.si/wfs-si-gurs-kn/wfs' "
-            "version='auto'"
-        )
+        uri = gurs.wfs_uri(gurs.PARCELS_TYPENAME)
         layer = QgsVectorLayer(uri, "Parcele (GURS WFS)", "WFS")
+        if layer.isValid():
+            # zapise za obseg karte prenesemo tu (meritev), izris jih vzame iz predpomnilnika
+            local_store.prefetch(layer, canvas.extent(), canvas.mapSettings().destinationCrs())
         progress.close()
         if not layer.isValid():
             QMessageBox.critical(None, "ISeD orodja", "Napaka pri nalaganju parcel iz GURS WFS.")
             return
-        qml_path = self._resources('parcele.qml')
+        qml_path = self._resources(styles.PARCELS_QML)
         if os.path.exists(qml_path):
             try:
-                result = layer.loadNamedStyle(qml_path)
-                ok = bool(result[0]) if isinstance(result, tuple) and len(result) >= 1 else bool(result)
-                if not ok and not (isinstance(result, tuple) and any((isinstance(r, bool) and r) or (not isinstance(r, bool) and r) for r in result)):
+                ok, msg = styles.apply_style(layer, styles.PARCELS_QML)
+                if not ok:
                     QMessageBox.warning(None, "ISeD orodja", "Slog iz 'parcele.qml' ni bil uporabljen.")
                 layer.triggerRepaint()
             except Exception as e:
@@ -920,9 +898,13 @@ class MK:
         layer.setMaximumScale(10000)
         layer.setMinimumScale(0)
         QgsProject.instance().addMapLayer(layer)
+        if local_store.auto_freeze_enabled():
+            self._freeze_layers([layer])
         QMessageBox.information(None, "ISeD orodja", "Parcele so bile naložene.")
 
     def download_buildings_from_gurs(self):
+        from . import gurs
+        from . import local_store
         canvas = iface.mapCanvas()
         scale = canvas.scale()
         if scale > 10000:
@@ -933,15 +915,11 @@ class MK:
         progress.setMinimumDuration(0)
         progress.setValue(0)
         progress.show()
-        uri = (
-            "pagingEnabled='true' "
-            "restrictToRequestBBOX='1' "
-            "srsname='EPSG:3794' "
-            "typename='SI.GURS.KN:STAVBE_OBRIS' "
-            "url='https://ipi.eprostor.gov.si/wfs-si-gurs-kn/wfs' "
-            "version='auto'"
-        )
+        uri = gurs.wfs_uri(gurs.BUILDINGS_TYPENAME)
         layer = QgsVectorLayer(uri, "Stavbe obris (GURS WFS)", "WFS")
+        if layer.isValid():
+            # zapise za obseg karte prenesemo tu (meritev), izris jih vzame iz predpomnilnika
+            local_store.prefetch(layer, canvas.extent(), canvas.mapSettings().destinationCrs())
         progress.close()
         if not layer.isValid():
             QMessageBox.critical(None, "ISeD orodja", "Napaka pri nalaganju stavb iz GURS WFS.")
@@ -949,29 +927,62 @@ class MK:
         layer.setMaximumScale(10000)
         layer.setMinimumScale(0)
         QgsProject.instance().addMapLayer(layer)
+        if local_store.auto_freeze_enabled():
+            self._freeze_layers([layer])
         QMessageBox.information(None, "ISeD orodja", "Stavbe so bile naložene.")
 
+    def freeze_gurs_layers(self):
+        from . import local_store
+        layers = local_store.remote_layers(QgsProject.instance())
+        if not layers:
+            QMessageBox.information(None, "ISeD orodja", "V projektu ni slojev GURS WFS.")
+            return
+        done = self._freeze_layers(layers)
+        if done:
+            QMessageBox.information(None, "ISeD orodja",
+                                    "Lokalno shranjeni sloji:\n" + "\n".join(lyr.name() for lyr in done))
+
+    def _freeze_layers(self, layers):
+        from . import core
+        from . import local_store
+        project = QgsProject.instance()
+        canvas = iface.mapCanvas()
+        extent = canvas.extent()
+        extent_crs = canvas.mapSettings().destinationCrs()
+        path = local_store.default_path(project)
+        progress = QProgressDialog("Shranjujem sloje GURS lokalno...", "Prekliči", 0, len(layers), self.iface.mainWindow())
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        done = []
+        try:
+            for i, layer in enumerate(layers):
+                if progress.wasCanceled():
+                    break
+                progress.setLabelText("Shranjujem " + layer.name() + "...")
+                progress.setValue(i)
+                QCoreApplication.processEvents()
+                local = local_store.freeze_layer(layer, extent, extent_crs, path, project)
+                done.append(local_store.swap_into_project(project, layer, local))
+        except core.IsedError as e:
+            QMessageBox.warning(None, "ISeD orodja", str(e))
+        finally:
+            progress.close()
+        return done
+
     def union_selected_geometries(self):
+        from . import core
         layer = self.get_active_layer()
         if not layer:
             return
-        selected = layer.selectedFeatures()
-        if not selected:
+        if layer.selectedFeatureCount() == 0:
             QMessageBox.warning(None, "ISeD orodja", "Ni označenih geometrij.")
             return
-        geoms = [f.geometry() for f in selected if f.hasGeometry()]
-        union_geom = QgsGeometry.unaryUnion(geoms)
-        if union_geom is None or union_geom.isEmpty():
-            QMessageBox.warning(None, "ISeD orodja", "Združitev ni uspela.")
+        try:
+            edits = core.union_features(layer, core.iter_selected(layer))
+        except core.IsedError as e:
+            QMessageBox.warning(None, "ISeD orodja", str(e))
             return
-        layer.startEditing()
-        ids_to_delete = [f.id() for f in selected]
-        layer.deleteFeatures(ids_to_delete)
-        feat = QgsFeature(layer.fields())
-        feat.setGeometry(union_geom)
-        layer.addFeature(feat)
-        layer.commitChanges()
-        layer.updateExtents()
+        edits.apply(layer)
         layer.triggerRepaint()
         QMessageBox.information(None, "ISeD orodja", "Označene geometrije so bile združene v en poligon.")
 
@@ -982,217 +993,547 @@ class MK:
         out_path, _ = QFileDialog.getSaveFileName(None, "Shrani shapefile kot", layer.name() + ".shp", "Shapefile (*.shp)")
         if not out_path:
             return
+        if isinstance(layer, QgsVectorLayer) and layer.geometryType() == QgsWkbTypes.PolygonGeometry:
+            # kontrola topologije v ozadju; izvoz po potrditvi
+            self._start_qa(layer, lambda task, ok: self._export_after_qa(layer, out_path, task, ok))
+            return
+        self._write_export(layer, out_path)
+
+    def _write_export(self, layer, out_path):
+        from . import simplify
+        from . import core
+        export_layer = layer
+        note = ""
+        tolerance = simplify.export_tolerance()
+        if tolerance > 0 and layer.geometryType() == QgsWkbTypes.PolygonGeometry:
+            # poenostavi kopijo, delovni sloj ostane nespremenjen
+            export_layer = core.memory_copy(layer)
+            result = simplify.simplify_layer(export_layer, tolerance)
+            result.edits.apply(export_layer, use_provider=True)
+            note = "\n" + result.describe()
         try:
-            result = QgsVectorFileWriter.writeAsVectorFormat(layer, out_path, "UTF-8", layer.crs(), "ESRI Shapefile")
-        except Exception as e:
-            QMessageBox.critical(None, "ISeD orodja", "Napaka pri izvozu shapefile:\n" + str(e))
-            return
-        if not os.path.exists(out_path):
-            QMessageBox.critical(None, "ISeD orodja", "Datoteka .shp ni nastala (izvoz ni uspel).")
-            return
-        shp_dir = os.path.dirname(out_path)
-        shp_base = os.path.splitext(os.path.basename(out_path))[0]
-        files_to_zip = []
-        for ext in ["shp", "shx", "dbf", "prj", "cpg"]:
-            f = os.path.join(shp_dir, shp_base + "." + ext)
-            if os.path.exists(f):
-                files_to_zip.append(f)
-        if not files_to_zip:
-            QMessageBox.warning(None, "ISeD orodja", "Ni izvoznih datotek za ZIP.")
-            return
-        zip_path = os.path.join(shp_dir, shp_base + ".zip")
+            zip_path = core.export_shp_zip(export_layer, out_path)
+        except core.IsedError as e:
+            QMessageBox.critical(None, "ISeD orodja", str(e))
+            return
+        QMessageBox.information(None, "ISeD orodja", "ZIP je ustvarjen: " + zip_path + note)
+
+    # ---------------- Kontrola topologije ----------------
+    def _start_qa(self, layer, on_done):
+        from . import qa
+        if self._qa_task is not None:
+            self.iface.messageBar().pushMessage("ISeD", "Kontrola topologije že poteka.", Qgis.Info, 5)
+            return False
+        from . import instrument
+        # meritev orodja se zaključi, ko se opravilo konča
+        self._qa_task = qa.QaTask(layer, on_done, instrument.handoff())
+        QgsApplication.taskManager().addTask(self._qa_task)
+        self.iface.messageBar().pushMessage(
+            "ISeD", "Kontrola topologije poteka v ozadju (prekličete jo v upravitelju opravil).", Qgis.Info, 5)
+        return True
+
+    def _qa_result(self, task, ok):
+        """Napake kontrole ali None, če je bila preklicana ali ni uspela."""
+        self._qa_task = None
+        if task.error:
+            QMessageBox.warning(None, "ISeD orodja", "Kontrola topologije ni uspela: " + task.error)
+            return None
+        if not ok or task.issues is None:
+            self.iface.messageBar().pushMessage("ISeD", "Kontrola topologije je preklicana.", Qgis.Info, 5)
+            return None
+        return task.issues
+
+    def _export_after_qa(self, layer, out_path, task, ok):
+        from . import qa
+        issues = self._qa_result(task, ok)
+        if issues is None:
+            return
+        if issues:
+            self._show_topology_errors(layer, issues)
+            answer = QMessageBox.question(
+                None, "ISeD orodja",
+                "Kontrola topologije je našla napake (" + qa.summary(issues) + ").\n"
+                "ISeD bo tak izvoz verjetno zavrnil. Vseeno izvozim?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                return
+        self._write_export(layer, out_path)
+
+    def _show_topology_errors(self, layer, issues):
+        from . import qa
+        project = QgsProject.instance()
+        for old in project.mapLayersByName(qa.ERROR_LAYER_NAME):
+            project.removeMapLayer(old.id())
+        errors = qa.error_layer(issues, layer.crs())
+        project.addMapLayer(errors)
+        return errors
+
+    def simplify_vertices(self):
+        from . import simplify
+        layer = self.get_active_layer()
+        if not layer:
+            return
+        tolerance, ok = QInputDialog.getDouble(
+            None, "Poenostavi oglišča", "Toleranca v metrih", simplify.DEFAULT_TOLERANCE, 0.01, 100.0, 2)
+        if not ok:
+            return
+        result = simplify.simplify_layer(layer, tolerance)
+        if result.edits.is_empty():
+            QMessageBox.information(None, "ISeD orodja", "Ni poligonov za poenostavitev.\n" + result.describe())
+            return
+        result.edits.apply(layer)
+        layer.triggerRepaint()
+        QMessageBox.information(None, "ISeD orodja", "Oglišča so poenostavljena.\n" + result.describe())
+
+    def check_topology(self):
+        layer = self.get_active_layer()
+        if not layer:
+            return
+        self._start_qa(layer, lambda task, ok: self._on_topology_checked(layer, task, ok))
+
+    def _on_topology_checked(self, layer, task, ok):
+        from . import qa
+        issues = self._qa_result(task, ok)
+        if issues is None:
+            return
+        if not issues:
+            QMessageBox.information(None, "ISeD orodja", "Kontrola topologije ni našla napak.")
+            return
+        self._show_topology_errors(layer, issues)
+        QMessageBox.warning(None, "ISeD orodja",
+                            "Najdene napake: " + qa.summary(issues) + ".\nPodrobnosti so v sloju '" + qa.ERROR_LAYER_NAME + "'.")
+
+    def fix_topology(self):
+        from . import qa
+        layer = self.get_active_layer()
+        if not layer:
+            return
+        edits = qa.fix_layer(layer)
+        if edits.is_empty():
+            QMessageBox.information(None, "ISeD orodja", "Ni drobcev ali neveljavnih geometrij za popravek.")
+            return
+        edits.apply(layer)
+        layer.triggerRepaint()
+        msg = "Popravljenih " + str(len(edits.changed)) + " poligonov."
+        # ponovna kontrola v ozadju
+        if not self._start_qa(layer, lambda task, ok: self._on_topology_fixed(layer, msg, task, ok)):
+            QMessageBox.information(None, "ISeD orodja", msg)
+
+    def _on_topology_fixed(self, layer, msg, task, ok):
+        from . import qa
+        remaining = self._qa_result(task, ok)
+        if remaining:
+            self._show_topology_errors(layer, remaining)
+            msg += "\nOstale napake: " + qa.summary(remaining)
+        QMessageBox.information(None, "ISeD orodja", msg)
+
+    def parcel_report(self):
+        from . import report
+        from . import core
+        layer = self.get_active_layer()
+        if not layer:
+            return
+        project = QgsProject.instance()
+        parcel_layer = core.find_layer(project, name_part="parcele")
+        if parcel_layer is None or parcel_layer.id() == layer.id():
+            QMessageBox.warning(None, "ISeD orodja", "Sloj parcel ni najden.")
+            return
+        out_path, _ = QFileDialog.getSaveFileName(
+            None, "Shrani poročilo parcel (prekliči za samo tabelo)", layer.name() + "_parcele.csv",
+            "CSV (*.csv);;Excel (*.xlsx)")
+        progress = QProgressDialog("Računam preseke s parcelami...", "Prekliči", 0, 100, self.iface.mainWindow())
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        class _Feedback:
+            def isCanceled(self):
+                return progress.wasCanceled()
+
+            def setProgress(self, value):
+                progress.setValue(int(value))
+                QCoreApplication.processEvents()
+
         try:
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-                for file_path in files_to_zip:
-                    zf.write(file_path, os.path.basename(file_path))
-        except Exception as e:
-            QMessageBox.critical(None, "ISeD orodja", "Napaka pri ZIP:\n" + str(e))
+            table = report.table_layer(report.overlap_rows(layer, parcel_layer, feedback=_Feedback()))
+            if progress.wasCanceled():
+                return
+            if out_path:
+                if out_path.lower().endswith(".xlsx"):
+                    report.write_xlsx(table, out_path)
+                else:
+                    report.write_csv(report.layer_rows(table), out_path)
+        except core.IsedError as e:
+            QMessageBox.warning(None, "ISeD orodja", str(e))
+            return
+        finally:
+            progress.close()
+        project.addMapLayer(table)
+        self.iface.showAttributeTable(table)
+        msg = "Poročilo: " + str(table.featureCount()) + " presekov s parcelami."
+        if out_path:
+            msg += "\nZapisano v: " + out_path
+        QMessageBox.information(None, "ISeD orodja", msg)
+
+    def print_monument_sheets(self):
+        from . import printing
+        layer = self.get_active_layer()
+        if not layer:
+            return
+        if "edit_type" not in [fld.name() for fld in layer.fields()]:
+            QMessageBox.warning(None, "ISeD orodja", "Sloj nima polja 'edit_type'.")
+            return
+        fids = printing.monument_ids(layer)
+        if not fids:
+            QMessageBox.warning(None, "ISeD orodja", "Ni poligonov z edit_type = 1 (spomenik).")
+            return
+        out_dir = QFileDialog.getExistingDirectory(None, "Mapa za liste spomenikov")
+        if not out_dir:
+            return
+        options = ["PDF", "PNG"]
+        choice, ok = QInputDialog.getItem(None, "Izpis listov", "Format:", options, 0, False)
+        if not ok:
             return
-        QMessageBox.information(None, "ISeD orodja", "ZIP je ustvarjen: " + zip_path)
+        fmt = printing.FORMAT_PNG if choice == "PNG" else printing.FORMAT_PDF
+
+        progress = QProgressDialog("Izrisujem liste spomenikov...", "Prekliči", 0, len(fids), self.iface.mainWindow())
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+
+        project = QgsProject.instance()
+        run = None
+        if project.fileName() and len(fids) > 1:
+            try:
+                run = printing.start_workers(project.fileName(), layer, fids, out_dir, fmt)
+            except Exception as e:
+                QgsMessageLog.logMessage("Vzporedni izris ni mogoč: " + str(e), "ISeD", Qgis.Warning)
+                run = None
+
+        def step(i, n):
+            progress.setValue(i)
+            QCoreApplication.processEvents()
+            return not progress.wasCanceled()
+
+        errors = []
+        if run is not None:
+            try:
+                written, todo, errors = self._wait_for_print_workers(run, progress, len(fids))
+            finally:
+                run.cleanup()
+        else:
+            written, todo = [], fids
+        if todo and not progress.wasCanceled():
+            # brez procesov ali po napaki procesa izrišemo v tem procesu
+            progress.setRange(0, len(todo))
+            written += printing.render_pages(project, layer, todo, out_dir, fmt, progress=step)
+        progress.close()
+        msg = "Izrisanih listov: " + str(len(written)) + "\nMapa: " + out_dir
+        if errors:
+            for text in errors:
+                QgsMessageLog.logMessage(text, "ISeD", Qgis.Warning)
+            msg += "\n\nVzporedni izris ni uspel (" + str(len(errors)) + " procesov), " \
+                   "listi so izrisani v QGIS. Napaka:\n" + errors[0][-1000:]
+        QMessageBox.information(None, "ISeD orodja", msg)
+
+    def _wait_for_print_workers(self, run, progress, total):
+        """Počaka procese; vrne (izrisane datoteke, spomeniki za ponovni izris, napake)."""
+        while run.running():
+            QCoreApplication.processEvents()
+            if progress.wasCanceled():
+                run.kill()
+                break
+            progress.setValue(min(total, len(run.written())))
+            time.sleep(0.1)
+        todo = []
+        errors = []
+        if not progress.wasCanceled():
+            for worker in run.failed():
+                # dokončane strani ostanejo, ponovno izrišemo le manjkajoče
+                todo.extend(worker.remaining())
+                errors.append("Izhodna koda " + str(worker.proc.returncode) + ": "
+                              + (worker.errors() or "brez izpisa"))
+        # tudi po preklicu štejemo vse dokončane strani, ki so na disku
+        written = run.written()
+        return written, todo, errors
 
     def create_empty_ised_layer(self):
-        fields = QgsFields()
-        fields.append(QgsField("edit_type", QVariant.Int))
-        layer = QgsVectorLayer("Polygon?crs=EPSG:3794", "priprava_grafike_za_ISeD", "memory")
-        pr = layer.dataProvider()
-        pr.addAttributes(fields)
-        layer.updateFields()
+        from . import core
+        from . import styles
+        storage, ok = QInputDialog.getItem(None, "Nov sloj ISeD", "Shranjevanje sloja:", STORAGE_OPTIONS, 0, False)
+        if not ok:
+            return
+        crs = core.ised_crs(QgsProject.instance())
+        if storage == STORAGE_OPTIONS[0]:
+            from . import workspace
+            path, _ = QFileDialog.getSaveFileName(None, "Shrani delovni sloj ISeD", core.ISED_LAYER_NAME + ".gpkg",
+                                                  "GeoPackage (*.gpkg)")
+            if not path:
+                return
+            if not path.lower().endswith(".gpkg"):
+                path += ".gpkg"
+            try:
+                layer = workspace.create(path, crs=core.crs_uri(crs))
+            except core.IsedError as e:
+                QMessageBox.critical(None, "ISeD orodja", str(e))
+                return
+        else:
+            fields = QgsFields()
+            fields.append(QgsField("edit_type", QVariant.Int))
+            layer = QgsVectorLayer("Polygon?crs=" + core.crs_uri(crs), core.ISED_LAYER_NAME, "memory")
+            pr = layer.dataProvider()
+            pr.addAttributes(fields)
+            layer.updateFields()
         QgsProject.instance().addMapLayer(layer)
-        qml_path = os.path.join(os.path.dirname(__file__), 'Resources', 'ised.qml')
-        if os.path.exists(qml_path):
-            result = layer.loadNamedStyle(qml_path)
-            ok = bool(result[0]) if isinstance(result, tuple) and len(result) >= 1 else bool(result)
-            if ok or (isinstance(result, tuple) and any((isinstance(r, bool) and r) or (not isinstance(r, bool) and r) for r in result)):
+        if os.path.exists(styles.resource_path(styles.ISED_QML)):
+            ok, msg = styles.apply_style(layer, styles.ISED_QML)
+            if ok:
                 layer.triggerRepaint()
                 QMessageBox.information(None, "ISeD orodja", "Ustvarjen sloj in uporabljena simbologija ISeD.")
                 return
         QMessageBox.information(None, "ISeD orodja", "Ustvarjen sloj 'priprava_grafike_za_ISeD'.")
 
+    # ---------------- Dnevnik delovnega sloja (GeoPackage) ----------------
+    def _on_layers_added(self, layers):
+        for layer in layers:
+            if isinstance(layer, QgsVectorLayer) and layer.providerType() == "ogr" \
+                    and layer.source().split("|")[0].lower().endswith(".gpkg"):
+                self._attach_journal(layer)
+
+    def _attach_journal(self, layer):
+        from . import workspace
+        if layer.id() in self._journals or not workspace.is_workspace(layer):
+            return
+        path = workspace.layer_path(layer)
+        try:
+            records = workspace.pending(path)
+            if not records:
+                workspace.compact(path)
+            journal = workspace.Journal(layer).start()
+        except Exception as e:
+            QgsMessageLog.logMessage("Dnevnik sloja ni na voljo: " + str(e), "ISeD", Qgis.Warning)
+            return
+        self._journals[layer.id()] = journal
+        if not records:
+            return
+        answer = QMessageBox.question(
+            None, "ISeD orodja",
+            "Sloj '" + layer.name() + "' ima " + str(len(records)) + " neshranjenih sprememb "
+            "iz prejšnje seje. Jih obnovim v urejanje?",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        journal.checkpoint()
+        if answer == QMessageBox.Yes:
+            count = workspace.replay(layer, records)
+            self.iface.messageBar().pushMessage(
+                "ISeD", "Obnovljenih " + str(count) + " sprememb; shranite urejanje sloja.", Qgis.Info, 10)
+
+    def _on_layers_will_be_removed(self, layer_ids):
+        for layer_id in layer_ids:
+            journal = self._journals.pop(layer_id, None)
+            if journal is not None:
+                journal.stop()
+
     def copy_selected_buildings_to_ised(self):
-        buildings_layer = None
-        for lyr in QgsProject.instance().mapLayers().values():
-            if "stavbe" in lyr.name().lower():
-                buildings_layer = lyr
-                break
-        if not buildings_layer:
+        from . import core
+        project = QgsProject.instance()
+        src_layer = core.find_layer(project, name_part="stavbe")
+        if not src_layer:
             QMessageBox.warning(None, "ISeD orodja", "Sloj stavb ni najden.")
             return
-        selected = buildings_layer.selectedFeatures()
-        if not selected:
+        if src_layer.selectedFeatureCount() == 0:
             QMessageBox.warning(None, "ISeD orodja", "Ni označenih stavb.")
             return
-        geoms = [f.geometry() for f in selected if f.hasGeometry()]
-        union_geom = QgsGeometry.unaryUnion(geoms)
-        if union_geom is None or union_geom.isEmpty():
-            QMessageBox.warning(None, "ISeD orodja", "Združitev stavb ni uspela.")
-            return
-        ised_layer = None
-        for lyr in QgsProject.instance().mapLayers().values():
-            if lyr.name() == "priprava_grafike_za_ISeD":
-                ised_layer = lyr
-                break
+        ised_layer = core.find_layer(project, exact=core.ISED_LAYER_NAME)
         if not ised_layer:
             QMessageBox.warning(None, "ISeD orodja", "Sloj 'priprava_grafike_za_ISeD' ne obstaja.")
             return
-        options = [
-            "1 - spomenik",
-            "2 - podobmočje spomenika",
-            "3 - vplivno območje",
-            "4 - podobmočje vplivnega območja",
-            "osnovno območje RNPD",
-            "cona VOD"
-        ]
-        choice, ok = QInputDialog.getItem(None, "Izberi tip", "Dodaj v polje edit_type:", options, 0, False)
+        try:
+            request = core.reprojected_request(src_layer, ised_layer.crs(), core.geometry_request())
+            union_geom = core.clean_dissolve(core.iter_selected(src_layer, request), *core.dissolve_settings())
+        except core.IsedError:
+            QMessageBox.warning(None, "ISeD orodja", "Združitev stavb ni uspela.")
+            return
+        choice, ok = QInputDialog.getItem(None, "Izberi tip", "Dodaj v polje edit_type:", core.EDIT_TYPE_OPTIONS, 0, False)
         if not ok:
             return
-        edit_value = None
-        if choice[0].isdigit():
-            edit_value = int(choice.split(" ")[0])
-        if not ised_layer.isEditable():
-            ised_layer.startEditing()
-        feat = QgsFeature()
-        feat.setFields(ised_layer.fields())
-        feat.setGeometry(union_geom)
-        if edit_value is not None and "edit_type" in [f.name() for f in ised_layer.fields()]:
-            feat.setAttribute("edit_type", edit_value)
-        ised_layer.addFeature(feat)
-        ised_layer.commitChanges()
-        ised_layer.updateExtents()
+        edits = core.dissolve_to_ised([union_geom], ised_layer, core.edit_type_from_choice(choice))
+        edits = self._resolve_duplicates(ised_layer, edits, core.edit_type_from_choice(choice))
+        if edits is None:
+            return
+        edits.apply(ised_layer)
         ised_layer.triggerRepaint()
         QMessageBox.information(None, "ISeD orodja", "Stavbe kopirane v ISeD.")
 
     def copy_selected_parcels_to_ised(self):
-        parcel_layer = None
-        for lyr in QgsProject.instance().mapLayers().values():
-            if "parcele" in lyr.name().lower():
-                parcel_layer = lyr
-                break
-        if not parcel_layer:
+        from . import core
+        from . import provenance
+        project = QgsProject.instance()
+        src_layer = core.find_layer(project, name_part="parcele")
+        if not src_layer:
             QMessageBox.warning(None, "ISeD orodja", "Sloj parcel ni najden.")
             return
-        selected = parcel_layer.selectedFeatures()
-        if not selected:
+        if src_layer.selectedFeatureCount() == 0:
             QMessageBox.warning(None, "ISeD orodja", "Ni označenih parcel.")
             return
-        geoms = [f.geometry() for f in selected if f.hasGeometry()]
-        union_geom = QgsGeometry.unaryUnion(geoms)
-        if union_geom is None or union_geom.isEmpty():
-            QMessageBox.warning(None, "ISeD orodja", "Združitev parcel ni uspela.")
-            return
-        ised_layer = None
-        for lyr in QgsProject.instance().mapLayers().values():
-            if lyr.name() == "priprava_grafike_za_ISeD":
-                ised_layer = lyr
-                break
+        ised_layer = core.find_layer(project, exact=core.ISED_LAYER_NAME)
         if not ised_layer:
             QMessageBox.warning(None, "ISeD orodja", "Sloj 'priprava_grafike_za_ISeD' ne obstaja.")
             return
-        options = [
-            "1 - spomenik",
-            "2 - podobmočje spomenika",
-            "3 - vplivno območje",
-            "4 - podobmočje vplivnega območja",
-            "osnovno območje RNPD",
-            "cona VOD"
-        ]
-        choice, ok = QInputDialog.getItem(None, "Izberi tip", "Dodaj v polje edit_type:", options, 0, False)
+        sources = provenance.SourceCollector(src_layer)
+        try:
+            selected = core.iter_selected(src_layer, sources.request(src_layer))
+            # hashi virov se računajo v CRS GURS, unija v CRS sloja ISeD
+            parcels = core.to_crs(sources.collect(selected), src_layer.crs(), ised_layer.crs())
+            union_geom = core.clean_dissolve(parcels, *core.dissolve_settings())
+        except core.IsedError:
+            QMessageBox.warning(None, "ISeD orodja", "Združitev parcel ni uspela.")
+            return
+        choice, ok = QInputDialog.getItem(None, "Izberi tip", "Dodaj v polje edit_type:", core.EDIT_TYPE_OPTIONS, 0, False)
         if not ok:
             return
-        edit_value = None
-        if choice[0].isdigit():
-            edit_value = int(choice.split(" ")[0])
-        if not ised_layer.isEditable():
-            ised_layer.startEditing()
-        feat = QgsFeature()
-        feat.setFields(ised_layer.fields())
-        feat.setGeometry(union_geom)
-        if edit_value is not None and "edit_type" in [f.name() for f in ised_layer.fields()]:
-            feat.setAttribute("edit_type", edit_value)
-        ised_layer.addFeature(feat)
-        ised_layer.commitChanges()
-        ised_layer.updateExtents()
+        edits = core.dissolve_to_ised([union_geom], ised_layer, core.edit_type_from_choice(choice))
+        edits.added[0] = sources.apply(edits.added[0], ised_layer)
+        edits = self._resolve_duplicates(ised_layer, edits, core.edit_type_from_choice(choice))
+        if edits is None:
+            return
+        if sources.pairs and not provenance.has_fields(ised_layer):
+            # shemo spremenimo šele, ko je vnos potrjen
+            provenance.ensure_fields(ised_layer)
+            edits.added = [sources.apply(f, ised_layer) for f in edits.added]
+        edits.apply(ised_layer)
         ised_layer.triggerRepaint()
         QMessageBox.information(None, "ISeD orodja", "Parcele kopirane v ISeD.")
 
+    def _resolve_duplicates(self, ised_layer, edits, edit_type):
+        """Pred vnosom preveri dvojnike; vrne prilagojene spremembe ali None ob preklicu."""
+        from . import duplicates
+        matches = duplicates.find_matches(ised_layer, edits.added[0].geometry(), edit_type)
+        if not matches:
+            return edits
+        choice, ok = QInputDialog.getItem(
+            None, "Podvojen poligon",
+            "Poligon se ujema z obstoječimi zapisi:\n" + duplicates.describe(matches) + "\n\nKaj naredim?",
+            duplicates.actions_for(matches), 0, False)
+        if not ok:
+            return None
+        edits = duplicates.resolve(edits, matches, choice, ised_layer)
+        if edits.is_empty():
+            QMessageBox.information(None, "ISeD orodja", "Poligon ni bil dodan (že obstaja).")
+            return None
+        return edits
+
+    def check_parcel_changes(self):
+        from . import instrument
+        from . import provenance
+        layer = self.get_active_layer()
+        if not layer:
+            return
+        if not provenance.has_fields(layer):
+            QMessageBox.warning(None, "ISeD orodja", "Sloj nima podatkov o izvornih parcelah.")
+            return
+        if self._check_task is not None:
+            QMessageBox.information(None, "ISeD orodja", "Preverjanje že poteka.")
+            return
+        task = provenance.SourceCheckTask(layer, self._on_parcel_check_done)
+        if not task.records:
+            QMessageBox.information(None, "ISeD orodja", "Ni zapisov z izvornimi parcelami.")
+            return
+        # meritev orodja se zaključi, ko se opravilo konča
+        task.metrics = instrument.handoff()
+        self._check_task = task
+        QgsApplication.taskManager().addTask(task)
+        self.iface.messageBar().pushMessage("ISeD", "Preverjanje sprememb parcel poteka v ozadju.", Qgis.Info, 5)
+
+    def _on_parcel_check_done(self, task, flagged):
+        self._check_task = None
+        if task.error:
+            self.iface.messageBar().pushMessage("ISeD", "Preverjanje ni uspelo: " + task.error, Qgis.Warning, 10)
+        elif task.statuses is None:
+            return
+        elif flagged:
+            self.iface.messageBar().pushMessage(
+                "ISeD", "Spremenjene izvorne parcele pri " + str(len(flagged)) + " zapisih (izbrani, polje 'vir_stanje').",
+                Qgis.Warning, 0)
+        else:
+            self.iface.messageBar().pushMessage("ISeD", "Izvorne parcele so nespremenjene.", Qgis.Success, 5)
+
     def add_buffer(self):
+        from . import core
         layer = self.get_active_layer()
         if not layer:
             return
-        selected = layer.selectedFeatures()
-        if not selected:
+        if layer.selectedFeatureCount() == 0:
             QMessageBox.warning(None, "ISeD orodja", "Ni označenih geometrij.")
             return
         dist, ok = QInputDialog.getDouble(None, "Buffer", "Vnesi razdaljo v metrih", 10.0, 0.1, 10000.0, 1)
         if not ok:
             return
-        layer.startEditing()
-        for f in selected:
-            geom = f.geometry()
-            buf = geom.buffer(dist, 5)
-            layer.changeGeometry(f.id(), buf)
-        layer.commitChanges()
+        edits = core.buffer_features(core.iter_selected(layer), dist)
+        edits.apply(layer)
         layer.triggerRepaint()
         QMessageBox.information(None, "ISeD orodja", "Buffer dodan.")
 
     def clip_influence_area(self):
+        from . import core
         layer = self.get_active_layer()
         if not layer:
             return
-        if "edit_type" not in [fld.name() for fld in layer.fields()]:
-            QMessageBox.warning(None, "ISeD orodja", "Sloj nima polja 'edit_type'.")
+        try:
+            edits = core.clip_influence(layer)
+        except core.IsedError as e:
+            QMessageBox.warning(None, "ISeD orodja", str(e))
             return
-        feat3 = None
-        for f in layer.getFeatures():
-            if f.attribute("edit_type") == 3:
-                feat3 = f
-                break
-        if not feat3:
-            QMessageBox.warning(None, "ISeD orodja", "Ni poligona z edit_type = 3 (vplivno območje).")
+        edits.apply(layer, use_provider=True)
+        layer.triggerRepaint()
+        QMessageBox.information(None, "ISeD orodja", "Vplivno območje je obrezano.")
+
+    def generate_influence_area(self):
+        from . import core
+        layer = self.get_active_layer()
+        if not layer:
             return
-        feat1 = None
-        for f in layer.getFeatures():
-            if f.attribute("edit_type") == 1:
-                feat1 = f
-                break
-        if not feat1:
+        if not core.has_edit_type(layer):
+            QMessageBox.warning(None, "ISeD orodja", "Sloj nima polja 'edit_type'.")
+            return
+        monument = core.monument_feature(layer)
+        if monument is None:
             QMessageBox.warning(None, "ISeD orodja", "Ni poligona z edit_type = 1 (osnovno območje).")
             return
-        geom3 = feat3.geometry()
-        geom1 = feat1.geometry()
-        clipped = geom3.difference(geom1)
-        if clipped.isEmpty():
-            QMessageBox.warning(None, "ISeD orodja", "Rezultat obrezovanja je prazen.")
+        parcel_layer = core.find_layer(QgsProject.instance(), name_part="parcele")
+        if parcel_layer is None:
+            QMessageBox.warning(None, "ISeD orodja", "Sloj parcel ni najden.")
+            return
+        dist, ok = QInputDialog.getDouble(None, "Vplivno območje", "Razdalja od spomenika v metrih", 50.0, 0.1, 10000.0, 1)
+        if not ok:
+            return
+        share, ok = QInputDialog.getDouble(
+            None, "Vplivno območje", "Najmanjši pokriti delež parcele (%)",
+            core.INFLUENCE_MIN_SHARE * 100.0, 0.0, 100.0, 0)
+        if not ok:
             return
-        layer.dataProvider().changeGeometryValues({feat3.id(): clipped})
-        layer.updateExtents()
+        try:
+            influence, ids = core.parcel_influence_area(monument.geometry(), parcel_layer, dist, share / 100.0,
+                                                       crs=layer.crs())
+        except core.IsedError as e:
+            QMessageBox.warning(None, "ISeD orodja", str(e))
+            return
+        edits = core.EditSet()
+        edits.added.append(core.new_feature(layer, influence, core.EDIT_INFLUENCE))
+        edits.apply(layer)
+        parcel_layer.selectByIds(ids)
         layer.triggerRepaint()
-        QMessageBox.information(None, "ISeD orodja", "Vplivno območje je obrezano.")
+        QMessageBox.information(None, "ISeD orodja",
+                                "Vplivno območje je ustvarjeno iz " + str(len(ids)) + " parcel.")
 
     def import_from_wms(self):
-        wms_url = "https://ipi.eprostor.gov.si/wms-si-gurs-dts/wms"
+        from . import gurs
+        from . import instrument
+        import requests
+        import xml.etree.ElementTree as ET
+        from qgis.core import QgsRasterLayer
+        wms_url = gurs.wms_url()
         try:
             response = requests.get(wms_url + "?SERVICE=WMS&REQUEST=GetCapabilities&VERSION=1.1.1")
             response.raise_for_status()
+            instrument.record_network(len(response.content), response.elapsed.total_seconds())
         except Exception as e:
             QMessageBox.warning(None, "Napaka", "Ne morem pridobiti GetCapabilities:\n" + str(e))
             return
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – graf sosednosti parcel
+
+Graf se zgradi enkrat na sloj parcel (prostorski indeks + pripravljena
+geometrija; soseda sta parceli s skupnim delom meje, ne le z oglišči).
+Širjenje izbora (sosedje, N obročev, zaprte parcele) nato teče le po grafu,
+brez novih prostorskih poizvedb.
+"""
+
+from collections import deque
+
+from qgis.core import QgsGeometry, QgsFeatureRequest, QgsSpatialIndex, QgsWkbTypes
+
+from . import core
+from . import instrument
+
+MIN_SHARED_LENGTH = 0.01
+BORDER_TOLERANCE = 0.999
+
+# layer id -> ParcelGraph
+_graphs = {}
+_watched = set()
+
+
+class ParcelGraph:
+    """Sosednost parcel: fid -> množica fid sosedov; robne parcele posebej."""
+    def __init__(self, layer, extent=None, feedback=None):
+        self.layer_id = layer.id()
+        self.extent = extent
+        self.neighbours = {}
+        self.border = set()
+        self.feature_count = layer.featureCount()
+        self._build(layer, extent, feedback)
+
+    def _build(self, layer, extent, feedback):
+        request = core.geometry_request(QgsFeatureRequest())
+        if extent is not None:
+            request.setFilterRect(extent)
+        index = QgsSpatialIndex(QgsSpatialIndex.FlagStoreFeatureGeometries)
+        fids = []
+        for f in layer.getFeatures(request):
+            if f.hasGeometry():
+                index.addFeature(f)
+                fids.append(f.id())
+        instrument.count_features(len(fids))
+        shared = dict((fid, 0.0) for fid in fids)
+        for fid in fids:
+            self.neighbours[fid] = set()
+        for n, fid in enumerate(fids):
+            if feedback is not None:
+                if feedback.isCanceled():
+                    break
+                feedback.setProgress(100.0 * n / len(fids))
+            geom = index.geometry(fid)
+            instrument.count_geometry(geom)
+            engine = QgsGeometry.createGeometryEngine(geom.constGet())
+            engine.prepareGeometry()
+            for other in index.intersects(geom.boundingBox()):
+                # vsak par obdelamo enkrat
+                if other <= fid:
+                    continue
+                other_geom = index.geometry(other)
+                if not engine.intersects(other_geom.constGet()):
+                    continue
+                inter = QgsGeometry(engine.intersection(other_geom.constGet()))
+                gtype = inter.type()
+                if gtype == QgsWkbTypes.LineGeometry:
+                    length = inter.length()
+                elif gtype == QgsWkbTypes.PolygonGeometry:
+                    # majhna prekrivanja zaradi neujemanja koordinat GURS
+                    length = inter.length() / 2.0
+                else:
+                    continue
+                if length < MIN_SHARED_LENGTH:
+                    continue
+                self.neighbours[fid].add(other)
+                self.neighbours[other].add(fid)
+                shared[fid] += length
+                shared[other] += length
+        for fid in fids:
+            if shared[fid] < index.geometry(fid).length() * BORDER_TOLERANCE:
+                self.border.add(fid)
+
+    def is_current(self, layer):
+        return layer.id() == self.layer_id and layer.featureCount() == self.feature_count
+
+    def covers(self, ids):
+        return all(fid in self.neighbours for fid in ids)
+
+    # ---------------- Poizvedbe ----------------
+    def adjacent(self, ids):
+        """Sosedje izbora (brez izbranih)."""
+        ids = set(ids)
+        out = set()
+        for fid in ids:
+            out |= self.neighbours.get(fid, set())
+        return out - ids
+
+    def grow(self, ids, rings=1):
+        """Izbor, razširjen za N obročev sosedov."""
+        selected = set(ids)
+        frontier = set(selected)
+        for _ in range(max(0, rings)):
+            frontier = self.adjacent(frontier) - selected
+            if not frontier:
+                break
+            selected |= frontier
+        return selected
+
+    def enclosed(self, ids):
+        """Neizbrane parcele, ki jih izbor v celoti obdaja (ne sežejo do roba)."""
+        selected = set(ids)
+        seen = set(selected)
+        out = set()
+        for start in self.neighbours:
+            if start in seen:
+                continue
+            component = []
+            reaches_border = False
+            queue = deque([start])
+            seen.add(start)
+            while queue:
+                fid = queue.popleft()
+                component.append(fid)
+                if fid in self.border:
+                    reaches_border = True
+                for nb in self.neighbours[fid]:
+                    if nb not in seen:
+                        seen.add(nb)
+                        queue.append(nb)
+            if not reaches_border:
+                out.update(component)
+        return out
+
+
+def graph_for(layer, extent=None, feedback=None):
+    """Graf sloja iz predpomnilnika; zgradi ga, če ga ni ali je zastarel."""
+    graph = _graphs.get(layer.id())
+    if graph is not None and graph.is_current(layer):
+        ids = layer.selectedFeatureIds()
+        if extent is None or graph.extent is None or graph.covers(ids):
+            return graph
+    graph = ParcelGraph(layer, extent, feedback)
+    if feedback is None or not feedback.isCanceled():
+        _graphs[layer.id()] = graph
+        _watch(layer)
+    return graph
+
+
+def _watch(layer):
+    """Ob spremembi podatkov ali odstranitvi sloja graf zavržemo."""
+    layer_id = layer.id()
+    if layer_id in _watched:
+        return
+    layer.dataChanged.connect(lambda: drop(layer_id))
+    layer.willBeDeleted.connect(lambda: _forget(layer_id))
+    _watched.add(layer_id)
+
+
+def _forget(layer_id):
+    drop(layer_id)
+    _watched.discard(layer_id)
+
+
+def drop(layer_id=None):
+    if layer_id is None:
+        _graphs.clear()
+    else:
+        _graphs.pop(layer_id, None)
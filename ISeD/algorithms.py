@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – Processing algoritmi
+
+Algoritmi so tanki ovoji okrog jedra (core.py). Vsi pišejo v feature sink,
+poročajo napredek in upoštevajo preklic (feedback.isCanceled()).
+"""
+
+import os
+
+from qgis.core import (
+    QgsProcessing, QgsProcessingAlgorithm, QgsProcessingException,
+    QgsProcessingParameterFeatureSource, QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterVectorLayer, QgsProcessingParameterNumber,
+    QgsProcessingParameterEnum, QgsProcessingParameterExtent,
+    QgsProcessingParameterFileDestination, QgsProcessingOutputVectorLayer,
+    QgsFeature, QgsFeatureSink, QgsFeatureRequest, QgsField, QgsFields,
+    QgsGeometry, QgsVectorLayer, QgsWkbTypes, QgsCoordinateReferenceSystem
+)
+from qgis.PyQt.QtCore import QVariant
+
+from . import core
+from . import gurs
+
+
+# korak napredka prenosa, če velikost strani WFS ni nastavljena
+DOWNLOAD_PROGRESS_STEP = 500
+
+
+def _ised_fields():
+    fields = QgsFields()
+    fields.append(QgsField(core.EDIT_TYPE_FIELD, QVariant.Int))
+    return fields
+
+
+class IsedAlgorithm(QgsProcessingAlgorithm):
+    """Skupna osnova: skupina, prevodi in ustvarjanje instance."""
+    INPUT = 'INPUT'
+    OUTPUT = 'OUTPUT'
+
+    def createInstance(self):
+        return type(self)()
+
+    def group(self):
+        return 'ISeD'
+
+    def groupId(self):
+        return 'ised'
+
+    def _iterate(self, source, feedback, request=None):
+        """Zapisi vira z napredkom; ob preklicu se iteracija ustavi."""
+        total = source.featureCount() or 0
+        step = 100.0 / total if total > 0 else 0
+        it = source.getFeatures(request) if request is not None else source.getFeatures()
+        for i, f in enumerate(it):
+            if feedback.isCanceled():
+                break
+            feedback.setProgress(int(i * step))
+            yield f
+
+
+class DownloadGursAlgorithm(IsedAlgorithm):
+    EXTENT = 'EXTENT'
+    TYPE = 'TYPE'
+    TYPES = [(gurs.PARCELS_TYPENAME, "Parcele"), (gurs.BUILDINGS_TYPENAME, "Stavbe obris")]
+
+    def name(self):
+        return 'download_gurs'
+
+    def displayName(self):
+        return 'Prenesi parcele/stavbe GURS'
+
+    def shortHelpString(self):
+        return 'Prenese parcele ali obrise stavb iz GURS WFS za podani obseg (EPSG:3794).'
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterExtent(self.EXTENT, 'Obseg'))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.TYPE, 'Vrsta podatkov', options=[t[1] for t in self.TYPES], defaultValue=0))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, 'GURS'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        typename = self.TYPES[self.parameterAsEnum(parameters, self.TYPE, context)][0]
+        crs = QgsCoordinateReferenceSystem(gurs.CRS)
+        extent = self.parameterAsExtent(parameters, self.EXTENT, context, crs)
+        layer = QgsVectorLayer(gurs.wfs_uri(typename), typename, "WFS")
+        if not layer.isValid():
+            raise QgsProcessingException("Napaka pri nalaganju iz GURS WFS: " + typename)
+        sink, dest_id = self.parameterAsSink(
+            parameters, self.OUTPUT, context, layer.fields(), layer.wkbType(), layer.crs())
+        # pričakovano število zapisov (resultType=hits) za napredek po straneh
+        expected = gurs.count_matched(typename, extent, feedback=feedback)
+        page = gurs.page_size() or DOWNLOAD_PROGRESS_STEP
+        request = QgsFeatureRequest().setFilterRect(extent)
+        count = 0
+        for f in layer.getFeatures(request):
+            if feedback.isCanceled():
+                break
+            sink.addFeature(f, QgsFeatureSink.FastInsert)
+            count += 1
+            if count % page == 0:
+                if expected:
+                    feedback.setProgress(min(99, int(100.0 * count / expected)))
+                else:
+                    feedback.pushInfo("Prenesenih zapisov: " + str(count))
+        feedback.setProgress(100)
+        return {self.OUTPUT: dest_id}
+
+
+class CopyToIsedAlgorithm(IsedAlgorithm):
+    EDIT_TYPE = 'EDIT_TYPE'
+    GRID = 'GRID'
+    MIN_HOLE = 'MIN_HOLE'
+
+    def name(self):
+        return 'copy_to_ised'
+
+    def displayName(self):
+        return 'Kopiraj in združi v ISeD (edit_type)'
+
+    def shortHelpString(self):
+        return ('Združi vhodne parcele ali stavbe v en poligon z izbranim edit_type. '
+                'Vhod v geografskem CRS se pretvori v ' + core.ISED_CRS + ', ker sta mreža in luknje v metrih.')
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, 'Parcele ali stavbe', [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.EDIT_TYPE, 'edit_type', options=core.EDIT_TYPE_OPTIONS, defaultValue=0))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.GRID, 'Mreža natančnosti (m, 0 = brez)', QgsProcessingParameterNumber.Double,
+            core.DISSOLVE_GRID, False, 0.0))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.MIN_HOLE, 'Najmanjša luknja (m²)', QgsProcessingParameterNumber.Double,
+            core.DISSOLVE_MIN_HOLE, False, 0.0))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, 'ISeD'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        choice = core.EDIT_TYPE_OPTIONS[self.parameterAsEnum(parameters, self.EDIT_TYPE, context)]
+        grid = self.parameterAsDouble(parameters, self.GRID, context)
+        min_hole = self.parameterAsDouble(parameters, self.MIN_HOLE, context)
+        fields = _ised_fields()
+        crs = source.sourceCrs()
+        request = core.geometry_request()
+        if crs.isGeographic():
+            # mreža in najmanjša luknja sta v metrih
+            crs = QgsCoordinateReferenceSystem(core.ISED_CRS)
+            request.setDestinationCrs(crs, context.transformContext())
+        sink, dest_id = self.parameterAsSink(
+            parameters, self.OUTPUT, context, fields, QgsWkbTypes.MultiPolygon, crs)
+        try:
+            geom = core.clean_dissolve(self._iterate(source, feedback, request), grid, min_hole)
+        except core.IsedError as e:
+            raise QgsProcessingException(str(e))
+        if feedback.isCanceled():
+            return {}
+        feat = QgsFeature(fields)
+        feat.setGeometry(geom)
+        feat.setAttribute(0, core.edit_type_from_choice(choice))
+        sink.addFeature(feat, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class BufferAlgorithm(IsedAlgorithm):
+    DISTANCE = 'DISTANCE'
+    SEGMENTS = 'SEGMENTS'
+
+    def name(self):
+        return 'buffer'
+
+    def displayName(self):
+        return 'Buffer poligonov ISeD'
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, 'Vhodni sloj', [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.DISTANCE, 'Razdalja (m)', QgsProcessingParameterNumber.Double, 10.0, False, 0.1, 10000.0))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.SEGMENTS, 'Segmenti', QgsProcessingParameterNumber.Integer, core.BUFFER_SEGMENTS, False, 1))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, 'Buffer'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        dist = self.parameterAsDouble(parameters, self.DISTANCE, context)
+        segments = self.parameterAsInt(parameters, self.SEGMENTS, context)
+        sink, dest_id = self.parameterAsSink(
+            parameters, self.OUTPUT, context, source.fields(), QgsWkbTypes.MultiPolygon, source.sourceCrs())
+        for f in self._iterate(source, feedback):
+            if f.hasGeometry():
+                f.setGeometry(f.geometry().buffer(dist, segments))
+            sink.addFeature(f, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class UnionAlgorithm(IsedAlgorithm):
+    def name(self):
+        return 'union'
+
+    def displayName(self):
+        return 'Združi poligone'
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, 'Vhodni sloj', [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, 'Združeno'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        sink, dest_id = self.parameterAsSink(
+            parameters, self.OUTPUT, context, source.fields(), QgsWkbTypes.MultiPolygon, source.sourceCrs())
+        try:
+            geom = core.union_geometries(self._iterate(source, feedback))
+        except core.IsedError as e:
+            raise QgsProcessingException(str(e))
+        if feedback.isCanceled():
+            return {}
+        feat = QgsFeature(source.fields())
+        feat.setGeometry(geom)
+        sink.addFeature(feat, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class ClipVodAlgorithm(IsedAlgorithm):
+    ZONE = 'ZONE'
+
+    def name(self):
+        return 'clip_vod'
+
+    def displayName(self):
+        return 'Obreži s cono VOD'
+
+    def shortHelpString(self):
+        return 'Iz vseh poligonov, ki sekajo cono VOD, izreže cono.'
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, 'Vhodni sloj', [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.ZONE, 'Cona VOD', [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, 'Obrezano'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        zone_source = self.parameterAsSource(parameters, self.ZONE, context)
+        try:
+            # cona je lahko v drugem CRS kot vhodni sloj
+            request = QgsFeatureRequest().setDestinationCrs(source.sourceCrs(), context.transformContext())
+            zone = core.union_geometries(zone_source.getFeatures(request))
+        except core.IsedError as e:
+            raise QgsProcessingException(str(e))
+        sink, dest_id = self.parameterAsSink(
+            parameters, self.OUTPUT, context, source.fields(), QgsWkbTypes.MultiPolygon, source.sourceCrs())
+        for f in self._iterate(source, feedback):
+            geom = f.geometry()
+            if f.hasGeometry() and geom.intersects(zone):
+                clipped = geom.difference(zone)
+                if clipped.isEmpty():
+                    continue
+                f.setGeometry(clipped)
+            sink.addFeature(f, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class ClipInfluenceAlgorithm(IsedAlgorithm):
+    def name(self):
+        return 'clip_influence'
+
+    def displayName(self):
+        return 'Obreži vplivno območje s spomenikom'
+
+    def shortHelpString(self):
+        return 'Iz poligonov z edit_type = 3 izreže poligone z edit_type = 1.'
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, 'Sloj ISeD', [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterFeatureSink(self.OUTPUT, 'ISeD'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        if source.fields().indexOf(core.EDIT_TYPE_FIELD) < 0:
+            raise QgsProcessingException("Sloj nima polja 'edit_type'.")
+        request = QgsFeatureRequest().setFilterExpression(
+            '"edit_type" = ' + str(core.EDIT_MONUMENT))
+        monuments = [f.geometry() for f in source.getFeatures(request) if f.hasGeometry()]
+        if not monuments:
+            raise QgsProcessingException("Ni poligona z edit_type = 1 (osnovno območje).")
+        monument = QgsGeometry.unaryUnion(monuments)
+        sink, dest_id = self.parameterAsSink(
+            parameters, self.OUTPUT, context, source.fields(), QgsWkbTypes.MultiPolygon, source.sourceCrs())
+        for f in self._iterate(source, feedback):
+            if f.attribute(core.EDIT_TYPE_FIELD) == core.EDIT_INFLUENCE and f.hasGeometry():
+                clipped = f.geometry().difference(monument)
+                if not clipped.isEmpty():
+                    f.setGeometry(clipped)
+            sink.addFeature(f, QgsFeatureSink.FastInsert)
+        return {self.OUTPUT: dest_id}
+
+
+class SymbologyAlgorithm(IsedAlgorithm):
+    STYLE = 'STYLE'
+    # imena konstant v styles.py; modul (QtXml) se uvozi šele ob zagonu
+    STYLES = [
+        ("ISeD", "ISED_QML", False),
+        ("OPN_PNRP_OZN", "OPN_QML", False),
+        ("OPN_PNRP_OZN (po merilu)", "OPN_QML", True),
+        ("Parcele", "PARCELS_QML", False),
+    ]
+
+    def name(self):
+        return 'symbology'
+
+    def displayName(self):
+        return 'Nastavi simbologijo'
+
+    def flags(self):
+        # slog se nastavi na sloju v projektu, zato brez ločene niti
+        return super().flags() | QgsProcessingAlgorithm.FlagNoThreading
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterVectorLayer(self.INPUT, 'Sloj'))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.STYLE, 'Simbologija', options=[s[0] for s in self.STYLES], defaultValue=0))
+        self.addOutput(QgsProcessingOutputVectorLayer(self.OUTPUT, 'Sloj'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        layer = self.parameterAsVectorLayer(parameters, self.INPUT, context)
+        from . import styles
+        label, qml_name, scale_dependent = self.STYLES[self.parameterAsEnum(parameters, self.STYLE, context)]
+        qml = getattr(styles, qml_name)
+        if qml == styles.OPN_QML:
+            ok, msg = styles.apply_opn_style(layer, scale_dependent=scale_dependent)
+        else:
+            ok, msg = styles.apply_style(layer, qml)
+        if not ok:
+            raise QgsProcessingException("Napaka pri nalaganju simbologije " + label + ": " + msg)
+        layer.triggerRepaint()
+        return {self.OUTPUT: layer.id()}
+
+
+class ExportShpZipAlgorithm(IsedAlgorithm):
+    def name(self):
+        return 'export_shp_zip'
+
+    def displayName(self):
+        return 'Izvozi v shapefile + zip'
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterVectorLayer(self.INPUT, 'Sloj'))
+        self.addParameter(QgsProcessingParameterFileDestination(self.OUTPUT, 'ZIP', 'ZIP (*.zip)'))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        layer = self.parameterAsVectorLayer(parameters, self.INPUT, context)
+        zip_target = self.parameterAsFileOutput(parameters, self.OUTPUT, context)
+        shp_path = os.path.splitext(zip_target)[0] + ".shp"
+        try:
+            zip_path = core.export_shp_zip(layer, shp_path)
+        except core.IsedError as e:
+            raise QgsProcessingException(str(e))
+        return {self.OUTPUT: zip_path}
+
+
+ALGORITHMS = [
+    DownloadGursAlgorithm,
+    CopyToIsedAlgorithm,
+    BufferAlgorithm,
+    UnionAlgorithm,
+    ClipVodAlgorithm,
+    ClipInfluenceAlgorithm,
+    SymbologyAlgorithm,
+    ExportShpZipAlgorithm,
+]
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – paketna priprava grafike iz CSV seznama spomenikov (brez GUI)
+
+Uporaba:
+    python -m ISeD.batch spomeniki.csv izhodna_mapa [--parcels kataster.gpkg]
+                         [--workers N] [--ko-field KO_ID] [--parcel-field ST_PARCELE]
+
+CSV (ločilo ; ali ,) ima stolpce:
+    id          oznaka spomenika (EID), uporabi se za ime ZIP datoteke
+    ko          šifra katastrske občine
+    parcele     seznam parcel, ločen z vejicami ali presledki; posamezna
+                parcela je lahko tudi 'parcela-KO' (prepiše stolpec ko)
+    buffer      razdalja vplivnega območja v metrih (prazno ali 0 = brez)
+    edit_types  npr. '1+3' – prvi tip 1/2 je za parcele spomenika, prvi
+                tip 3/4 za vplivno območje (privzeto 1, z bufferjem 1;3)
+
+Parcele se berejo iz lokalnega posnetka katastra (--parcels) ali iz GURS WFS.
+Za vsak spomenik nastane <id>.zip v izhodni mapi, povzetek pa v porocilo.csv.
+"""
+
+import os
+import re
+import sys
+import csv
+import shutil
+import argparse
+import tempfile
+
+REPORT_NAME = "porocilo.csv"
+CSV_DELIMITERS = ";,\t"
+
+# stanje posameznega procesa (nastavi _init_worker)
+_app = None
+_source = None
+_source_error = None
+
+
+# ---------------- Branje CSV ----------------
+class _SemicolonDialect(csv.excel):
+    delimiter = ";"
+
+
+def _split_types(text):
+    return [int(t) for t in re.split(r"[+;,\s]+", text or "") if t.strip().isdigit()]
+
+
+def parse_pairs(ko, text):
+    """'12/1, 13 45/2-1220' -> [(ko, '12/1'), (ko, '13'), (1220, '45/2')]"""
+    pairs = []
+    for token in re.split(r"[,\s]+", text or ""):
+        token = token.strip()
+        if not token:
+            continue
+        if "-" in token:
+            p, k = token.rsplit("-", 1)
+            if k.strip().isdigit():
+                pairs.append((int(k), p.strip()))
+                continue
+        if ko is None:
+            raise ValueError("Parcela '" + token + "' nima KO.")
+        pairs.append((ko, token))
+    return pairs
+
+
+def read_monuments(path):
+    """Prebere CSV in vrne seznam nalog (slovarjev); neveljavne vrstice imajo ključ 'error'."""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS)
+        except csv.Error:
+            dialect = _SemicolonDialect
+        rows = list(csv.DictReader(f, dialect=dialect))
+
+    tasks = []
+    for n, row in enumerate(rows, start=2):
+        row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k is not None}
+        mid = row.get('id') or ("vrstica_" + str(n))
+        try:
+            tasks.append(_task(mid, row))
+        except ValueError as e:
+            # napačna vrstica ne ustavi paketa; javi se v poročilu
+            tasks.append({'id': mid, 'error': "Vrstica " + str(n) + ": " + str(e)})
+    return tasks
+
+
+def _task(mid, row):
+    ko_text = row.get('ko', "")
+    ko = int(ko_text) if ko_text.isdigit() else None
+    buffer_text = row.get('buffer', "").replace(",", ".")
+    try:
+        distance = float(buffer_text) if buffer_text else 0.0
+    except ValueError:
+        raise ValueError("neveljaven buffer '" + buffer_text + "'.")
+    types = _split_types(row.get('edit_types'))
+    monument_type = next((t for t in types if t in (1, 2)), 1)
+    influence_type = next((t for t in types if t in (3, 4)), 3 if distance > 0 else None)
+    return {
+        'id': mid,
+        'pairs': parse_pairs(ko, row.get('parcele')),
+        'buffer': distance,
+        'monument_type': monument_type,
+        'influence_type': influence_type,
+    }
+
+
+def safe_name(text):
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", str(text)).strip("._") or "spomenik"
+
+
+# ---------------- Delo v procesu ----------------
+class ParcelSource:
+    """Vir parcel: lokalni posnetek katastra ali GURS WFS."""
+    def __init__(self, path=None, ko_field=None, parcel_field=None):
+        from qgis.core import QgsVectorLayer
+        from . import core, gurs
+        if path:
+            self.layer = QgsVectorLayer(path, "parcele", "ogr")
+            self.remote = False
+        else:
+            uri = gurs.wfs_uri(gurs.PARCELS_TYPENAME, restrict_bbox=False)
+            self.layer = QgsVectorLayer(uri, "parcele", "WFS")
+            self.remote = True
+        if not self.layer.isValid():
+            raise core.IsedError("Vir parcel ni veljaven: " + (path or gurs.wfs_url()))
+        detected = core.detect_parcel_fields(self.layer)
+        self.ko_field = ko_field or detected[0]
+        self.parcel_field = parcel_field or detected[1]
+        if self.ko_field is None or self.parcel_field is None:
+            raise core.IsedError("V viru parcel ni polj za KO in številko parcele.")
+
+    def features(self, pairs):
+        """Parcele iz seznama parov, z geometrijo v CRS sloja ISeD."""
+        from qgis.core import QgsFeatureRequest
+        from . import core
+        expr = core.parcel_pairs_expression(self.ko_field, self.parcel_field, pairs)
+        if self.remote:
+            # filter gre na strežnik kot OGC Filter, prenesejo se le iskane parcele
+            self.layer.setSubsetString(expr)
+            return list(self.layer.getFeatures(core.reprojected_request(self.layer, core.ISED_CRS)))
+        request = QgsFeatureRequest().setFilterExpression(expr)
+        return list(self.layer.getFeatures(core.reprojected_request(self.layer, core.ISED_CRS, request)))
+
+
+def _init_worker(parcels_path, ko_field, parcel_field):
+    global _app, _source, _source_error
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from qgis.core import QgsApplication
+    _app = QgsApplication([], False)
+    _app.initQgis()
+    try:
+        _source = ParcelSource(parcels_path, ko_field, parcel_field)
+    except Exception as e:
+        # napaka v inicializaciji bi pool zagnala v neskončno ponavljanje
+        _source_error = str(e)
+
+
+def build_ised_layer(task, parcels):
+    """Sloj ISeD za en spomenik: parcele spomenika in vplivno območje."""
+    from qgis.core import QgsVectorLayer
+    from . import core
+    layer = QgsVectorLayer(
+        "Polygon?crs=" + core.ISED_CRS + "&field=" + core.EDIT_TYPE_FIELD + ":integer",
+        core.ISED_LAYER_NAME, "memory")
+    monument = core.clean_dissolve(parcels)
+    edits = core.EditSet()
+    edits.added.append(core.new_feature(layer, monument, task['monument_type']))
+    if task['influence_type'] is not None and task['buffer'] > 0:
+        influence = core.influence_area(monument, task['buffer'])
+        edits.added.append(core.new_feature(layer, influence, task['influence_type']))
+    edits.apply(layer, use_provider=True)
+    return layer
+
+
+def prepare_monument(task, out_dir):
+    """Pripravi en spomenik in vrne (id, pot do ZIP ali None, sporočilo)."""
+    from . import core
+    if _source is None:
+        return task['id'], None, _source_error or "Vir parcel ni na voljo."
+    try:
+        parcels = _source.features(task['pairs'])
+        if not parcels:
+            return task['id'], None, "Ni najdenih parcel."
+        note = ""
+        if len(parcels) < len(task['pairs']):
+            note = "Najdenih " + str(len(parcels)) + " od " + str(len(task['pairs'])) + " parcel."
+        layer = build_ised_layer(task, parcels)
+        name = safe_name(task['id'])
+        tmp_dir = tempfile.mkdtemp(prefix="ised_batch_")
+        try:
+            zip_path = core.export_shp_zip(layer, os.path.join(tmp_dir, name + ".shp"))
+            target = os.path.join(out_dir, name + ".zip")
+            shutil.move(zip_path, target)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return task['id'], target, note
+    except Exception as e:
+        return task['id'], None, str(e)
+
+
+def _run_task(args):
+    return prepare_monument(*args)
+
+
+# ---------------- Glavni program ----------------
+def run(tasks, out_dir, parcels_path=None, workers=None, ko_field=None, parcel_field=None, log=None):
+    """Pripravi vse spomenike; vrne seznam (id, zip, sporočilo)."""
+    os.makedirs(out_dir, exist_ok=True)
+    results = [(task['id'], None, task['error']) for task in tasks if task.get('error')]
+    jobs = [(task, out_dir) for task in tasks if not task.get('error')]
+    total = len(tasks)
+    if log is not None:
+        for i, (mid, _, msg) in enumerate(results, start=1):
+            log("[" + str(i) + "/" + str(total) + "] " + str(mid) + ": NAPAKA – " + msg)
+    if not jobs:
+        write_report(os.path.join(out_dir, REPORT_NAME), results)
+        return results
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    init_args = (parcels_path, ko_field, parcel_field)
+    if workers == 1:
+        _init_worker(*init_args)
+        iterator = map(_run_task, jobs)
+        pool = None
+    else:
+        import multiprocessing
+        # spawn: vsak proces zažene svoj QgsApplication, brez deljenega stanja Qt
+        pool = multiprocessing.get_context('spawn').Pool(workers, _init_worker, init_args)
+        iterator = pool.imap_unordered(_run_task, jobs)
+    try:
+        for result in iterator:
+            results.append(result)
+            if log is not None:
+                mid, zip_path, msg = result
+                status = "OK" if zip_path else "NAPAKA"
+                log("[" + str(len(results)) + "/" + str(total) + "] " + str(mid) + ": " + status
+                    + (" – " + msg if msg else ""))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        elif _app is not None:
+            _app.exitQgis()
+    write_report(os.path.join(out_dir, REPORT_NAME), results)
+    return results
+
+
+def write_report(path, results):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["id", "stanje", "zip", "sporocilo"])
+        for mid, zip_path, msg in results:
+            writer.writerow([mid, "OK" if zip_path else "NAPAKA", zip_path or "", msg])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ISeD.batch",
+                                     description="Paketna priprava grafike ISeD iz CSV.")
+    parser.add_argument("csv", help="CSV s spomeniki (id, ko, parcele, buffer, edit_types)")
+    parser.add_argument("out_dir", help="izhodna mapa za ZIP datoteke")
+    parser.add_argument("--parcels", help="lokalni posnetek katastra (GeoPackage, SHP); privzeto GURS WFS")
+    parser.add_argument("--workers", type=int, default=None, help="število procesov (privzeto št. jeder)")
+    parser.add_argument("--ko-field", default=None)
+    parser.add_argument("--parcel-field", default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        tasks = read_monuments(args.csv)
+    except (OSError, ValueError) as e:
+        sys.stderr.write("Napaka pri branju CSV: " + str(e) + "\n")
+        return 2
+    if not tasks:
+        sys.stderr.write("CSV nima spomenikov.\n")
+        return 2
+
+    def log(line):
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    results = run(tasks, args.out_dir, args.parcels, args.workers,
+                  args.ko_field, args.parcel_field, log=log)
+    failed = sum(1 for r in results if not r[1])
+    log("Pripravljenih " + str(len(results) - failed) + " od " + str(len(results))
+        + " spomenikov; povzetek v " + os.path.join(args.out_dir, REPORT_NAME))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
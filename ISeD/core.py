@@ -0,0 +1,597 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – jedro geometrijskih operacij (brez GUI)
+
+Funkcije sprejmejo sloje ali iteratorje geometrij in parametre ter vrnejo
+rezultat ali nabor sprememb (EditSet). Ne uporabljajo iface, aktivnega sloja
+ali dialogov, zato jih lahko kličemo iz skript, Processing algoritmov in
+paketnih opravil. Gumbi v MK so le tanki ovoji okrog teh funkcij.
+"""
+
+import os
+
+from qgis.core import (
+    QgsGeometry, QgsFeature, QgsFeatureRequest, QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform, QgsProject, QgsWkbTypes
+)
+
+from . import instrument
+
+ISED_LAYER_NAME = "priprava_grafike_za_ISeD"
+ISED_CRS = "EPSG:3794"
+EDIT_TYPE_FIELD = "edit_type"
+
+# izvor poligona (provenance.py); polja se ne izvažajo v SHP za ISeD
+SOURCE_IDS_FIELD = "vir_parc"
+SOURCE_HASH_FIELD = "vir_hash"
+SOURCE_STATUS_FIELD = "vir_stanje"
+INTERNAL_FIELDS = (SOURCE_IDS_FIELD, SOURCE_HASH_FIELD, SOURCE_STATUS_FIELD)
+
+EDIT_MONUMENT = 1
+EDIT_MONUMENT_SUB = 2
+EDIT_INFLUENCE = 3
+EDIT_INFLUENCE_SUB = 4
+
+EDIT_TYPE_OPTIONS = [
+    "1 - spomenik",
+    "2 - podobmočje spomenika",
+    "3 - vplivno območje",
+    "4 - podobmočje vplivnega območja",
+    "osnovno območje RNPD",
+    "cona VOD"
+]
+
+BUFFER_SEGMENTS = 5
+UNION_CHUNK = 2000
+INFLUENCE_MIN_SHARE = 0.2
+
+# čisto združevanje parcel: mreža natančnosti (m) in najmanjša luknja (m²)
+DISSOLVE_GRID = 0.01
+DISSOLVE_MIN_HOLE = 1.0
+SETTINGS_DISSOLVE_GRID = "ISeD/dissolve_grid"
+SETTINGS_DISSOLVE_MIN_HOLE = "ISeD/dissolve_min_hole"
+SHP_EXTENSIONS = ["shp", "shx", "dbf", "prj", "cpg"]
+
+
+class IsedError(Exception):
+    """Napaka jedra; sporočilo je namenjeno uporabniku."""
+
+
+def edit_type_from_choice(choice):
+    """'3 - vplivno območje' -> 3; opisne izbire brez številke -> None."""
+    if choice and choice[0].isdigit():
+        return int(choice.split(" ")[0])
+    return None
+
+
+def has_edit_type(layer):
+    return layer.fields().indexOf(EDIT_TYPE_FIELD) >= 0
+
+
+# ---------------- Nabor sprememb ----------------
+class EditSet:
+    """Spremembe sloja: spremenjene geometrije, izbrisani in dodani zapisi."""
+    def __init__(self):
+        self.changed = {}
+        self.deleted = []
+        self.added = []
+
+    def is_empty(self):
+        return not (self.changed or self.deleted or self.added)
+
+    def apply(self, layer, use_provider=False):
+        """Zapiše spremembe v sloj (prek urejanja ali neposredno v ponudnika)."""
+        if use_provider:
+            pr = layer.dataProvider()
+            if self.deleted:
+                pr.deleteFeatures(self.deleted)
+            if self.changed:
+                pr.changeGeometryValues(self.changed)
+            if self.added:
+                pr.addFeatures(self.added)
+        else:
+            if not layer.isEditable():
+                layer.startEditing()
+            if self.deleted:
+                layer.deleteFeatures(self.deleted)
+            for fid, geom in self.changed.items():
+                layer.changeGeometry(fid, geom)
+            if self.added:
+                layer.addFeatures(self.added)
+            layer.commitChanges()
+        layer.updateExtents()
+        return self
+
+
+# ---------------- Pomožne ----------------
+def _geometries(items):
+    """Iz iteratorja geometrij ali zapisov vrne geometrije (brez praznih)."""
+    for item in items:
+        if isinstance(item, QgsGeometry):
+            geom = item
+        elif item.hasGeometry():
+            geom = item.geometry()
+        else:
+            continue
+        instrument.count_geometry(geom)
+        yield geom
+
+
+def geometry_request(request=None):
+    """Zahteva brez atributov: iz ponudnika se prenese le geometrija."""
+    request = request or QgsFeatureRequest()
+    request.setSubsetOfAttributes([])
+    return request
+
+
+def iter_selected(layer, request=None):
+    """Pretočno bere izbrane zapise (brez seznama kot pri selectedFeatures())."""
+    return layer.getSelectedFeatures(request or geometry_request())
+
+
+def first_selected(layer, request=None):
+    for f in iter_selected(layer, request or QgsFeatureRequest()):
+        return f
+    return None
+
+
+def detect_parcel_fields(layer):
+    """Ugane polji KO in številke parcele; če ju ni, vrne None."""
+    names = [f.name() for f in layer.fields()]
+    low = [n.lower() for n in names]
+    ko_candidates = []
+    for i, n in enumerate(low):
+        if n in ('ko', 'ko_sifra', 'ko__sifra', 'ko_sifko'):
+            ko_candidates.append(names[i])
+        elif ('ko' in n) and ('sifra' in n or 'id' in n or n.endswith('_ko') or n.startswith('ko_')):
+            ko_candidates.append(names[i])
+    parc_candidates = []
+    for i, n in enumerate(low):
+        if n in ('parcela', 'st_parcele', 'stparcele', 'id_parcele'):
+            parc_candidates.append(names[i])
+        elif ('parcel' in n) or ('parc' in n) or ('st_parc' in n):
+            parc_candidates.append(names[i])
+    ko_field = ko_candidates[0] if ko_candidates else None
+    parc_field = parc_candidates[0] if parc_candidates else None
+    return ko_field, parc_field
+
+
+def detect_building_fields(layer):
+    """Ugane polji KO in številke stavbe (GURS: KO_ID, ST_STAVBE); sicer None."""
+    ko_field, _ = detect_parcel_fields(layer)
+    building_field = None
+    for f in layer.fields():
+        n = f.name().lower()
+        if n in ('st_stavbe', 'stavba', 'id_stavbe') or 'stavb' in n:
+            building_field = f.name()
+            break
+    return ko_field, building_field
+
+
+def find_layer(project, name_part=None, exact=None):
+    for lyr in project.mapLayers().values():
+        if exact is not None and lyr.name() == exact:
+            return lyr
+        if name_part is not None and name_part in lyr.name().lower():
+            return lyr
+    return None
+
+
+def new_feature(layer, geom, edit_type=None):
+    feat = QgsFeature()
+    feat.setFields(layer.fields())
+    feat.setGeometry(geom)
+    if edit_type is not None and has_edit_type(layer):
+        feat.setAttribute(EDIT_TYPE_FIELD, edit_type)
+    return feat
+
+
+# ---------------- Koordinatni sistemi ----------------
+_transforms = {}
+
+
+def crs_of(value):
+    """QgsCoordinateReferenceSystem iz CRS, niza (npr. 'EPSG:3912') ali sloja."""
+    if isinstance(value, QgsCoordinateReferenceSystem):
+        return value
+    if isinstance(value, str):
+        return QgsCoordinateReferenceSystem(value)
+    return value.crs()
+
+
+def crs_uri(crs):
+    """Zapis CRS za URI pomnilniškega sloja (authid ali WKT)."""
+    crs = crs_of(crs)
+    return crs.authid() or "wkt:" + crs.toWkt()
+
+
+def ised_crs(project=None):
+    """CRS novega sloja ISeD: CRS projekta, če je projiciran, sicer ISED_CRS."""
+    if project is not None:
+        crs = project.crs()
+        if crs.isValid() and not crs.isGeographic():
+            return crs
+    return QgsCoordinateReferenceSystem(ISED_CRS)
+
+
+def clear_transforms():
+    """Izprazni predpomnilnik transformacij (npr. ob spremembi konteksta projekta)."""
+    _transforms.clear()
+
+
+def transform_for(src, dst):
+    """Predpomnjena transformacija src → dst; None, če ni potrebna."""
+    src = crs_of(src)
+    dst = crs_of(dst)
+    if not src.isValid() or not dst.isValid() or src == dst:
+        return None
+    key = (src.authid() or src.toWkt(), dst.authid() or dst.toWkt())
+    xform = _transforms.get(key)
+    if xform is None:
+        xform = QgsCoordinateTransform(src, dst, QgsProject.instance().transformContext())
+        _transforms[key] = xform
+    return xform
+
+
+def to_crs(items, src, dst):
+    """Geometrije (ali zapisi) iz src v dst; ena transformacija za ves tok."""
+    xform = transform_for(src, dst)
+    for item in items:
+        if isinstance(item, QgsGeometry):
+            geom = item
+        elif item.hasGeometry():
+            geom = item.geometry()
+        else:
+            continue
+        if xform is not None:
+            geom = QgsGeometry(geom)
+            geom.transform(xform)
+        yield geom
+
+
+def reprojected_request(layer, crs, request=None):
+    """Zahteva, pri kateri ponudnik vrne geometrije že v crs.
+
+    Filtrirni pravokotnik zahteve je potem v crs. Transformacija se ustvari
+    enkrat za iterator, ne za vsak zapis.
+    """
+    request = request or QgsFeatureRequest()
+    crs = crs_of(crs)
+    if transform_for(layer.crs(), crs) is not None:
+        request.setDestinationCrs(crs, QgsProject.instance().transformContext())
+    return request
+
+
+# ---------------- Operacije ----------------
+def union_geometries(items, chunk=UNION_CHUNK):
+    """Združi geometrije (ali zapise) v eno geometrijo.
+
+    Vhod se bere pretočno in združuje po kosih, zato je v pomnilniku hkrati
+    največ en kos vhodnih geometrij in delne unije.
+    """
+    partials = []
+    buf = []
+    for geom in _geometries(items):
+        buf.append(geom)
+        if len(buf) >= chunk:
+            partials.append(QgsGeometry.unaryUnion(buf))
+            buf = []
+    if buf:
+        partials.append(QgsGeometry.unaryUnion(buf))
+    if not partials:
+        raise IsedError("Ni označenih geometrij.")
+    union_geom = partials[0] if len(partials) == 1 else QgsGeometry.unaryUnion(partials)
+    if union_geom is None or union_geom.isEmpty():
+        raise IsedError("Združitev ni uspela.")
+    return union_geom
+
+
+def dissolve_settings():
+    """(mreža, najmanjša luknja) iz nastavitev QGIS ali privzete vrednosti."""
+    values = []
+    for key, default in ((SETTINGS_DISSOLVE_GRID, DISSOLVE_GRID),
+                         (SETTINGS_DISSOLVE_MIN_HOLE, DISSOLVE_MIN_HOLE)):
+        try:
+            from qgis.core import QgsSettings
+            values.append(float(QgsSettings().value(key, default)))
+        except (TypeError, ValueError, ImportError):
+            values.append(default)
+    return tuple(values)
+
+
+def polygon_parts(geom):
+    """Samo poligonski deli geometrije (makeValid in unija lahko vrneta zbirko)."""
+    if geom is None or geom.isEmpty() or geom.type() == QgsWkbTypes.PolygonGeometry:
+        return geom
+    polys = [QgsGeometry(p) for p in geom.asGeometryCollection()
+             if p.type() == QgsWkbTypes.PolygonGeometry and not p.isEmpty()]
+    if not polys:
+        return QgsGeometry()
+    return polys[0] if len(polys) == 1 else QgsGeometry.unaryUnion(polys)
+
+
+def _snapped(items, grid):
+    for geom in _geometries(items):
+        snapped = geom.snappedToGrid(grid, grid)
+        if snapped.isEmpty():
+            continue
+        if not snapped.isGeosValid():
+            # poravnava lahko sesede dele v črte ali točke
+            snapped = polygon_parts(snapped.makeValid())
+            if snapped.isEmpty():
+                continue
+        yield snapped
+
+
+def clean_dissolve(items, grid=DISSOLVE_GRID, min_hole=DISSOLVE_MIN_HOLE):
+    """Združi sosednje parcele brez mikro lukenj in drobcev.
+
+    Geometrije se najprej poravnajo na mrežo natančnosti (skupne meje GURS
+    se tako ujemajo), nato združijo; odstranijo se luknje pod min_hole in
+    kolinearna oglišča (poenostavitev s toleranco pol mreže).
+    """
+    union_geom = union_geometries(_snapped(items, grid)) if grid > 0 else union_geometries(items)
+    union_geom = polygon_parts(union_geom)
+    if union_geom.isEmpty():
+        raise IsedError("Združitev ni uspela.")
+    if min_hole > 0:
+        union_geom = union_geom.removeInteriorRings(min_hole)
+    if grid > 0:
+        reduced = union_geom.simplify(grid / 2.0)
+        if not reduced.isEmpty() and reduced.isGeosValid():
+            union_geom = reduced
+    if union_geom.isEmpty():
+        raise IsedError("Združitev ni uspela.")
+    return union_geom
+
+
+def union_features(layer, features):
+    """Zapise nadomesti z enim, ki je njihova unija."""
+    ids = []
+
+    def collect():
+        for f in features:
+            ids.append(f.id())
+            yield f
+
+    edits = EditSet()
+    union_geom = union_geometries(collect())
+    edits.deleted = ids
+    feat = QgsFeature(layer.fields())
+    feat.setGeometry(union_geom)
+    edits.added.append(feat)
+    return edits
+
+
+def dissolve_to_ised(items, ised_layer, edit_type=None):
+    """Združi geometrije in jih pripravi kot nov zapis v sloju ISeD."""
+    union_geom = union_geometries(items)
+    edits = EditSet()
+    edits.added.append(new_feature(ised_layer, union_geom, edit_type))
+    return edits
+
+
+def buffer_features(features, distance, segments=BUFFER_SEGMENTS):
+    """Vsaki geometriji doda buffer podane razdalje (v enotah sloja)."""
+    edits = EditSet()
+    for f in features:
+        geom = f.geometry()
+        instrument.count_geometry(geom)
+        edits.changed[f.id()] = geom.buffer(distance, segments)
+    if not edits.changed:
+        raise IsedError("Ni označenih geometrij.")
+    return edits
+
+
+def influence_area(monument_geom, distance, segments=BUFFER_SEGMENTS):
+    """Vplivno območje: buffer spomenika brez samega spomenika."""
+    instrument.count_geometry(monument_geom)
+    influence = monument_geom.buffer(distance, segments).difference(monument_geom)
+    if influence.isEmpty():
+        raise IsedError("Rezultat obrezovanja je prazen.")
+    return influence
+
+
+def parcels_hit_by(geom, parcel_layer, min_share=INFLUENCE_MIN_SHARE, crs=None):
+    """ID parcel, ki jih geometrija pokrije vsaj v deležu min_share (0–1).
+
+    crs je koordinatni sistem geometrije (privzeto sloja parcel); parcele
+    se vrnejo v njem.
+    """
+    engine = QgsGeometry.createGeometryEngine(geom.constGet())
+    engine.prepareGeometry()
+    request = geometry_request(QgsFeatureRequest().setFilterRect(geom.boundingBox()))
+    if crs is not None:
+        request = reprojected_request(parcel_layer, crs, request)
+    for f in parcel_layer.getFeatures(request):
+        if not f.hasGeometry():
+            continue
+        parcel = f.geometry()
+        instrument.count_geometry(parcel)
+        if engine.contains(parcel.constGet()):
+            yield f.id(), parcel
+            continue
+        if not engine.intersects(parcel.constGet()):
+            continue
+        area = parcel.area()
+        inter = engine.intersection(parcel.constGet())
+        if inter is not None and area > 0 and QgsGeometry(inter).area() / area >= min_share:
+            yield f.id(), parcel
+
+
+def parcel_influence_area(monument_geom, parcel_layer, distance,
+                          min_share=INFLUENCE_MIN_SHARE, segments=BUFFER_SEGMENTS, crs=None):
+    """Vplivno območje po mejah parcel.
+
+    Buffer spomenika izbere parcele (nad pragom pokritosti), te se združijo,
+    spomenik pa se izreže kot pri clip_influence. Vrne (geometrija, id parcel).
+    crs je koordinatni sistem spomenika, če se razlikuje od sloja parcel.
+    """
+    zone = monument_geom.buffer(distance, segments)
+    ids = []
+
+    def hits():
+        for fid, parcel in parcels_hit_by(zone, parcel_layer, min_share, crs):
+            ids.append(fid)
+            yield parcel
+
+    try:
+        union_geom = union_geometries(hits())
+    except IsedError:
+        raise IsedError("Buffer spomenika ne pokrije nobene parcele nad pragom.")
+    influence = union_geom.difference(monument_geom)
+    if influence.isEmpty():
+        raise IsedError("Rezultat obrezovanja je prazen.")
+    return influence, ids
+
+
+def clip_vod(layer, zone_feature):
+    """Iz vseh poligonov sloja, ki sekajo cono VOD, izreže cono."""
+    base_geom = zone_feature.geometry()
+    edits = EditSet()
+    request = geometry_request(QgsFeatureRequest().setFilterRect(base_geom.boundingBox()))
+    for feat in layer.getFeatures(request):
+        if feat.id() == zone_feature.id():
+            continue
+        geom = feat.geometry()
+        instrument.count_geometry(geom)
+        if geom.intersects(base_geom):
+            clipped = geom.difference(base_geom)
+            if not clipped.isEmpty():
+                edits.changed[feat.id()] = clipped
+    return edits
+
+
+def _first_with_edit_type(layer, value):
+    for f in layer.getFeatures():
+        if f.attribute(EDIT_TYPE_FIELD) == value:
+            return f
+    return None
+
+
+def monument_feature(layer):
+    """Izbrani spomenik (edit_type 1) ali prvi spomenik v sloju."""
+    request = QgsFeatureRequest().setFilterExpression('"' + EDIT_TYPE_FIELD + '" = ' + str(EDIT_MONUMENT))
+    for f in layer.getSelectedFeatures(request):
+        return f
+    return _first_with_edit_type(layer, EDIT_MONUMENT)
+
+
+def clip_influence(layer):
+    """Iz vplivnega območja (edit_type 3) izreže spomenik (edit_type 1)."""
+    if not has_edit_type(layer):
+        raise IsedError("Sloj nima polja 'edit_type'.")
+    feat3 = _first_with_edit_type(layer, EDIT_INFLUENCE)
+    if not feat3:
+        raise IsedError("Ni poligona z edit_type = 3 (vplivno območje).")
+    feat1 = _first_with_edit_type(layer, EDIT_MONUMENT)
+    if not feat1:
+        raise IsedError("Ni poligona z edit_type = 1 (osnovno območje).")
+    geom3 = feat3.geometry()
+    geom1 = feat1.geometry()
+    instrument.count_geometry(geom3)
+    instrument.count_geometry(geom1)
+    clipped = geom3.difference(geom1)
+    if clipped.isEmpty():
+        raise IsedError("Rezultat obrezovanja je prazen.")
+    edits = EditSet()
+    edits.changed[feat3.id()] = clipped
+    return edits
+
+
+# ---------------- Izbor parcel ----------------
+def parcel_pairs_expression(ko_field, parc_field, pairs, chunk=500):
+    """Izraz za izbor parcel po parih (KO, številka parcele)."""
+    from collections import defaultdict
+    grouped = defaultdict(list)
+    for ko, p in pairs:
+        grouped[str(ko)].append(str(p))
+
+    clauses = []
+    for ko_val, plist in grouped.items():
+        for i in range(0, len(plist), chunk):
+            part = plist[i:i + chunk]
+            # zgradi varno seznam vrednosti, brez problematičnih escape-ov v f-string
+            vals = []
+            for v in part:
+                vals.append("'" + v.replace("'", "''") + "'")
+            values = ",".join(vals)
+            clause = "(" + "\"" + ko_field + "\"" + " = " + str(ko_val) + " AND " + "\"" + parc_field + "\"" + " IN (" + values + "))"
+            clauses.append(clause)
+    return " OR ".join(clauses)
+
+
+def select_parcels_by_pairs(layer, ko_field, parc_field, pairs):
+    """Izbere parcele po parih (KO, parcela). Vrne število izbranih."""
+    expr = parcel_pairs_expression(ko_field, parc_field, pairs)
+    if not expr:
+        layer.removeSelection()
+        return 0
+    try:
+        layer.selectByExpression(expr)
+    except Exception as e:
+        layer.removeSelection()
+        target = set((str(ko), str(p)) for ko, p in pairs)
+        idx_ko = layer.fields().indexOf(ko_field)
+        idx_parc = layer.fields().indexOf(parc_field)
+        if idx_ko < 0 or idx_parc < 0:
+            raise e
+        ids = []
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([idx_ko, idx_parc])
+        for feat in layer.getFeatures(request):
+            try:
+                ko_val = str(feat.attribute(idx_ko))
+                p_val = str(feat.attribute(idx_parc))
+                if (ko_val, p_val) in target:
+                    ids.append(feat.id())
+            except Exception:
+                continue
+        layer.selectByIds(ids)
+    return layer.selectedFeatureCount()
+
+
+# ---------------- Izvoz ----------------
+def memory_copy(layer, name=None):
+    """Kopija sloja v pomnilniku (za spremembe, ki naj ne vplivajo na izvirnik)."""
+    from qgis.core import QgsVectorLayer, QgsWkbTypes
+    uri = QgsWkbTypes.displayString(layer.wkbType()) + "?crs=" + crs_uri(layer.crs())
+    copy = QgsVectorLayer(uri, name or layer.name(), "memory")
+    pr = copy.dataProvider()
+    pr.addAttributes(layer.fields().toList())
+    copy.updateFields()
+    pr.addFeatures(list(layer.getFeatures()))
+    copy.updateExtents()
+    return copy
+
+
+def export_shp_zip(layer, out_path):
+    """Zapiše sloj v shapefile in ga zapakira v ZIP. Vrne pot do ZIP."""
+    import zipfile
+    from qgis.core import QgsVectorFileWriter
+    instrument.count_features(layer.featureCount())
+    attributes = [i for i, fld in enumerate(layer.fields()) if fld.name() not in INTERNAL_FIELDS]
+    try:
+        QgsVectorFileWriter.writeAsVectorFormat(layer, out_path, "UTF-8", layer.crs(), "ESRI Shapefile",
+                                                attributes=attributes)
+    except Exception as e:
+        raise IsedError("Napaka pri izvozu shapefile:\n" + str(e))
+    if not os.path.exists(out_path):
+        raise IsedError("Datoteka .shp ni nastala (izvoz ni uspel).")
+    shp_dir = os.path.dirname(out_path)
+    shp_base = os.path.splitext(os.path.basename(out_path))[0]
+    files_to_zip = []
+    for ext in SHP_EXTENSIONS:
+        f = os.path.join(shp_dir, shp_base + "." + ext)
+        if os.path.exists(f):
+            files_to_zip.append(f)
+    if not files_to_zip:
+        raise IsedError("Ni izvoznih datotek za ZIP.")
+    zip_path = os.path.join(shp_dir, shp_base + ".zip")
+    try:
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for file_path in files_to_zip:
+                zf.write(file_path, os.path.basename(file_path))
+    except Exception as e:
+        raise IsedError("Napaka pri ZIP:\n" + str(e))
+    return zip_path
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – zaznavanje dvojnikov in gnezdenih poligonov pred vnosom v ISeD
+
+Kandidat se primerja le z zapisi v njegovem obsegu (prostorski indeks
+ponudnika) in z istim edit_type. Enake geometrije se najprej prepoznajo po
+zgoščeni vrednosti, ostali odnosi (vsebovan, vsebuje, večinsko prekrivanje)
+pa s pripravljeno geometrijo kandidata. Odnos je zapisan s stališča
+obstoječega zapisa: CONTAINS pomeni, da obstoječi zapis vsebuje kandidata.
+
+Zamenjava briše le enake in v kandidatu vsebovane zapise, zato se ponudi le,
+če tak zapis obstaja; večji ali le prekrivajoči se zapisi ostanejo.
+Združitev ohrani izvor vseh zapisov.
+"""
+
+from qgis.core import QgsGeometry, QgsFeatureRequest
+
+from . import core
+from .provenance import geometry_hash, merge_sources
+
+IDENTICAL = "enak"
+CONTAINED = "vsebovan"
+CONTAINS = "vsebuje"
+OVERLAP = "prekriva"
+
+# delež manjšega poligona, nad katerim prekrivanje štejemo za dvojnik
+OVERLAP_SHARE = 0.8
+
+ACTION_SKIP = "Preskoči (ne dodaj)"
+ACTION_MERGE = "Združi z obstoječimi"
+ACTION_REPLACE = "Zamenjaj obstoječe"
+ACTION_ADD = "Vseeno dodaj"
+ACTIONS = [ACTION_SKIP, ACTION_MERGE, ACTION_REPLACE, ACTION_ADD]
+
+
+class Match:
+    def __init__(self, fid, kind, share, geom):
+        self.fid = fid
+        self.kind = kind
+        self.share = share
+        self.geom = geom
+
+
+def find_matches(layer, geom, edit_type=None, share=OVERLAP_SHARE):
+    """Obstoječi zapisi, ki so enaki, vsebujejo, so vsebovani ali se večinsko prekrivajo."""
+    request = QgsFeatureRequest().setFilterRect(geom.boundingBox())
+    if edit_type is not None and core.has_edit_type(layer):
+        request.setFilterExpression('"' + core.EDIT_TYPE_FIELD + '" = ' + str(int(edit_type)))
+        request.setSubsetOfAttributes([core.EDIT_TYPE_FIELD], layer.fields())
+    else:
+        request.setSubsetOfAttributes([])
+    key = geometry_hash(geom)
+    engine = None
+    area = geom.area()
+    matches = []
+    for f in layer.getFeatures(request):
+        if not f.hasGeometry():
+            continue
+        other = f.geometry()
+        if geometry_hash(other) == key:
+            matches.append(Match(f.id(), IDENTICAL, 1.0, other))
+            continue
+        if engine is None:
+            engine = QgsGeometry.createGeometryEngine(geom.constGet())
+            engine.prepareGeometry()
+        if not engine.intersects(other.constGet()):
+            continue
+        if engine.within(other.constGet()):
+            matches.append(Match(f.id(), CONTAINS, 1.0, other))
+        elif engine.contains(other.constGet()):
+            matches.append(Match(f.id(), CONTAINED, 1.0, other))
+        else:
+            inter = engine.intersection(other.constGet())
+            smaller = min(area, other.area())
+            overlap = QgsGeometry(inter).area() / smaller if inter is not None and smaller > 0 else 0.0
+            if overlap >= share:
+                matches.append(Match(f.id(), OVERLAP, overlap, other))
+    return matches
+
+
+def describe(matches):
+    parts = []
+    for m in matches:
+        text = "ID " + str(m.fid) + ": " + m.kind
+        if m.kind == OVERLAP:
+            text += " (%.0f %%)" % (m.share * 100.0)
+        parts.append(text)
+    return "\n".join(parts)
+
+
+def replaceable(matches):
+    """Zapisi, ki jih novi poligon v celoti pokrije (le te zamenjava izbriše)."""
+    return [m.fid for m in matches if m.kind in (IDENTICAL, CONTAINED)]
+
+
+def actions_for(matches):
+    """Ponujene akcije; zamenjava le, če je kaj za zamenjati."""
+    if replaceable(matches):
+        return list(ACTIONS)
+    return [a for a in ACTIONS if a != ACTION_REPLACE]
+
+
+def resolve(edits, matches, action, layer=None):
+    """Prilagodi nabor sprememb izbrani akciji; vrne nov EditSet."""
+    if not matches or action == ACTION_ADD:
+        return edits
+    out = core.EditSet()
+    if action == ACTION_SKIP:
+        return out
+    feature = edits.added[0]
+    if action == ACTION_MERGE:
+        out.deleted = [m.fid for m in matches]
+        feature.setGeometry(core.union_geometries([feature.geometry()] + [m.geom for m in matches]))
+        if layer is not None:
+            feature = merge_sources(feature, layer, out.deleted)
+    else:
+        # zamenjamo le zapise, ki jih novi poligon v celoti pokrije
+        out.deleted = replaceable(matches)
+    out.added.append(feature)
+    return out
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – naslovi GURS servisov
+
+Privzeto se uporabljajo javni servisi ipi.eprostor.gov.si. Naslove lahko
+prepišemo z nastavitvami QGIS (ISeD/gurs_wfs_url, ISeD/gurs_wms_url) ali s
+spremenljivkama okolja ISED_GURS_WFS_URL in ISED_GURS_WMS_URL, npr. za
+lokalni nadomestni strežnik (benchmarks/gurs_mock.py).
+"""
+
+import os
+import re
+import urllib.parse
+
+DEFAULT_WFS_URL = "https://ipi.eprostor.gov.si/wfs-si-gurs-kn/wfs"
+DEFAULT_WMS_URL = "https://ipi.eprostor.gov.si/wms-si-gurs-dts/wms"
+
+PARCELS_TYPENAME = "SI.GURS.KN:PARCELE"
+BUILDINGS_TYPENAME = "SI.GURS.KN:STAVBE_OBRIS"
+CRS = "EPSG:3794"
+
+SETTINGS_WFS = "ISeD/gurs_wfs_url"
+SETTINGS_WMS = "ISeD/gurs_wms_url"
+SETTINGS_PAGE_SIZE = "ISeD/gurs_page_size"
+
+
+def _setting(key, default=None):
+    try:
+        from qgis.core import QgsSettings
+        value = QgsSettings().value(key, default)
+    except Exception:
+        return default
+    return value if value not in (None, "") else default
+
+
+def wfs_url():
+    return os.environ.get("ISED_GURS_WFS_URL") or _setting(SETTINGS_WFS, DEFAULT_WFS_URL)
+
+
+def wms_url():
+    return os.environ.get("ISED_GURS_WMS_URL") or _setting(SETTINGS_WMS, DEFAULT_WMS_URL)
+
+
+def page_size():
+    value = os.environ.get("ISED_GURS_PAGE_SIZE") or _setting(SETTINGS_PAGE_SIZE)
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def wfs_uri(typename, url=None, restrict_bbox=True):
+    """URI za QGIS WFS ponudnika (z ostranjevanjem, privzeto omejeno na BBOX karte)."""
+    uri = "pagingEnabled='true' "
+    if restrict_bbox:
+        uri += "restrictToRequestBBOX='1' "
+    uri += (
+        "srsname='" + CRS + "' "
+        "typename='" + typename + "' "
+        "url='" + (url or wfs_url()) + "' "
+        "version='auto'"
+    )
+    size = page_size()
+    if size:
+        uri += " pageSize='" + str(size) + "'"
+    return uri
+
+
+def hits_url(typename, extent, url=None):
+    """GetFeature z resultType=hits: strežnik vrne le število zapisov v obsegu (v CRS)."""
+    base = url or wfs_url()
+    bbox = "%f,%f,%f,%f,urn:ogc:def:crs:%s" % (
+        extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum(), CRS.replace(":", "::"))
+    query = urllib.parse.urlencode({
+        'SERVICE': 'WFS', 'VERSION': '2.0.0', 'REQUEST': 'GetFeature',
+        'TYPENAMES': typename, 'RESULTTYPE': 'hits', 'BBOX': bbox,
+    })
+    return base + ('&' if '?' in base else '?') + query
+
+
+def count_matched(typename, extent, url=None, feedback=None):
+    """Število zapisov v obsegu (numberMatched) ali None, če ga strežnik ne javi."""
+    from qgis.core import QgsBlockingNetworkRequest
+    from qgis.PyQt.QtCore import QUrl
+    from qgis.PyQt.QtNetwork import QNetworkRequest
+    request = QgsBlockingNetworkRequest()
+    if request.get(QNetworkRequest(QUrl(hits_url(typename, extent, url))), False, feedback) \
+            != QgsBlockingNetworkRequest.NoError:
+        return None
+    text = bytes(request.reply().content()).decode('utf-8', 'replace')
+    match = re.search(r'numberMatched="(\d+)"', text)
+    return int(match.group(1)) if match else None
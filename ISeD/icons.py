@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – ikone gumbov
+
+SVG ikone se obarvajo z enim samim slikanjem (CompositionMode_SourceIn),
+brez zanke po pikslih. Izrisane ikone se hranijo v pomnilniku in na disku;
+ključ predpomnilnika je (mtime datoteke, barva, velikost, device pixel ratio).
+"""
+
+import os
+import hashlib
+
+from qgis.PyQt.QtCore import Qt, QSize, QRectF
+from qgis.PyQt.QtGui import QIcon, QPixmap, QPainter, QImage, QColor
+
+DEFAULT_COLOR = '#143845'
+DEFAULT_SIZE = QSize(16, 16)
+
+# device pixel ratio, za katere vedno pripravimo različico (HiDPI)
+_BASE_RATIOS = (1.0, 2.0)
+
+_memory_cache = {}
+
+
+def _disk_cache_dir():
+    try:
+        from qgis.core import QgsApplication
+        base = QgsApplication.qgisSettingsDirPath()
+    except Exception:
+        base = os.path.join(os.path.expanduser('~'), '.ised')
+    path = os.path.join(base, 'cache', 'ised_icons')
+    try:
+        os.makedirs(path, exist_ok=True)
+    except Exception:
+        return None
+    return path
+
+
+def _cache_key(path, color, size, ratio):
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = 0
+    return (os.path.abspath(path), int(mtime * 1000), QColor(color).name(QColor.HexArgb),
+            size.width(), size.height(), float(ratio))
+
+
+def _disk_name(key):
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return digest + '.png'
+
+
+def tint_svg(svg_path, color, size, ratio=1.0):
+    """Izriše SVG v izbrani velikosti in ga obarva z eno compositing operacijo."""
+    from qgis.PyQt.QtSvg import QSvgRenderer
+    w = max(1, int(round(size.width() * ratio)))
+    h = max(1, int(round(size.height() * ratio)))
+    img = QImage(w, h, QImage.Format_ARGB32_Premultiplied)
+    img.fill(Qt.transparent)
+    painter = QPainter(img)
+    painter.setRenderHint(QPainter.Antialiasing, True)
+    QSvgRenderer(svg_path).render(painter, QRectF(0, 0, w, h))
+    # ohrani alfa kanal izrisa, barvo zamenjaj s ciljno
+    painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+    painter.fillRect(img.rect(), QColor(color))
+    painter.end()
+    pix = QPixmap.fromImage(img)
+    pix.setDevicePixelRatio(ratio)
+    return pix
+
+
+def _tinted_pixmap(svg_path, color, size, ratio):
+    key = _cache_key(svg_path, color, size, ratio)
+    pix = _memory_cache.get(key)
+    if pix is not None:
+        return pix
+    cache_dir = _disk_cache_dir()
+    disk_path = os.path.join(cache_dir, _disk_name(key)) if cache_dir else None
+    if disk_path and os.path.exists(disk_path):
+        pix = QPixmap(disk_path)
+        if not pix.isNull():
+            pix.setDevicePixelRatio(ratio)
+            _memory_cache[key] = pix
+            return pix
+    pix = tint_svg(svg_path, color, size, ratio)
+    if disk_path:
+        try:
+            pix.save(disk_path, 'PNG')
+        except Exception:
+            pass
+    _memory_cache[key] = pix
+    return pix
+
+
+def _ratios(extra_ratio=None):
+    ratios = list(_BASE_RATIOS)
+    if extra_ratio and float(extra_ratio) not in ratios:
+        ratios.append(float(extra_ratio))
+    return ratios
+
+
+def tinted_icon(svg_path, color=DEFAULT_COLOR, size=DEFAULT_SIZE, device_ratio=None):
+    """Vrne QIcon z obarvanimi različicami za 1x, 2x in trenutni DPR zaslona."""
+    icon_key = ('icon', os.path.abspath(svg_path), QColor(color).name(QColor.HexArgb),
+                size.width(), size.height(), device_ratio)
+    mtime_key = _cache_key(svg_path, color, size, 1.0)[1]
+    cached = _memory_cache.get(icon_key)
+    if cached is not None and cached[0] == mtime_key:
+        return cached[1]
+    icon = QIcon()
+    for ratio in _ratios(device_ratio):
+        icon.addPixmap(_tinted_pixmap(svg_path, color, size, ratio))
+    _memory_cache[icon_key] = (mtime_key, icon)
+    return icon
+
+
+def find_icon(icons_dir, name, color=DEFAULT_COLOR, size=DEFAULT_SIZE, device_ratio=None):
+    """Poišče ikono po imenu (png, svg, ico). Vrne None, če je ni."""
+    png_path = os.path.join(icons_dir, name + ".png")
+    if os.path.exists(png_path):
+        return QIcon(png_path)
+    svg_path = os.path.join(icons_dir, name + ".svg")
+    if os.path.exists(svg_path):
+        try:
+            return tinted_icon(svg_path, color, size, device_ratio)
+        except Exception:
+            return QIcon(svg_path)
+    ico_path = os.path.join(icons_dir, name + ".ico")
+    if os.path.exists(ico_path):
+        return QIcon(ico_path)
+    return None
+
+
+def clear_cache(disk=False):
+    """Počisti predpomnilnik ikon (in po želji še datoteke na disku)."""
+    _memory_cache.clear()
+    if not disk:
+        return
+    cache_dir = _disk_cache_dir()
+    if not cache_dir:
+        return
+    for fname in os.listdir(cache_dir):
+        if fname.endswith('.png'):
+            try:
+                os.remove(os.path.join(cache_dir, fname))
+            except OSError:
+                pass
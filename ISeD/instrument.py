@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – meritve orodij
+
+Vsak zagon orodja se izmeri: čas (stenski in CPU), število geometrij in
+vozlišč ter omrežni promet in zakasnitev vseh zahtev prek
+QgsNetworkAccessManager. Največja poraba pomnilnika (tracemalloc, samo
+Python del) in cProfile posnetek sta neobvezna, ker upočasnita izvajanje.
+Rezultati gredo poslušalcem (dnevnik v docku) in v rotirajočo JSON datoteko.
+
+Trenutni zagon je vezan na nit. Orodje, ki zažene QgsTask, zagon preda
+opravilu (handoff); opravilo ga v run() aktivira v svoji niti (activate) in
+ga v finished() zaključi (finish), zato meritev zajame celotno opravilo.
+"""
+
+import os
+import json
+import time
+import logging
+import logging.handlers
+import threading
+import tracemalloc
+import contextlib
+
+LOG_NAME = 'meritve.jsonl'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+
+# sklad merjenih zagonov za vsako nit posebej
+_local = threading.local()
+_listeners = []
+_logger = None
+_profile_enabled = False
+_memory_enabled = False
+
+
+def _runs():
+    runs = getattr(_local, 'runs', None)
+    if runs is None:
+        runs = _local.runs = []
+    return runs
+
+
+def log_dir():
+    try:
+        from qgis.core import QgsApplication
+        base = QgsApplication.qgisSettingsDirPath()
+    except Exception:
+        base = os.path.join(os.path.expanduser('~'), '.ised')
+    path = os.path.join(base, 'ised_logs')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _json_logger():
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger('ISeD.meritve')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir(), LOG_NAME), maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+        except Exception:
+            pass
+        _logger = logger
+    return _logger
+
+
+def set_profiling(enabled):
+    global _profile_enabled
+    _profile_enabled = bool(enabled)
+
+
+def profiling_enabled():
+    return _profile_enabled
+
+
+def set_memory_tracing(enabled):
+    global _memory_enabled
+    _memory_enabled = bool(enabled)
+
+
+def memory_tracing_enabled():
+    return _memory_enabled
+
+
+def add_listener(fn):
+    if fn not in _listeners:
+        _listeners.append(fn)
+
+
+def remove_listener(fn):
+    if fn in _listeners:
+        _listeners.remove(fn)
+
+
+class _NetworkMonitor:
+    """Šteje bajte in zakasnitev zahtev QgsNetworkAccessManager med zagonom."""
+    def __init__(self, run):
+        self.run = run
+        self._started = {}
+        self._received = {}
+        self._connections = []
+
+    def start(self):
+        try:
+            from qgis.core import QgsNetworkAccessManager
+        except ImportError:
+            return self
+        nam = QgsNetworkAccessManager.instance()
+        for signal, slot in ((nam.requestAboutToBeCreated, self._on_request),
+                             (nam.downloadProgress, self._on_progress),
+                             (nam.finished, self._on_finished)):
+            signal.connect(slot)
+            self._connections.append((signal, slot))
+        return self
+
+    def stop(self):
+        if not self._connections:
+            return
+        try:
+            # signali zahtev iz drugih niti pridejo v vrsto dogodkov
+            from qgis.PyQt.QtCore import QCoreApplication
+            QCoreApplication.processEvents()
+        except ImportError:
+            pass
+        for signal, slot in self._connections:
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        self._connections = []
+
+    def _on_request(self, params):
+        self._started[params.requestId()] = time.perf_counter()
+
+    def _on_progress(self, request_id, received, total):
+        self._received[request_id] = max(self._received.get(request_id, 0), received)
+
+    def _on_finished(self, reply):
+        request_id = reply.requestId()
+        t0 = self._started.pop(request_id, None)
+        if t0 is None:
+            return
+        self.run.add_network(self._received.pop(request_id, 0), time.perf_counter() - t0)
+
+
+class ToolRun:
+    """Meritev enega zagona orodja (uporaba kot context manager)."""
+    def __init__(self, name, profile=None, memory=None):
+        self.name = name
+        self.profile = _profile_enabled if profile is None else profile
+        self.memory = _memory_enabled if memory is None else memory
+        self.features = 0
+        self.vertices = 0
+        self.net_calls = 0
+        self.net_bytes = 0
+        self.net_latency = 0.0
+        self.error = None
+        self.record = None
+        self._profiler = None
+        self._own_tracemalloc = False
+        self._network = None
+        self._deferred = False
+        self._done = False
+
+    def add_network(self, nbytes, latency):
+        self.net_calls += 1
+        self.net_bytes += int(nbytes or 0)
+        self.net_latency += float(latency or 0.0)
+
+    def __enter__(self):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracemalloc = True
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self._mem_start = tracemalloc.get_traced_memory()[0]
+        self._network = _NetworkMonitor(self).start()
+        if self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        _runs().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        runs = _runs()
+        if runs and runs[-1] is self:
+            runs.pop()
+        if exc is None and self._deferred:
+            # zagon je predan opravilu, ki ga zaključi v finished()
+            return False
+        self.finish(str(exc) if exc is not None else None)
+        return False
+
+    def finish(self, error=None):
+        """Zaključi meritev in objavi zapis (v glavni niti)."""
+        if self._done:
+            return
+        self._done = True
+        wall = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._c0
+        if self._profiler is not None:
+            self._profiler.disable()
+        self._network.stop()
+        peak = None
+        if self.memory and tracemalloc.is_tracing():
+            peak = max(0, tracemalloc.get_traced_memory()[1] - self._mem_start)
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        if error is not None:
+            self.error = error
+        self.record = {
+            'tool': self.name,
+            'start': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(time.time() - wall)),
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'features': self.features,
+            'vertices': self.vertices,
+            'net_calls': self.net_calls,
+            'net_bytes': self.net_bytes,
+            'net_latency_s': round(self.net_latency, 4),
+            'peak_mem_bytes': peak,
+            'error': self.error,
+        }
+        if self._profiler is not None:
+            prof_path = os.path.join(log_dir(), self.name + '_' + time.strftime('%Y%m%d_%H%M%S') + '.prof')
+            try:
+                self._profiler.dump_stats(prof_path)
+                self.record['profile'] = prof_path
+            except Exception:
+                pass
+        _publish(self.record)
+
+
+def _publish(record):
+    try:
+        _json_logger().info(json.dumps(record, ensure_ascii=False))
+    except Exception:
+        pass
+    for fn in list(_listeners):
+        try:
+            fn(record)
+        except Exception:
+            pass
+
+
+def current():
+    """Trenutno merjeni zagon v tej niti ali None."""
+    runs = _runs()
+    return runs[-1] if runs else None
+
+
+def handoff():
+    """Preda trenutni zagon opravilu; vrne ga (ali None), zaključi ga opravilo s finish()."""
+    run = current()
+    if run is not None:
+        run._deferred = True
+    return run
+
+
+@contextlib.contextmanager
+def activate(run):
+    """Zagon (predan z handoff) je trenuten v tej niti, npr. v QgsTask.run()."""
+    if run is None:
+        yield None
+        return
+    runs = _runs()
+    runs.append(run)
+    try:
+        yield run
+    finally:
+        if runs and runs[-1] is run:
+            runs.pop()
+
+
+def run_tool(name, fn, *args, **kwargs):
+    with ToolRun(name):
+        return fn(*args, **kwargs)
+
+
+def count_features(n=1):
+    run = current()
+    if run is not None:
+        run.features += n
+
+
+def count_geometry(geom):
+    """Prišteje geometrijo in njena vozlišča trenutnemu zagonu."""
+    run = current()
+    if run is None or geom is None:
+        return
+    run.features += 1
+    try:
+        run.vertices += geom.constGet().nCoordinates()
+    except Exception:
+        pass
+
+
+def record_network(nbytes, latency):
+    """Promet mimo QgsNetworkAccessManager (npr. knjižnica requests)."""
+    run = current()
+    if run is not None:
+        run.add_network(nbytes, latency)
+
+
+def format_record(record):
+    """Kratek opis zagona za dnevnik v docku."""
+    text = (record['start'] + "  " + record['tool'] +
+            ": %.2f s (CPU %.2f s), geometrij %d, vozlišč %d" % (
+                record['wall_s'], record['cpu_s'], record['features'], record['vertices']))
+    if record['net_calls']:
+        text += ", omrežje %d klicev / %.1f kB / %.2f s" % (
+            record['net_calls'], record['net_bytes'] / 1024.0, record['net_latency_s'])
+    if record.get('peak_mem_bytes') is not None:
+        text += ", pomnilnik %.1f MB" % (record['peak_mem_bytes'] / (1024.0 * 1024.0))
+    if record.get('error'):
+        text += "  NAPAKA: " + record['error']
+    if record.get('profile'):
+        text += "  [profil: " + record['profile'] + "]"
+    return text
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – lokalna kopija slojev GURS WFS
+
+Sloja parcel in stavb iz GURS sta živa WFS ponudnika: vsak izbor, pregled
+zapisov ali premik karte lahko sproži nov prenos. Pred zahtevnejšim delom
+ju "zamrznemo" v GeoPackage (ali pomnilniški sloj) s prostorskim indeksom
+in indeksoma na KO in številki parcele ter ju zamenjamo v projektu.
+Tabela sloja, ki je že zamrznjen in še v projektu, se ne prepiše: nova kopija
+dobi novo ime tabele. Izbor parcel in stavb se po zamenjavi obnovi.
+"""
+
+import os
+import re
+
+from qgis.core import (
+    QgsVectorLayer, QgsVectorFileWriter, QgsVectorDataProvider,
+    QgsFeatureRequest, QgsMapLayerStyle
+)
+
+from . import core
+from . import instrument
+
+GPKG_NAME = "ised_gurs_lokalno.gpkg"
+LOCAL_SUFFIX = " (GURS lokalno)"
+SETTINGS_AUTO = "ISeD/freeze_after_download"
+ADD_CHUNK = 5000
+
+
+def is_remote(layer):
+    return isinstance(layer, QgsVectorLayer) and layer.providerType() == "WFS"
+
+
+def remote_layers(project):
+    """WFS sloji parcel in stavb v projektu."""
+    out = []
+    for lyr in project.mapLayers().values():
+        name = lyr.name().lower()
+        if is_remote(lyr) and ("parcele" in name or "stavbe" in name):
+            out.append(lyr)
+    return out
+
+
+def auto_freeze_enabled():
+    try:
+        from qgis.core import QgsSettings
+        return str(QgsSettings().value(SETTINGS_AUTO, "false")).lower() in ("1", "true", "yes")
+    except Exception:
+        return False
+
+
+def default_path(project):
+    """GeoPackage ob shranjenem projektu, sicer v mapi predpomnilnika QGIS."""
+    home = project.homePath() if project is not None else ""
+    if home and os.path.isdir(home):
+        return os.path.join(home, GPKG_NAME)
+    from qgis.core import QgsApplication
+    cache_dir = os.path.join(QgsApplication.qgisSettingsDirPath(), "cache", "ised_local")
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, GPKG_NAME)
+
+
+def _table_name(layer):
+    base = re.sub(r"\(.*?\)", "", layer.name()).strip().lower()
+    return re.sub(r"[^0-9a-z_]+", "_", base).strip("_") or "gurs"
+
+
+def _local_name(layer):
+    return re.sub(r"\s*\(GURS WFS\)\s*$", "", layer.name()) + LOCAL_SUFFIX
+
+
+def layer_extent(layer, extent, extent_crs, project):
+    """Obseg (npr. karte) v koordinatnem sistemu sloja."""
+    if extent is None:
+        return None
+    if extent_crs is None:
+        return extent
+    xform = core.transform_for(extent_crs, layer.crs())
+    return extent if xform is None else xform.transformBoundingBox(extent)
+
+
+# ---------------- Zapis ----------------
+def _layer_table(layer):
+    """(pot, tabela) GeoPackage sloja ali (None, None)."""
+    if not isinstance(layer, QgsVectorLayer) or layer.providerType() != "ogr":
+        return None, None
+    path, _, rest = layer.source().partition("|")
+    table = None
+    for part in rest.split("|"):
+        key, _, value = part.partition("=")
+        if key.strip().lower() == "layername":
+            table = value.strip()
+    return os.path.normcase(os.path.abspath(path)), table
+
+
+def _free_table(project, path, table):
+    """Ime tabele, ki je ne uporablja noben sloj v projektu (table, table_2 ...)."""
+    path = os.path.normcase(os.path.abspath(path))
+    used = set()
+    for lyr in project.mapLayers().values():
+        lyr_path, lyr_table = _layer_table(lyr)
+        if lyr_path == path:
+            used.add(lyr_table)
+    name = table
+    n = 1
+    while name in used:
+        n += 1
+        name = table + "_" + str(n)
+    return name
+
+
+def _write_gpkg(layer, path, table, extent):
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = table
+    options.fileEncoding = "UTF-8"
+    options.layerOptions = ["SPATIAL_INDEX=YES"]
+    if os.path.exists(path):
+        options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+    if extent is not None:
+        options.filterExtent = extent
+    if hasattr(QgsVectorFileWriter, "writeAsVectorFormatV2"):
+        from qgis.core import QgsProject
+        result = QgsVectorFileWriter.writeAsVectorFormatV2(
+            layer, path, QgsProject.instance().transformContext(), options)
+    else:
+        result = QgsVectorFileWriter.writeAsVectorFormat(layer, path, options)
+    error = result[0] if isinstance(result, tuple) else result
+    if error != QgsVectorFileWriter.NoError:
+        message = result[1] if isinstance(result, tuple) and len(result) > 1 else str(error)
+        raise core.IsedError("Napaka pri zapisu lokalne kopije:\n" + str(message))
+    local = QgsVectorLayer(path + "|layername=" + table, _local_name(layer), "ogr")
+    if not local.isValid():
+        raise core.IsedError("Lokalna kopija ni veljavna: " + path)
+    return local
+
+
+def _write_memory(layer, extent):
+    from qgis.core import QgsWkbTypes
+    uri = QgsWkbTypes.displayString(layer.wkbType()) + "?crs=" + core.crs_uri(layer.crs()) + "&index=yes"
+    local = QgsVectorLayer(uri, _local_name(layer), "memory")
+    pr = local.dataProvider()
+    pr.addAttributes(layer.fields().toList())
+    local.updateFields()
+    request = QgsFeatureRequest()
+    if extent is not None:
+        request.setFilterRect(extent)
+    chunk = []
+    for f in layer.getFeatures(request):
+        chunk.append(f)
+        if len(chunk) >= ADD_CHUNK:
+            pr.addFeatures(chunk)
+            chunk = []
+    if chunk:
+        pr.addFeatures(chunk)
+    local.updateExtents()
+    return local
+
+
+def _create_indexes(local):
+    pr = local.dataProvider()
+    caps = pr.capabilities()
+    if caps & QgsVectorDataProvider.CreateSpatialIndex:
+        pr.createSpatialIndex()
+    if caps & QgsVectorDataProvider.CreateAttributeIndex:
+        for name in core.detect_parcel_fields(local):
+            if name is not None:
+                pr.createAttributeIndex(local.fields().indexOf(name))
+
+
+def prefetch(layer, extent, extent_crs):
+    """Prenese zapise WFS sloja v obsegu; ponudnik jih shrani za izris. Vrne število."""
+    request = QgsFeatureRequest().setFilterRect(layer_extent(layer, extent, extent_crs, None))
+    count = 0
+    for _ in layer.getFeatures(core.geometry_request(request)):
+        count += 1
+    instrument.count_features(count)
+    return count
+
+
+def freeze_layer(layer, extent=None, extent_crs=None, path=None, project=None):
+    """Kopira WFS sloj v lokalni sloj z indeksi in ga vrne.
+
+    extent omeji kopijo na območje (v extent_crs, npr. obseg karte); brez
+    njega bi WFS z restrictToRequestBBOX prenesel celoten sloj. Če path ni
+    podan, nastane pomnilniški sloj (brez atributnih indeksov).
+    """
+    rect = layer_extent(layer, extent, extent_crs, project)
+    if path:
+        if project is None:
+            from qgis.core import QgsProject
+            project = QgsProject.instance()
+        src_path, _ = _layer_table(layer)
+        if src_path == os.path.normcase(os.path.abspath(path)):
+            raise core.IsedError("Sloj '" + layer.name() + "' je že lokalna kopija.")
+        # tabele zamrznjenega sloja, ki je še v projektu, ne prepišemo
+        local = _write_gpkg(layer, path, _free_table(project, path, _table_name(layer)), rect)
+    else:
+        local = _write_memory(layer, rect)
+    _create_indexes(local)
+    instrument.count_features(local.featureCount())
+    return local
+
+
+# ---------------- Zamenjava v projektu ----------------
+def _selected_pairs(layer):
+    """Izbor kot pari (KO, parcela) ali (KO, stavba); ID-ji se po zamenjavi ne ohranijo."""
+    if layer.selectedFeatureCount() == 0:
+        return None, None, []
+    ko_field, parc_field = core.detect_parcel_fields(layer)
+    if ko_field is None or parc_field is None:
+        ko_field, parc_field = core.detect_building_fields(layer)
+    if ko_field is None or parc_field is None:
+        return None, None, []
+    request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes([ko_field, parc_field], layer.fields())
+    pairs = [(f[ko_field], f[parc_field]) for f in core.iter_selected(layer, request)]
+    return ko_field, parc_field, pairs
+
+
+def swap_into_project(project, old, new):
+    """Lokalni sloj postavi na mesto WFS sloja (slog, vidnost, izbor)."""
+    style = QgsMapLayerStyle()
+    style.readFromLayer(old)
+    style.writeToLayer(new)
+    new.setScaleBasedVisibility(old.hasScaleBasedVisibility())
+    new.setMaximumScale(old.maximumScale())
+    new.setMinimumScale(old.minimumScale())
+    ko_field, parc_field, pairs = _selected_pairs(old)
+
+    root = project.layerTreeRoot()
+    node = root.findLayer(old.id())
+    project.addMapLayer(new, False)
+    if node is not None:
+        parent = node.parent()
+        parent.insertLayer(parent.children().index(node), new)
+    else:
+        root.insertLayer(0, new)
+    project.removeMapLayer(old.id())
+
+    if pairs:
+        core.select_parcels_by_pairs(new, ko_field, parc_field, pairs)
+    return new
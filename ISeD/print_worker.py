@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – proces za vzporedni izris listov (brez GUI)
+
+Uporaba: python -m ISeD.print_worker naloga.json
+Naloga vsebuje pot do projekta, ID ISeD sloja, posnetek sloja (GeoPackage),
+zaporedne številke spomenikov, izhodno mapo in format. Vsaka dokončana stran
+se takoj izpiše kot "številka<TAB>pot".
+"""
+
+import sys
+import json
+
+
+def main(argv):
+    if len(argv) < 2:
+        sys.stderr.write("Uporaba: print_worker naloga.json\n")
+        return 2
+    with open(argv[1], encoding='utf-8') as f:
+        job = json.load(f)
+
+    from qgis.core import QgsApplication, QgsProject, QgsVectorLayer
+    app = QgsApplication([], False)
+    app.initQgis()
+    try:
+        from . import printing
+        project = QgsProject.instance()
+        if job.get('project'):
+            project.read(job['project'])
+        layer = project.mapLayer(job['layer_id'])
+        snapshot = QgsVectorLayer(job['snapshot'] + "|layername=ised", "ised", "ogr")
+        if not snapshot.isValid():
+            sys.stderr.write("Posnetek sloja ni veljaven: " + job['snapshot'] + "\n")
+            return 1
+        if layer is not None:
+            # ohrani slog in ime, podatke beri iz posnetka
+            layer.setDataSource(snapshot.source(), layer.name(), "ogr")
+        else:
+            project.addMapLayer(snapshot)
+            layer = snapshot
+        all_ids = [f.id() for f in layer.getFeatures()]
+        row_of = dict((all_ids[r], r) for r in job['rows'] if 0 <= r < len(all_ids))
+        fids = [all_ids[r] for r in job['rows'] if 0 <= r < len(all_ids)]
+
+        def report(fid, path):
+            # sproti: ob prekinitvi procesa so končane strani že javljene
+            sys.stdout.write(str(row_of[fid]) + "\t" + path + "\n")
+            sys.stdout.flush()
+
+        printing.render_pages(project, layer, fids, job['out_dir'],
+                              job.get('format', printing.FORMAT_PDF), job.get('dpi'), on_page=report)
+        return 0
+    finally:
+        app.exitQgis()
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – paketni izpis listov spomenikov
+
+Predloga Resources/tisk.qpt se prebere enkrat in poganja kot atlas čez
+ISeD sloj: ena stran na spomenik (edit_type = 1), karta zajame spomenik in
+njegovo vplivno območje (edit_type = 3). Strani se lahko izrišejo v več
+vzporednih procesih (print_worker), vsak proces izriše svoj del spomenikov.
+Stran se najprej zapiše v delno datoteko (.part) in se preimenuje, ko je
+izrisana; proces sproti javi vsako končano stran, zato je po preklicu znano,
+katere strani so na disku.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+from qgis.core import (
+    QgsPrintLayout, QgsReadWriteContext, QgsLayoutExporter,
+    QgsFeatureRequest, QgsRectangle, QgsVectorFileWriter
+)
+from qgis.PyQt.QtXml import QDomDocument
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), 'Resources', 'tisk.qpt')
+MAP_ITEM_ID = 'Karta'
+MONUMENT_TYPE = 1
+INFLUENCE_TYPE = 3
+PAGE_MARGIN = 0.1
+
+FORMAT_PDF = 'pdf'
+FORMAT_PNG = 'png'
+PARTIAL_SUFFIX = '.part'
+
+_template = {}
+
+
+def load_template(path=TEMPLATE_PATH):
+    """Vrne QDomDocument predloge; datoteka se prebere znova le ob spremembi."""
+    mtime = os.path.getmtime(path)
+    cached = _template.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    doc = QDomDocument()
+    with open(path, 'rb') as f:
+        parsed = doc.setContent(f.read())
+    ok = parsed[0] if isinstance(parsed, tuple) else bool(parsed)
+    if not ok:
+        raise ValueError("Neveljavna predloga: " + path)
+    _template[path] = (mtime, doc)
+    return doc
+
+
+def build_layout(project, layer):
+    """Zgradi postavitev iz tisk.qpt z atlasom čez podani ISeD sloj."""
+    layout = QgsPrintLayout(project)
+    layout.initializeDefaults()
+    items, ok = layout.loadFromTemplate(load_template(), QgsReadWriteContext())
+    if not ok:
+        raise RuntimeError("Predloge tisk.qpt ni bilo mogoče naložiti.")
+    atlas = layout.atlas()
+    atlas.setCoverageLayer(layer)
+    atlas.setEnabled(True)
+    atlas.setHideCoverage(False)
+    atlas.setFilterFeatures(True)
+    atlas.setFilterExpression('"edit_type" = ' + str(MONUMENT_TYPE))
+    map_item = layout.itemById(MAP_ITEM_ID)
+    if map_item is not None:
+        # obseg karte določimo sami (spomenik + vplivno območje)
+        map_item.setAtlasDriven(False)
+    return layout
+
+
+def monument_ids(layer):
+    """ID-ji vseh spomenikov (edit_type = 1) v sloju."""
+    request = QgsFeatureRequest().setFilterExpression('"edit_type" = ' + str(MONUMENT_TYPE))
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setNoAttributes()
+    return [f.id() for f in layer.getFeatures(request)]
+
+
+def page_extent(layer, feature, margin=PAGE_MARGIN):
+    """Obseg strani: spomenik in vplivna območja, ki se ga dotikajo."""
+    geom = feature.geometry()
+    extent = QgsRectangle(geom.boundingBox())
+    probe = geom.buffer(0.01, 2)
+    request = QgsFeatureRequest().setFilterRect(probe.boundingBox())
+    request.setFilterExpression('"edit_type" = ' + str(INFLUENCE_TYPE))
+    for f in layer.getFeatures(request):
+        if f.hasGeometry() and f.geometry().intersects(probe):
+            extent.combineExtentWith(f.geometry().boundingBox())
+    extent.scale(1.0 + 2.0 * margin)
+    return extent
+
+
+def output_name(feature, fmt):
+    """Ime datoteke strani: EID, če ga sloj ima, sicer ID geometrije."""
+    base = None
+    for name in ('EID', 'eid'):
+        if feature.fields().indexOf(name) >= 0:
+            val = feature.attribute(name)
+            if val not in (None, '') and str(val) != 'NULL':
+                base = "EID_" + str(val)
+                break
+    if base is None:
+        base = "spomenik_" + str(feature.id())
+    return base + "." + fmt
+
+
+def partial_path(path):
+    """Začasno ime strani med izrisom (končnica ostane zaradi formata slike)."""
+    stem, ext = os.path.splitext(path)
+    return stem + PARTIAL_SUFFIX + ext
+
+
+def remove_partial(out_dir):
+    """Pobriše nedokončane strani (npr. po prekinjenem procesu)."""
+    suffixes = tuple(PARTIAL_SUFFIX + '.' + fmt for fmt in (FORMAT_PDF, FORMAT_PNG))
+    try:
+        names = os.listdir(out_dir)
+    except OSError:
+        return
+    for name in names:
+        if name.endswith(suffixes):
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except OSError:
+                pass
+
+
+def render_pages(project, layer, fids, out_dir, fmt=FORMAT_PDF, dpi=None, progress=None, on_page=None):
+    """Izriše strani za podane spomenike. Vrne seznam ustvarjenih datotek.
+
+    progress je neobvezna funkcija (i, n), ki vrne False za prekinitev;
+    on_page(fid, pot) se pokliče za vsako dokončano stran.
+    """
+    layout = build_layout(project, layer)
+    atlas = layout.atlas()
+    map_item = layout.itemById(MAP_ITEM_ID)
+    exporter = QgsLayoutExporter(layout)
+    if fmt == FORMAT_PNG:
+        settings = QgsLayoutExporter.ImageExportSettings()
+    else:
+        settings = QgsLayoutExporter.PdfExportSettings()
+    if dpi:
+        settings.dpi = dpi
+    written = []
+    atlas.beginRender()
+    try:
+        for i, fid in enumerate(fids):
+            if progress is not None and progress(i, len(fids)) is False:
+                break
+            feature = layer.getFeature(fid)
+            if not feature.isValid() or not atlas.seekTo(feature):
+                continue
+            if map_item is not None:
+                map_item.zoomToExtent(page_extent(layer, feature))
+            path = os.path.join(out_dir, output_name(feature, fmt))
+            part = partial_path(path)
+            if fmt == FORMAT_PNG:
+                result = exporter.exportToImage(part, settings)
+            else:
+                result = exporter.exportToPdf(part, settings)
+            if result != QgsLayoutExporter.Success:
+                if os.path.exists(part):
+                    os.remove(part)
+                continue
+            os.replace(part, path)
+            written.append(path)
+            if on_page is not None:
+                on_page(fid, path)
+    finally:
+        atlas.endRender()
+    return written
+
+
+# ---------------- Vzporedni izris ----------------
+def python_executable():
+    """Python, ki lahko uvozi qgis (znotraj QGIS je sys.executable lahko qgis-bin)."""
+    exe = sys.executable or ""
+    if os.path.basename(exe).lower().startswith('python'):
+        return exe
+    for name in ('python3.exe', 'python.exe', 'python3', 'python'):
+        for base in (sys.exec_prefix, os.path.join(sys.exec_prefix, 'bin')):
+            candidate = os.path.join(base, name)
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
+def split_jobs(fids, workers):
+    chunks = [[] for _ in range(max(1, workers))]
+    for i, fid in enumerate(fids):
+        chunks[i % len(chunks)].append(fid)
+    return [c for c in chunks if c]
+
+
+class Worker:
+    """En proces print_worker: spomeniki, izhod (vrstica, pot) in napake v datotekah."""
+    def __init__(self, proc, fids, rows, out_path, err_path):
+        self.proc = proc
+        self.fids = fids
+        # zaporedna številka v posnetku -> ID v sloju
+        self.rows = rows
+        self.out_path = out_path
+        self.err_path = err_path
+
+    def running(self):
+        return self.proc.poll() is None
+
+    def failed(self):
+        return not self.running() and self.proc.returncode != 0
+
+    def pages(self):
+        """Dokončane strani [(fid, pot)], ki so na disku."""
+        try:
+            with open(self.out_path, encoding='utf-8', errors='replace') as f:
+                lines = [l.rstrip('\r\n') for l in f]
+        except OSError:
+            return []
+        out = []
+        for line in lines:
+            row, sep, path = line.partition('\t')
+            # zadnja vrstica je lahko nedokončana
+            if not sep or not row.isdigit() or int(row) not in self.rows or not os.path.isfile(path):
+                continue
+            out.append((self.rows[int(row)], path))
+        return out
+
+    def written(self):
+        return [path for _, path in self.pages()]
+
+    def remaining(self):
+        """Spomeniki, katerih strani proces ni dokončal."""
+        done = set(fid for fid, _ in self.pages())
+        return [fid for fid in self.fids if fid not in done]
+
+    def errors(self):
+        try:
+            with open(self.err_path, encoding='utf-8', errors='replace') as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+
+class WorkerRun:
+    """Zagnani procesi in njihova začasna mapa (pobriše jo cleanup())."""
+    def __init__(self, tmp_dir, out_dir):
+        self.tmp_dir = tmp_dir
+        self.out_dir = out_dir
+        self.workers = []
+
+    def running(self):
+        return [w for w in self.workers if w.running()]
+
+    def written(self):
+        return [path for w in self.workers for path in w.written()]
+
+    def failed(self):
+        return [w for w in self.workers if w.failed()]
+
+    def kill(self):
+        for w in self.running():
+            w.proc.kill()
+        for w in self.workers:
+            w.proc.wait()
+
+    def cleanup(self):
+        # nedokončane strani prekinjenih ali neuspelih procesov
+        remove_partial(self.out_dir)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def start_workers(project_path, layer, fids, out_dir, fmt=FORMAT_PDF, dpi=None, workers=None):
+    """Zažene procese print_worker. Vrne WorkerRun ali None.
+
+    Sloj se za procese shrani v začasen GeoPackage, saj pomnilniški sloji
+    niso shranjeni v projektu. Izhod procesov gre v datoteke (ne v cevi),
+    da se proces z obsežnim izpisom napak ne zaustavi.
+    """
+    exe = python_executable()
+    if exe is None:
+        return None
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) - 1)
+    run = WorkerRun(tempfile.mkdtemp(prefix='ised_tisk_'), out_dir)
+    try:
+        _start(run, exe, project_path, layer, fids, out_dir, fmt, dpi, workers)
+    except Exception:
+        run.kill()
+        run.cleanup()
+        raise
+    if not run.workers:
+        run.cleanup()
+        return None
+    return run
+
+
+def _start(run, exe, project_path, layer, fids, out_dir, fmt, dpi, workers):
+    snapshot = os.path.join(run.tmp_dir, 'ised.gpkg')
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = "ised"
+    res = QgsVectorFileWriter.writeAsVectorFormatV2(
+        layer, snapshot, layer.transformContext(), options)
+    if res[0] != QgsVectorFileWriter.NoError:
+        return
+    # ID-ji v GeoPackage se ne ujemajo z ID-ji pomnilniškega sloja, zato
+    # procesom podamo zaporedne številke spomenikov v zapisanem sloju
+    id_order = {fid: i for i, fid in enumerate(f.id() for f in layer.getFeatures())}
+    pkg_dir = os.path.dirname(os.path.abspath(__file__))
+    module = os.path.basename(pkg_dir) + '.print_worker'
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['PYTHONPATH'] = os.path.dirname(pkg_dir) + os.pathsep + env.get('PYTHONPATH', '')
+    for n, chunk in enumerate(split_jobs(fids, workers)):
+        rows = dict((id_order[fid], fid) for fid in chunk if fid in id_order)
+        job = {
+            'project': project_path,
+            'layer_id': layer.id(),
+            'snapshot': snapshot,
+            'rows': sorted(rows),
+            'out_dir': out_dir,
+            'format': fmt,
+            'dpi': dpi,
+        }
+        job_path = os.path.join(run.tmp_dir, 'job_%d.json' % n)
+        with open(job_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        out_path = os.path.join(run.tmp_dir, 'out_%d.txt' % n)
+        err_path = os.path.join(run.tmp_dir, 'err_%d.txt' % n)
+        with open(out_path, 'wb') as out, open(err_path, 'wb') as err:
+            proc = subprocess.Popen([exe, '-m', module, job_path], env=env, stdout=out, stderr=err)
+        run.workers.append(Worker(proc, chunk, rows, out_path, err_path))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – Processing ponudnik
+
+Vsa orodja ISeD kot Processing algoritmi: uporabni v Graphical Modelerju,
+paketnem načinu in v qgis_process. Algoritmi so v algorithms.py.
+"""
+
+import os
+
+from qgis.core import QgsProcessingProvider
+from qgis.PyQt.QtGui import QIcon
+
+
+class IsedProvider(QgsProcessingProvider):
+    def loadAlgorithms(self):
+        from . import algorithms
+        for alg_class in algorithms.ALGORITHMS:
+            self.addAlgorithm(alg_class())
+
+    def id(self):
+        return 'ised'
+
+    def name(self):
+        return 'ISeD'
+
+    def longName(self):
+        return 'ISeD orodja'
+
+    def icon(self):
+        path = os.path.join(os.path.dirname(__file__), 'Resources', 'ised_logo_round.png')
+        if os.path.exists(path):
+            return QIcon(path)
+        return QgsProcessingProvider.icon(self)
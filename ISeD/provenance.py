@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – izvor poligonov ISeD in preverjanje sprememb katastra
+
+Ob kopiranju parcel v ISeD se v zapis shranijo pari (KO, parcela) in zgoščene
+vrednosti njihovih geometrij. Preverjanje v ozadju (QgsTask) iz GURS ponovno
+prebere le te parcele (filter po ID, s predpomnilnikom) in označi zapise,
+katerih izvorne parcele so se spremenile ali jih ni več.
+"""
+
+import time
+import hashlib
+
+from qgis.core import (
+    QgsTask, QgsVectorLayer, QgsField, QgsFeature, QgsFeatureRequest, QgsMessageLog, Qgis,
+    QgsProject
+)
+from qgis.PyQt.QtCore import QVariant
+
+from . import core
+from . import gurs
+from . import instrument
+
+STATUS_OK = "OK"
+STATUS_CHANGED = "SPREMENJENO"
+STATUS_MISSING = "MANJKA"
+
+PAIR_SEP = ";"
+KO_SEP = ":"
+QUERY_CHUNK = 200
+CACHE_TTL = 3600.0
+# natančnost koordinat (m) v gurs.CRS pred izračunom hasha
+HASH_PRECISION = 0.01
+
+# (ko, parcela) -> (zgoščena vrednost ali None, čas poizvedbe)
+_cache = {}
+
+
+def geometry_hash(geom, crs=None):
+    """Kratka zgoščena vrednost geometrije, neodvisna od začetnega oglišča.
+
+    Geometrija v CRS crs se pretvori v gurs.CRS in zaokroži na HASH_PRECISION,
+    da se hash ujema s parcelo, ponovno prebrano iz GURS.
+    """
+    g = type(geom)(geom)
+    xform = core.transform_for(crs, gurs.CRS) if crs is not None else None
+    if xform is not None:
+        g.transform(xform)
+    g = g.snappedToGrid(HASH_PRECISION, HASH_PRECISION)
+    try:
+        g.normalize()
+    except AttributeError:
+        pass
+    return hashlib.sha1(bytes(g.asWkb())).hexdigest()[:16]
+
+
+def encode(pairs, hashes):
+    ids = PAIR_SEP.join(str(ko) + KO_SEP + str(p) for ko, p in pairs)
+    return ids, PAIR_SEP.join(hashes)
+
+
+def decode(ids_text, hashes_text):
+    """Vrne seznam ((ko, parcela), hash)."""
+    if not ids_text:
+        return []
+    pairs = []
+    for token in str(ids_text).split(PAIR_SEP):
+        ko, _, p = token.partition(KO_SEP)
+        pairs.append((ko, p))
+    hashes = str(hashes_text or "").split(PAIR_SEP)
+    hashes += [""] * (len(pairs) - len(hashes))
+    return list(zip(pairs, hashes))
+
+
+def has_fields(layer):
+    return layer.fields().indexOf(core.SOURCE_IDS_FIELD) >= 0
+
+
+def ensure_fields(layer):
+    """Doda polja izvora v sloj ISeD, če jih še ni (med urejanjem v urejevalni medpomnilnik)."""
+    missing = [QgsField(name, QVariant.String) for name in core.INTERNAL_FIELDS
+               if layer.fields().indexOf(name) < 0]
+    if not missing:
+        return layer
+    if layer.isEditable():
+        for field in missing:
+            layer.addAttribute(field)
+    else:
+        layer.dataProvider().addAttributes(missing)
+    layer.updateFields()
+    return layer
+
+
+def _with_fields(feature, fields):
+    """Kopija zapisa z novo shemo (atributi po imenu)."""
+    out = QgsFeature(fields)
+    out.setGeometry(feature.geometry())
+    for field in feature.fields():
+        if fields.indexOf(field.name()) >= 0:
+            out.setAttribute(field.name(), feature[field.name()])
+    return out
+
+
+class SourceCollector:
+    """Med pretočnim branjem parcel zbira pare (KO, parcela) in hashe."""
+    def __init__(self, layer):
+        self.ko_field, self.parcel_field = core.detect_parcel_fields(layer)
+        self.crs = layer.crs()
+        self.pairs = []
+        self.hashes = []
+
+    def request(self, layer):
+        request = QgsFeatureRequest()
+        if self.ko_field is None or self.parcel_field is None:
+            return core.geometry_request(request)
+        request.setSubsetOfAttributes([self.ko_field, self.parcel_field], layer.fields())
+        return request
+
+    def collect(self, features):
+        for f in features:
+            if self.ko_field is not None and self.parcel_field is not None and f.hasGeometry():
+                self.pairs.append((f[self.ko_field], f[self.parcel_field]))
+                self.hashes.append(geometry_hash(f.geometry(), self.crs))
+            yield f
+
+    def apply(self, feature, layer):
+        """Vrne zapis z izvorom; zapis, ustvarjen pred ensure_fields, dobi novo shemo."""
+        if not self.pairs or not has_fields(layer):
+            return feature
+        if feature.fields().indexOf(core.SOURCE_IDS_FIELD) < 0:
+            feature = _with_fields(feature, layer.fields())
+        ids, hashes = encode(self.pairs, self.hashes)
+        feature.setAttribute(core.SOURCE_IDS_FIELD, ids)
+        feature.setAttribute(core.SOURCE_HASH_FIELD, hashes)
+        feature.setAttribute(core.SOURCE_STATUS_FIELD, STATUS_OK)
+        return feature
+
+
+def merge_sources(feature, layer, fids):
+    """Zapisu doda izvor obstoječih zapisov (fids), s katerimi se združi."""
+    if not fids or not has_fields(layer):
+        return feature
+    if feature.fields().indexOf(core.SOURCE_IDS_FIELD) < 0:
+        feature = _with_fields(feature, layer.fields())
+    items = decode(feature[core.SOURCE_IDS_FIELD], feature[core.SOURCE_HASH_FIELD])
+    status = feature[core.SOURCE_STATUS_FIELD]
+    request = QgsFeatureRequest().setFilterFids(list(fids)).setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(list(core.INTERNAL_FIELDS), layer.fields())
+    for f in layer.getFeatures(request):
+        items += decode(f[core.SOURCE_IDS_FIELD], f[core.SOURCE_HASH_FIELD])
+        if f[core.SOURCE_STATUS_FIELD] and f[core.SOURCE_STATUS_FIELD] != STATUS_OK:
+            # neporavnana sprememba vira ostane vidna
+            status = f[core.SOURCE_STATUS_FIELD]
+    if not items:
+        return feature
+    seen = set()
+    pairs, hashes = [], []
+    for pair, h in items:
+        if pair in seen:
+            continue
+        seen.add(pair)
+        pairs.append(pair)
+        hashes.append(h)
+    ids, hashes = encode(pairs, hashes)
+    feature.setAttribute(core.SOURCE_IDS_FIELD, ids)
+    feature.setAttribute(core.SOURCE_HASH_FIELD, hashes)
+    feature.setAttribute(core.SOURCE_STATUS_FIELD, status or STATUS_OK)
+    return feature
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _query_hashes(pairs, feedback=None):
+    """Trenutni hashi parcel iz GURS; manjkajoče parcele dobijo None."""
+    now = time.time()
+    result = {}
+    todo = []
+    for pair in pairs:
+        hit = _cache.get(pair)
+        if hit is not None and now - hit[1] < CACHE_TTL:
+            result[pair] = hit[0]
+        else:
+            todo.append(pair)
+    if not todo:
+        return result
+
+    layer = QgsVectorLayer(gurs.wfs_uri(gurs.PARCELS_TYPENAME, restrict_bbox=False), "parcele", "WFS")
+    if not layer.isValid():
+        raise core.IsedError("Napaka pri nalaganju parcel iz GURS WFS.")
+    ko_field, parc_field = core.detect_parcel_fields(layer)
+    if ko_field is None or parc_field is None:
+        raise core.IsedError("V sloju GURS ni polj za KO in številko parcele.")
+    fetched = {}
+    for i, part in enumerate(_chunks(todo, QUERY_CHUNK)):
+        if feedback is not None:
+            if feedback.isCanceled():
+                return None
+            feedback.setProgress(100.0 * i * QUERY_CHUNK / len(todo))
+        layer.setSubsetString(core.parcel_pairs_expression(ko_field, parc_field, part))
+        request = QgsFeatureRequest().setSubsetOfAttributes([ko_field, parc_field], layer.fields())
+        for f in layer.getFeatures(request):
+            if f.hasGeometry():
+                fetched[(str(f[ko_field]), str(f[parc_field]))] = geometry_hash(f.geometry(), layer.crs())
+    for pair in todo:
+        value = fetched.get(pair)
+        _cache[pair] = (value, now)
+        result[pair] = value
+    return result
+
+
+def check_sources(records, feedback=None):
+    """records: {fid: [((ko, parcela), hash), ...]} -> {fid: (stanje, opis)}"""
+    pairs = sorted(set(pair for items in records.values() for pair, _ in items))
+    current = _query_hashes(pairs, feedback)
+    if current is None:
+        return None
+    statuses = {}
+    for fid, items in records.items():
+        missing = [p for p, _ in items if current.get(p) is None]
+        changed = [p for p, h in items if current.get(p) is not None and current[p] != h]
+        if missing:
+            statuses[fid] = (STATUS_MISSING, ", ".join(k + "-" + p for k, p in missing))
+        elif changed:
+            statuses[fid] = (STATUS_CHANGED, ", ".join(k + "-" + p for k, p in changed))
+        else:
+            statuses[fid] = (STATUS_OK, "")
+    return statuses
+
+
+def layer_records(layer):
+    request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes([core.SOURCE_IDS_FIELD, core.SOURCE_HASH_FIELD], layer.fields())
+    records = {}
+    for f in layer.getFeatures(request):
+        items = decode(f[core.SOURCE_IDS_FIELD], f[core.SOURCE_HASH_FIELD])
+        if items:
+            records[f.id()] = items
+    return records
+
+
+def write_statuses(layer, statuses):
+    """Zapiše stanje v polje vir_stanje in izbere spremenjene zapise."""
+    idx = layer.fields().indexOf(core.SOURCE_STATUS_FIELD)
+    if layer.isEditable():
+        # med urejanjem skozi urejevalni medpomnilnik (razveljavi, shrani/prekliči)
+        layer.beginEditCommand("ISeD: stanje izvornih parcel")
+        for fid, (st, _) in statuses.items():
+            layer.changeAttributeValue(fid, idx, st)
+        layer.endEditCommand()
+    else:
+        layer.dataProvider().changeAttributeValues({fid: {idx: st} for fid, (st, _) in statuses.items()})
+    flagged = [fid for fid, (st, _) in statuses.items() if st != STATUS_OK]
+    layer.selectByIds(flagged)
+    layer.triggerRepaint()
+    return flagged
+
+
+class SourceCheckTask(QgsTask):
+    """Preverjanje izvornih parcel v ozadju; rezultat zapiše v glavni niti."""
+    def __init__(self, layer, on_done=None, metrics=None):
+        super().__init__("ISeD: preverjanje sprememb parcel", QgsTask.CanCancel)
+        # sloj lahko med preverjanjem odstranijo, zato hranimo le ID
+        self.layer_id = layer.id()
+        self.records = layer_records(layer)
+        self.on_done = on_done
+        self.metrics = metrics
+        self.statuses = None
+        self.error = None
+
+    def run(self):
+        try:
+            with instrument.activate(self.metrics):
+                self.statuses = check_sources(self.records, self)
+        except Exception as e:
+            self.error = str(e)
+            return False
+        return self.statuses is not None
+
+    def finished(self, result):
+        if self.metrics is not None:
+            self.metrics.finish(self.error or (None if result else "preklicano"))
+        flagged = []
+        layer = QgsProject.instance().mapLayer(self.layer_id)
+        if result and self.statuses and layer is None:
+            self.error = "Sloj je bil med preverjanjem odstranjen."
+        elif result and self.statuses:
+            flagged = write_statuses(layer, self.statuses)
+            for fid in flagged:
+                status, detail = self.statuses[fid]
+                QgsMessageLog.logMessage(
+                    "Zapis " + str(fid) + ": " + status + " (" + detail + ")", "ISeD", Qgis.Warning)
+        if self.on_done is not None:
+            self.on_done(self, flagged)
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – kontrola topologije sloja ISeD pred izvozom
+
+Preverja prekrivanja (prostorski indeks, vsak par enkrat), vrzeli med
+poligoni, drobce (majhni ali ozki deli, drobne luknje) in neveljavne
+geometrije (GEOS, vzporedno v nitih). Vrzeli so drobne luknje v uniji
+poligonov in ozke reže (ožje od GAP_WIDTH), tudi odprte navzven; širših
+zarez med območji ne štejemo za napako. Napake zapiše v sloj napak;
+drobce in neveljavne geometrije zna popraviti samodejno. QaTask izvede
+kontrolo v ozadju.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.core import (
+    QgsGeometry, QgsFeature, QgsFeatureRequest, QgsSpatialIndex, QgsField,
+    QgsFields, QgsVectorLayer, QgsWkbTypes, QgsTask
+)
+from qgis.PyQt.QtCore import QVariant
+
+from . import core
+from . import instrument
+
+ERROR_LAYER_NAME = "Napake topologije ISeD"
+SLIVER_AREA = 1.0
+SLIVER_WIDTH = 0.2
+OVERLAP_AREA = 0.01
+POINT_MARK = 0.5
+# reže, ožje od tega (m), med sosednjimi poligoni štejemo za vrzel
+GAP_WIDTH = 0.5
+WORKERS = 4
+
+ERR_INVALID = "neveljavna geometrija"
+ERR_OVERLAP = "prekrivanje"
+ERR_GAP = "vrzel"
+ERR_SLIVER = "drobec"
+ERR_HOLE = "drobna luknja"
+
+# dovoljena gnezdenja: podobmočje znotraj območja
+_NESTED = {
+    frozenset([core.EDIT_MONUMENT, core.EDIT_MONUMENT_SUB]),
+    frozenset([core.EDIT_INFLUENCE, core.EDIT_INFLUENCE_SUB]),
+}
+
+
+class Issue:
+    def __init__(self, kind, geom, fid_a, fid_b=None, detail=""):
+        self.kind = kind
+        self.geom = geom
+        self.fid_a = fid_a
+        self.fid_b = fid_b
+        self.detail = detail
+
+
+def _polygons(geom):
+    """Deli (mnogo)kotnika kot seznam obročev [zunanji, luknje...]."""
+    if geom.isMultipart():
+        return geom.asMultiPolygon()
+    return [geom.asPolygon()]
+
+
+def _thin(area, perimeter, width):
+    # približna širina dela: 2 * površina / obseg
+    return perimeter > 0 and 2.0 * area / perimeter < width
+
+
+def _is_sliver(ring_geom, area, width):
+    a = ring_geom.area()
+    return a < area or _thin(a, ring_geom.length(), width)
+
+
+# ---------------- Preverjanja ----------------
+def _validity(items):
+    def check(item):
+        fid, geom = item
+        errors = geom.validateGeometry(QgsGeometry.ValidatorGeos)
+        return fid, geom, errors
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for fid, geom, errors in pool.map(check, items):
+            for err in errors:
+                where = QgsGeometry.fromPointXY(err.where()) if err.hasWhere() else geom.centroid()
+                yield Issue(ERR_INVALID, where.buffer(POINT_MARK, 4), fid, detail=err.what())
+
+
+def _slivers(fid, geom, area, width):
+    parts = _polygons(geom)
+    for rings in parts:
+        if not rings:
+            continue
+        part = QgsGeometry.fromPolygonXY([rings[0]])
+        if len(parts) > 1 and _is_sliver(part, area, width):
+            yield Issue(ERR_SLIVER, part, fid, detail="%.2f m²" % part.area())
+        for hole in rings[1:]:
+            hole_geom = QgsGeometry.fromPolygonXY([hole])
+            if _is_sliver(hole_geom, area, width):
+                yield Issue(ERR_HOLE, hole_geom, fid, detail="%.2f m²" % hole_geom.area())
+
+
+def _overlaps(items, types, index):
+    geoms = dict(items)
+    for fid, geom in items:
+        engine = QgsGeometry.createGeometryEngine(geom.constGet())
+        engine.prepareGeometry()
+        for other in index.intersects(geom.boundingBox()):
+            if other <= fid or other not in geoms:
+                # neveljavne geometrije so v indeksu, a jih javi že _validity
+                continue
+            if frozenset([types.get(fid), types.get(other)]) in _NESTED:
+                continue
+            other_geom = geoms[other]
+            if not engine.overlaps(other_geom.constGet()) and not engine.within(other_geom.constGet()) \
+                    and not engine.contains(other_geom.constGet()):
+                continue
+            inter = QgsGeometry(engine.intersection(other_geom.constGet()))
+            if inter.type() == QgsWkbTypes.PolygonGeometry and inter.area() >= OVERLAP_AREA:
+                yield Issue(ERR_OVERLAP, inter, fid, other, "%.2f m²" % inter.area())
+
+
+def _closing(geom, distance):
+    """Morfološko zapiranje (buffer navzven in nazaj) z ostrimi vogali.
+
+    Ostri (miter) vogali ohranijo vbočene vogale unije, zato ostanejo le reže.
+    """
+    try:
+        from qgis.core import Qgis
+        flat, miter = Qgis.EndCapStyle.Flat, Qgis.JoinStyle.Miter
+    except AttributeError:
+        flat, miter = QgsGeometry.CapFlat, QgsGeometry.JoinStyleMiter
+    return geom.buffer(distance, 1, flat, miter, 5.0).buffer(-distance, 1, flat, miter, 5.0)
+
+
+def _gaps(items, area, width, gap_width=GAP_WIDTH):
+    """Vrzeli: drobne luknje v uniji in ozke reže med poligoni (tudi odprte navzven)."""
+    if len(items) < 2:
+        return
+    union_geom = core.union_geometries([g for _, g in items])
+    holes = []
+    for rings in _polygons(union_geom):
+        for hole in rings[1:]:
+            hole_geom = QgsGeometry.fromPolygonXY([hole])
+            if _is_sliver(hole_geom, area, width):
+                # luknjo, ki je v celoti znotraj enega zapisa, javi _slivers
+                holes.append(hole_geom)
+                yield hole_geom
+    if gap_width <= 0:
+        return
+    slits = _closing(union_geom, gap_width / 2.0).difference(union_geom)
+    if slits.isEmpty():
+        return
+    parts = slits.asGeometryCollection() if slits.isMultipart() else [slits]
+    for part in parts:
+        if part.type() != QgsWkbTypes.PolygonGeometry or part.area() < OVERLAP_AREA:
+            continue
+        probe = part.pointOnSurface()
+        if any(h.intersects(probe) for h in holes):
+            continue
+        yield part
+
+
+def collect(layer):
+    """Geometrije, edit_type in prostorski indeks sloja (v glavni niti)."""
+    request = QgsFeatureRequest()
+    has_type = core.has_edit_type(layer)
+    if has_type:
+        request.setSubsetOfAttributes([core.EDIT_TYPE_FIELD], layer.fields())
+    else:
+        request.setSubsetOfAttributes([])
+    items = []
+    types = {}
+    index = QgsSpatialIndex()
+    for f in layer.getFeatures(request):
+        if not f.hasGeometry():
+            continue
+        instrument.count_geometry(f.geometry())
+        items.append((f.id(), f.geometry()))
+        types[f.id()] = f[core.EDIT_TYPE_FIELD] if has_type else None
+        index.addFeature(f)
+    return items, types, index
+
+
+def check_items(items, types, index, area=SLIVER_AREA, width=SLIVER_WIDTH, feedback=None):
+    """Vrne seznam napak (Issue) za zbrane geometrije; sloja ne bere."""
+    issues = list(_validity(items))
+    invalid = set(i.fid_a for i in issues)
+    valid_items = [(fid, g) for fid, g in items if fid not in invalid]
+    if feedback is not None:
+        feedback.setProgress(30)
+    for fid, geom in valid_items:
+        issues.extend(_slivers(fid, geom, area, width))
+    if feedback is not None:
+        if feedback.isCanceled():
+            return issues
+        feedback.setProgress(50)
+    issues.extend(_overlaps(valid_items, types, index))
+    if feedback is not None:
+        if feedback.isCanceled():
+            return issues
+        feedback.setProgress(70)
+    holes = [i.geom for i in issues if i.kind == ERR_HOLE]
+    for gap in _gaps(valid_items, area, width):
+        if any(gap.equals(h) for h in holes):
+            continue
+        issues.append(Issue(ERR_GAP, gap, None, detail="%.2f m²" % gap.area()))
+    if feedback is not None:
+        feedback.setProgress(100)
+    return issues
+
+
+def check_layer(layer, area=SLIVER_AREA, width=SLIVER_WIDTH, feedback=None):
+    """Vrne seznam napak (Issue) sloja."""
+    items, types, index = collect(layer)
+    return check_items(items, types, index, area, width, feedback)
+
+
+class QaTask(QgsTask):
+    """Kontrola topologije v ozadju; geometrije se zberejo ob ustvarjanju."""
+    def __init__(self, layer, on_done=None, metrics=None):
+        super().__init__("ISeD: kontrola topologije", QgsTask.CanCancel)
+        self.layer = layer
+        self.metrics = metrics
+        with instrument.activate(metrics):
+            self.items, self.types, self.index = collect(layer)
+        self.on_done = on_done
+        self.issues = None
+        self.error = None
+
+    def run(self):
+        try:
+            with instrument.activate(self.metrics):
+                self.issues = check_items(self.items, self.types, self.index, feedback=self)
+        except Exception as e:
+            self.error = str(e)
+            return False
+        return not self.isCanceled()
+
+    def finished(self, result):
+        if self.metrics is not None:
+            self.metrics.finish(self.error or (None if result else "preklicano"))
+        if self.on_done is not None:
+            self.on_done(self, result)
+
+
+# ---------------- Sloj napak ----------------
+def error_layer(issues, crs, name=ERROR_LAYER_NAME):
+    fields = QgsFields()
+    fields.append(QgsField("vrsta", QVariant.String))
+    fields.append(QgsField("fid_a", QVariant.LongLong))
+    fields.append(QgsField("fid_b", QVariant.LongLong))
+    fields.append(QgsField("opis", QVariant.String))
+    layer = QgsVectorLayer("MultiPolygon?crs=" + core.crs_uri(crs), name, "memory")
+    pr = layer.dataProvider()
+    pr.addAttributes(fields.toList())
+    layer.updateFields()
+    feats = []
+    for issue in issues:
+        feat = QgsFeature(fields)
+        geom = QgsGeometry(issue.geom)
+        geom.convertToMultiType()
+        feat.setGeometry(geom)
+        feat.setAttributes([issue.kind, issue.fid_a, issue.fid_b, issue.detail])
+        feats.append(feat)
+    pr.addFeatures(feats)
+    layer.updateExtents()
+    return layer
+
+
+def summary(issues):
+    counts = {}
+    for issue in issues:
+        counts[issue.kind] = counts.get(issue.kind, 0) + 1
+    return ", ".join(k + ": " + str(v) for k, v in sorted(counts.items()))
+
+
+# ---------------- Popravki ----------------
+def _drop_slivers(geom, area, width):
+    """Odstrani drobne dele in drobne luknje; ohrani največji del."""
+    parts = [rings for rings in _polygons(geom) if rings]
+    if not parts:
+        return geom
+    keep = []
+    for rings in parts:
+        shell = QgsGeometry.fromPolygonXY([rings[0]])
+        holes = [h for h in rings[1:] if not _is_sliver(QgsGeometry.fromPolygonXY([h]), area, width)]
+        keep.append((shell, [rings[0]] + holes))
+    largest = max(keep, key=lambda k: k[0].area())
+    out = [rings for shell, rings in keep if rings is largest[1] or not _is_sliver(shell, area, width)]
+    if len(out) == 1:
+        return QgsGeometry.fromPolygonXY(out[0])
+    return QgsGeometry.fromMultiPolygonXY(out)
+
+
+def fix_layer(layer, area=SLIVER_AREA, width=SLIVER_WIDTH):
+    """Popravi neveljavne geometrije (makeValid) in drobce. Vrne EditSet."""
+    edits = core.EditSet()
+    for f in layer.getFeatures(core.geometry_request()):
+        if not f.hasGeometry():
+            continue
+        geom = f.geometry()
+        fixed = geom
+        if not geom.isGeosValid():
+            # makeValid lahko vrne zbirko; obdrži le poligone
+            fixed = core.polygon_parts(geom.makeValid())
+            if fixed.isEmpty():
+                fixed = geom
+        fixed = _drop_slivers(fixed, area, width)
+        if not fixed.equals(geom):
+            edits.changed[f.id()] = fixed
+    return edits
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – poročilo o parcelah, ki jih pokrivajo poligoni ISeD
+
+Prostorski stik poligonov ISeD s slojem parcel: prostorski indeks z
+geometrijami parcel, pripravljena geometrija (GEOS prepared) za vsak
+poligon ISeD, za vsako parcelo površina preseka in delež pokritosti.
+Vrstice se pretočno zapišejo v CSV/XLSX ali v tabelo atributov.
+"""
+
+import csv
+
+from qgis.core import (
+    QgsGeometry, QgsFeature, QgsFeatureRequest, QgsSpatialIndex,
+    QgsField, QgsFields, QgsVectorLayer, QgsVectorFileWriter
+)
+from qgis.PyQt.QtCore import QVariant
+
+from . import core
+from . import instrument
+
+REPORT_LAYER_NAME = "Poročilo parcel ISeD"
+MIN_AREA = 0.01
+
+COLUMNS = [
+    ("ised_fid", QVariant.LongLong),
+    ("edit_type", QVariant.Int),
+    ("ko", QVariant.String),
+    ("parcela", QVariant.String),
+    ("pov_parc", QVariant.Double),
+    ("pov_presek", QVariant.Double),
+    ("delez_parc", QVariant.Double),
+    ("delez_ised", QVariant.Double),
+]
+
+
+def report_fields():
+    fields = QgsFields()
+    for name, vtype in COLUMNS:
+        fields.append(QgsField(name, vtype))
+    return fields
+
+
+def _parcel_index(parcel_layer, extent, ko_field, parc_field, crs):
+    """Indeks parcel v obsegu poligonov ISeD (v CRS sloja ISeD) in atributi (KO, parcela) po fid."""
+    request = core.reprojected_request(parcel_layer, crs, QgsFeatureRequest().setFilterRect(extent))
+    request.setSubsetOfAttributes([ko_field, parc_field], parcel_layer.fields())
+    attrs = {}
+    index = QgsSpatialIndex(QgsSpatialIndex.FlagStoreFeatureGeometries)
+    for f in parcel_layer.getFeatures(request):
+        if f.hasGeometry():
+            attrs[f.id()] = (str(f[ko_field]), str(f[parc_field]))
+            index.addFeature(f)
+    instrument.count_features(len(attrs))
+    return index, attrs
+
+
+def overlap_rows(ised_layer, parcel_layer, min_area=MIN_AREA, feedback=None):
+    """Vrstice poročila (slovarji po COLUMNS) za vse pare poligon–parcela."""
+    ko_field, parc_field = core.detect_parcel_fields(parcel_layer)
+    if ko_field is None or parc_field is None:
+        raise core.IsedError("V sloju parcel ni polj za KO in številko parcele.")
+    if ised_layer.featureCount() == 0:
+        return
+    index, attrs = _parcel_index(parcel_layer, ised_layer.extent(), ko_field, parc_field, ised_layer.crs())
+    has_type = core.has_edit_type(ised_layer)
+    total = ised_layer.featureCount()
+    for n, feat in enumerate(ised_layer.getFeatures()):
+        if feedback is not None:
+            if feedback.isCanceled():
+                return
+            feedback.setProgress(100.0 * n / total)
+        if not feat.hasGeometry():
+            continue
+        geom = feat.geometry()
+        instrument.count_geometry(geom)
+        ised_area = geom.area()
+        engine = QgsGeometry.createGeometryEngine(geom.constGet())
+        engine.prepareGeometry()
+        for fid in index.intersects(geom.boundingBox()):
+            parcel = index.geometry(fid)
+            if not engine.intersects(parcel.constGet()):
+                continue
+            inter = engine.intersection(parcel.constGet())
+            if inter is None:
+                continue
+            area = QgsGeometry(inter).area()
+            if area < min_area:
+                continue
+            parcel_area = parcel.area()
+            ko, parc = attrs[fid]
+            yield {
+                "ised_fid": feat.id(),
+                "edit_type": feat[core.EDIT_TYPE_FIELD] if has_type else None,
+                "ko": ko,
+                "parcela": parc,
+                "pov_parc": round(parcel_area, 2),
+                "pov_presek": round(area, 2),
+                "delez_parc": round(100.0 * area / parcel_area, 2) if parcel_area > 0 else None,
+                "delez_ised": round(100.0 * area / ised_area, 2) if ised_area > 0 else None,
+            }
+
+
+# ---------------- Izhodi ----------------
+def write_csv(rows, path):
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow([name for name, _ in COLUMNS])
+        for row in rows:
+            writer.writerow(["" if row[name] is None else row[name] for name, _ in COLUMNS])
+            count += 1
+    return count
+
+
+def layer_rows(layer):
+    """Vrstice iz tabele poročila (za zapis v CSV)."""
+    for f in layer.getFeatures():
+        yield {name: f[name] for name, _ in COLUMNS}
+
+
+def table_layer(rows, name=REPORT_LAYER_NAME):
+    """Tabela brez geometrije (pomnilniški sloj) z vrsticami poročila."""
+    layer = QgsVectorLayer("None", name, "memory")
+    pr = layer.dataProvider()
+    fields = report_fields()
+    pr.addAttributes(fields.toList())
+    layer.updateFields()
+    chunk = []
+    for row in rows:
+        feat = QgsFeature(fields)
+        feat.setAttributes([row[name] for name, _ in COLUMNS])
+        chunk.append(feat)
+        if len(chunk) >= 1000:
+            pr.addFeatures(chunk)
+            chunk = []
+    if chunk:
+        pr.addFeatures(chunk)
+    return layer
+
+
+def write_xlsx(layer, path):
+    try:
+        result = QgsVectorFileWriter.writeAsVectorFormat(layer, path, "UTF-8", layer.crs(), "XLSX")
+    except Exception as e:
+        raise core.IsedError("Napaka pri zapisu XLSX:\n" + str(e))
+    error = result[0] if isinstance(result, tuple) else result
+    if error != QgsVectorFileWriter.NoError:
+        raise core.IsedError("Napaka pri zapisu XLSX.")
+    return path
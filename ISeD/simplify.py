@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – poenostavitev oglišč z ohranjanjem topologije
+
+Meje vseh poligonov se razrežejo na loke med vozlišči (stiki treh ali več
+poligonov). Vsak lok se poenostavi enkrat (Douglas-Peucker, krajišča
+ostanejo), zato sosednja območja po poenostavitvi še vedno delijo isto mejo.
+Iz lokov se sestavijo ploskve, ki se vrnejo zapisom, katerim pripadajo.
+
+Poenostavljeni loki se ne vozlijo znova: lok, ki bi prečkal drug lok, ostane
+izviren. Če zapis po poenostavitvi ne ustreza (neveljaven, prevelika
+sprememba površine), ostanejo izvirni vsi njegovi loki – tudi pri sosedih –
+in ploskve se sestavijo znova. Poenostavljena in izvirna meja se tako nikoli
+ne srečata na istem stiku.
+"""
+
+from qgis.core import QgsGeometry, QgsSpatialIndex, QgsFeature
+
+from . import core
+from . import instrument
+
+DEFAULT_TOLERANCE = 0.5
+SETTINGS_EXPORT_TOLERANCE = "ISeD/export_simplify_tolerance"
+# dovoljena relativna sprememba površine zapisa, sicer obdržimo izvirnik
+MAX_AREA_CHANGE = 0.05
+
+
+class Result:
+    """Spremembe (EditSet) in število oglišč pred/po poenostavitvi."""
+    def __init__(self):
+        self.edits = core.EditSet()
+        self.before = 0
+        self.after = 0
+        self.kept = []
+
+    def reduction(self):
+        if self.before == 0:
+            return 0.0
+        return 100.0 * (self.before - self.after) / self.before
+
+    def describe(self):
+        text = "Oglišča: %d → %d (−%.0f %%)" % (self.before, self.after, self.reduction())
+        if self.kept:
+            text += "; nespremenjenih zapisov: " + str(len(self.kept))
+        return text
+
+
+def _vertices(geom):
+    return geom.constGet().nCoordinates() if geom is not None and not geom.isNull() else 0
+
+
+def _boundary_lines(geoms):
+    for geom in geoms:
+        polys = geom.asMultiPolygon() if geom.isMultipart() else [geom.asPolygon()]
+        for rings in polys:
+            for ring in rings:
+                yield QgsGeometry.fromPolylineXY(ring)
+
+
+def _arcs(geoms):
+    """Noded loki meja vseh poligonov (brez poenostavitve)."""
+    noded = QgsGeometry.unaryUnion(list(_boundary_lines(geoms)))
+    merged = noded.mergeLines()
+    return merged.asGeometryCollection() if merged.isMultipart() else [merged]
+
+
+def _simplified(line, tolerance):
+    simple = line.simplify(tolerance)
+    # lok, ki bi se sesedel, ostane nespremenjen
+    if simple is None or simple.isEmpty() or _vertices(simple) < 2:
+        return None
+    return simple
+
+
+def _arc_owners(lines, items):
+    """Za vsak lok množica zapisov, na meji katerih leži."""
+    index = QgsSpatialIndex()
+    bounds = {}
+    for fid, geom in items:
+        feat = QgsFeature(fid)
+        feat.setGeometry(geom)
+        index.addFeature(feat)
+        bounds[fid] = QgsGeometry(geom.constGet().boundary())
+    owners = []
+    for line in lines:
+        probe = line.interpolate(line.length() / 2.0)
+        rect = probe.boundingBox()
+        rect.grow(core.DISSOLVE_GRID)
+        owners.append(set(fid for fid in index.intersects(rect)
+                          if bounds[fid].distance(probe) <= core.DISSOLVE_GRID))
+    return owners
+
+
+def _crossing(out, frozen):
+    """Poenostavljeni loki, ki sekajo drug lok (ne le v krajiščih)."""
+    index = QgsSpatialIndex()
+    for i, line in enumerate(out):
+        feat = QgsFeature(i)
+        feat.setGeometry(line)
+        index.addFeature(feat)
+    bad = set()
+    for i, line in enumerate(out):
+        if i in frozen:
+            continue
+        for j in index.intersects(line.boundingBox()):
+            if j != i and line.intersects(out[j]) and not line.touches(out[j]):
+                bad.add(i)
+                if j not in frozen:
+                    bad.add(j)
+    return bad
+
+
+def _faces(out, items, index, geoms):
+    faces = QgsGeometry.polygonize(out)
+    parts = dict((fid, []) for fid, _ in items)
+    for face in faces.asGeometryCollection():
+        probe = face.pointOnSurface()
+        for fid in index.intersects(probe.boundingBox()):
+            if geoms[fid].contains(probe):
+                parts[fid].append(face)
+    return parts
+
+
+def _accepted(geom, new_geom):
+    if new_geom is None or new_geom.isEmpty() or not new_geom.isGeosValid():
+        return False
+    area = geom.area()
+    return area <= 0 or abs(new_geom.area() - area) / area <= MAX_AREA_CHANGE
+
+
+def simplify_features(features, tolerance=DEFAULT_TOLERANCE):
+    """Poenostavi poligone (zapise) z ohranjanjem skupnih mej. Vrne Result."""
+    result = Result()
+    items = [(f.id(), f.geometry()) for f in features if f.hasGeometry()]
+    if not items or tolerance <= 0:
+        return result
+    for _, geom in items:
+        instrument.count_geometry(geom)
+        result.before += _vertices(geom)
+
+    lines = _arcs([g for _, g in items])
+    simple = [_simplified(line, tolerance) for line in lines]
+    owners = _arc_owners(lines, items)
+    arcs_of = dict((fid, set()) for fid, _ in items)
+    for i, fids in enumerate(owners):
+        for fid in fids:
+            arcs_of[fid].add(i)
+
+    index = QgsSpatialIndex()
+    geoms = {}
+    for fid, geom in items:
+        feat = QgsFeature(fid)
+        feat.setGeometry(geom)
+        index.addFeature(feat)
+        geoms[fid] = geom
+
+    # izvirni ostanejo loki, ki se ne poenostavijo, in vsi loki neuspelih zapisov
+    frozen = set(i for i, line in enumerate(simple) if line is None)
+    failed = set()
+    while True:
+        out = [lines[i] if i in frozen else simple[i] for i in range(len(lines))]
+        crossing = _crossing(out, frozen)
+        if crossing:
+            frozen |= crossing
+            continue
+        parts = _faces(out, items, index, geoms)
+        new_geoms = {}
+        grown = False
+        for fid, geom in items:
+            new_geom = QgsGeometry.unaryUnion(parts[fid]) if parts[fid] else None
+            if _accepted(geom, new_geom):
+                new_geoms[fid] = new_geom
+                continue
+            failed.add(fid)
+            if not arcs_of[fid] <= frozen:
+                frozen |= arcs_of[fid]
+                grown = True
+        if not grown:
+            break
+
+    for fid, geom in items:
+        if fid in failed or fid not in new_geoms or arcs_of[fid] <= frozen:
+            # vsi loki izvirni: zapis ostane nespremenjen
+            if fid in failed:
+                result.kept.append(fid)
+            result.after += _vertices(geom)
+            continue
+        result.after += _vertices(new_geoms[fid])
+        result.edits.changed[fid] = new_geoms[fid]
+    return result
+
+
+def simplify_layer(layer, tolerance=DEFAULT_TOLERANCE):
+    return simplify_features(layer.getFeatures(core.geometry_request()), tolerance)
+
+
+def export_tolerance():
+    """Toleranca poenostavitve pred izvozom (0 = brez) iz nastavitev QGIS."""
+    try:
+        from qgis.core import QgsSettings
+        return float(QgsSettings().value(SETTINGS_EXPORT_TOLERANCE, 0.0))
+    except (TypeError, ValueError, ImportError):
+        return 0.0
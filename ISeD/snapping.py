@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – pripenjanje na parcele in stavbe med urejanjem grafike
+
+Ob začetku urejanja nastavi napredno pripenjanje projekta na urejani sloj
+ter na sloja parcel in stavb (oglišča in robovi). Indekse pripenjanja
+(QgsPointLocator) zgradi vnaprej v ozadju, omejeno na območje urejanja,
+in jih po premiku karte osveži z zamikom, da ostane pripenjanje tekoče.
+Indeks, ki že pokriva novo območje, se ne gradi znova. Ob koncu urejanja se
+povrne prejšnja nastavitev pripenjanja projekta.
+"""
+
+from qgis.core import (
+    QgsSnappingConfig, QgsSnappingUtils, QgsTolerance, QgsVectorLayer
+)
+from qgis.PyQt.QtCore import QTimer
+
+from . import core
+
+TOLERANCE_PX = 12
+EDIT_MARGIN = 50.0
+REFRESH_DELAY_MS = 300
+SOURCE_NAMES = ("parcele", "stavbe")
+
+
+def _vertex_and_segment():
+    if hasattr(QgsSnappingConfig, "VertexFlag"):
+        return QgsSnappingConfig.VertexFlag | QgsSnappingConfig.SegmentFlag
+    return QgsSnappingConfig.VertexAndSegment
+
+
+def snap_layers(project, edit_layer):
+    """Urejani sloj in sloji parcel/stavb, na katere se pripenjamo."""
+    layers = [edit_layer]
+    for name in SOURCE_NAMES:
+        lyr = core.find_layer(project, name_part=name)
+        if isinstance(lyr, QgsVectorLayer) and lyr not in layers:
+            layers.append(lyr)
+    return layers
+
+
+def configure(project, layers, tolerance=TOLERANCE_PX):
+    """Napredno pripenjanje samo na podane sloje. Vrne (prejšnja, nova) nastavitev."""
+    previous = QgsSnappingConfig(project.snappingConfig())
+    config = QgsSnappingConfig(previous)
+    config.setEnabled(True)
+    config.setMode(QgsSnappingConfig.AdvancedConfiguration)
+    config.setIntersectionSnapping(False)
+    snap_type = _vertex_and_segment()
+    for lyr in layers:
+        settings = QgsSnappingConfig.IndividualLayerSettings(
+            True, snap_type, tolerance, QgsTolerance.Pixels)
+        config.setIndividualLayerSettings(lyr, settings)
+    project.setSnappingConfig(config)
+    return previous, config
+
+
+def restore(project, previous, applied):
+    """Povrne prejšnjo nastavitev, če je uporabnik medtem ni spremenil."""
+    if previous is None:
+        return
+    if applied is not None and project.snappingConfig() != applied:
+        return
+    project.setSnappingConfig(previous)
+
+
+class SnapWarmer:
+    """Vnaprej gradi indekse pripenjanja za območje urejanja."""
+    def __init__(self, canvas, edit_layer, layers, project=None, configs=(None, None)):
+        self.canvas = canvas
+        self.edit_layer = edit_layer
+        self.layers = layers
+        self.project = project
+        self.previous, self.applied = configs
+        self._strategy = None
+        # id sloja -> obseg zadnje gradnje indeksa (v CRS sloja)
+        self._extents = {}
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(REFRESH_DELAY_MS)
+        self._timer.timeout.connect(self.warm)
+        self._active = False
+
+    def start(self):
+        utils = self.canvas.snappingUtils()
+        self._strategy = utils.indexingStrategy()
+        # indeks le za prikazano območje, ne za cel (WFS) sloj
+        utils.setIndexingStrategy(QgsSnappingUtils.IndexExtent)
+        self.canvas.extentsChanged.connect(self._timer.start)
+        self.edit_layer.editingStopped.connect(self.stop)
+        self._active = True
+        self.warm()
+
+    def stop(self):
+        if not self._active:
+            return
+        self._timer.stop()
+        for signal, slot in ((self.canvas.extentsChanged, self._timer.start),
+                             (self.edit_layer.editingStopped, self.stop)):
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        self._active = False
+        self._extents = {}
+        if self._strategy is not None:
+            self.canvas.snappingUtils().setIndexingStrategy(self._strategy)
+            self._strategy = None
+        if self.project is not None:
+            restore(self.project, self.previous, self.applied)
+
+    def edit_extent(self):
+        """Obseg karte, razširjen z obsegom urejanega sloja (v CRS karte)."""
+        extent = self.canvas.extent()
+        if self.edit_layer.featureCount() > 0:
+            layer_extent = self.edit_layer.extent()
+            crs = self.canvas.mapSettings().destinationCrs()
+            xform = core.transform_for(self.edit_layer.crs(), crs)
+            if xform is not None:
+                layer_extent = xform.transformBoundingBox(layer_extent)
+            layer_extent.grow(EDIT_MARGIN)
+            if extent.intersects(layer_extent):
+                extent.combineExtentWith(layer_extent)
+        return extent
+
+    def _covered(self, lyr, locator, rect):
+        """Ali obstoječi (ali gradeči se) indeks že pokriva območje."""
+        last = self._extents.get(lyr.id())
+        if last is None or not last.contains(rect):
+            return False
+        if locator.hasIndex():
+            return True
+        return hasattr(locator, "isIndexing") and locator.isIndexing()
+
+    def warm(self):
+        """Sproži gradnjo indeksov v ozadju (relaxed) za vse sloje pripenjanja."""
+        if not self._active:
+            return
+        utils = self.canvas.snappingUtils()
+        extent = self.edit_extent()
+        crs = self.canvas.mapSettings().destinationCrs()
+        for lyr in self.layers:
+            try:
+                locator = utils.locatorForLayer(lyr)
+                xform = core.transform_for(crs, lyr.crs())
+                rect = extent if xform is None else xform.transformBoundingBox(extent)
+                if self._covered(lyr, locator, rect):
+                    continue
+                locator.setExtent(rect)
+                locator.init(-1, True)
+                self._extents[lyr.id()] = rect
+            except Exception:
+                continue
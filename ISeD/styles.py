@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – predpomnilnik slogov (QML)
+
+Vsak QML se prebere in razčleni samo enkrat. Iz njega se zgradita predloga
+izrisovalnika (renderer) in oznak (labeling), ki se na sloje le klonirata.
+Predloga se zavrže, ko se spremeni čas spremembe (mtime) datoteke.
+"""
+
+import os
+
+from qgis.core import (
+    QgsMapLayer, QgsVectorLayer, QgsProject, QgsFeatureRenderer,
+    QgsAbstractVectorLayerLabeling, QgsReadWriteContext, QgsPainting,
+    QgsRuleBasedRenderer, QgsFillSymbol, QgsVectorSimplifyMethod
+)
+from qgis.PyQt.QtXml import QDomDocument
+
+RESOURCES_DIR = os.path.join(os.path.dirname(__file__), 'Resources')
+
+ISED_QML = 'ised.qml'
+OPN_QML = 'OPN_PNRP_OZN.qml'
+PARCELS_QML = 'parcele.qml'
+
+# pravila za paketno nastavljanje: (datoteka, polje v sloju, del imena sloja)
+STYLE_RULES = [
+    (OPN_QML, 'PNRP_OZN', None),
+    (ISED_QML, 'edit_type', None),
+    (PARCELS_QML, None, 'parcele'),
+]
+
+# OPN: atribut kategorij in merilo, do katerega se riše polna simbologija
+OPN_FIELD = 'PNRP_OZN'
+OPN_DETAIL_SCALE = 25000
+OPN_SIMPLIFY_TOLERANCE = 1.0
+
+_templates = {}
+_opn_scale_renderers = {}
+
+
+def resource_path(name):
+    return os.path.join(RESOURCES_DIR, name)
+
+
+class StyleTemplate:
+    """Razčlenjen QML z vnaprej zgrajenim izrisovalnikom in oznakami."""
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        self.doc = QDomDocument("qgis")
+        with open(path, 'rb') as f:
+            content = f.read()
+        parsed = self.doc.setContent(content)
+        ok = parsed[0] if isinstance(parsed, tuple) else bool(parsed)
+        if not ok:
+            raise ValueError("Neveljaven QML: " + path)
+        root = self.doc.documentElement()
+        context = QgsReadWriteContext()
+        self.renderer = None
+        renderer_el = root.firstChildElement("renderer-v2")
+        if not renderer_el.isNull():
+            self.renderer = QgsFeatureRenderer.load(renderer_el, context)
+        self.labeling = None
+        labeling_el = root.firstChildElement("labeling")
+        if not labeling_el.isNull():
+            self.labeling = QgsAbstractVectorLayerLabeling.create(labeling_el, context)
+        self.labels_enabled = root.attribute("labelsEnabled", "0") == "1"
+        self.opacity = self._child_value(root, "layerOpacity", float)
+        self.blend_mode = self._child_value(root, "blendMode", int)
+        self.feature_blend_mode = self._child_value(root, "featureBlendMode", int)
+
+    @staticmethod
+    def _child_value(root, tag, cast):
+        el = root.firstChildElement(tag)
+        if el.isNull():
+            return None
+        try:
+            return cast(el.text())
+        except ValueError:
+            return None
+
+    def is_stale(self):
+        try:
+            return os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return True
+
+    def _other_categories(self):
+        flags = int(QgsMapLayer.AllStyleCategories)
+        flags &= ~int(QgsMapLayer.Symbology)
+        flags &= ~int(QgsMapLayer.Labeling)
+        return QgsMapLayer.StyleCategories(flags)
+
+    def apply(self, layer):
+        """Uporabi slog na sloju. Vrne (ok, sporočilo)."""
+        if self.renderer is None or not isinstance(layer, QgsVectorLayer):
+            return _as_result(layer.importNamedStyle(self.doc))
+        try:
+            result = _as_result(layer.importNamedStyle(self.doc, self._other_categories()))
+        except TypeError:
+            return _as_result(layer.importNamedStyle(self.doc))
+        if not result[0]:
+            return result
+        layer.setRenderer(self.renderer.clone())
+        if self.labeling is not None:
+            layer.setLabeling(self.labeling.clone())
+            layer.setLabelsEnabled(self.labels_enabled)
+        if self.opacity is not None:
+            layer.setOpacity(self.opacity)
+        try:
+            if self.blend_mode is not None:
+                layer.setBlendMode(QgsPainting.getCompositionMode(QgsPainting.BlendMode(self.blend_mode)))
+            if self.feature_blend_mode is not None:
+                layer.setFeatureBlendMode(QgsPainting.getCompositionMode(QgsPainting.BlendMode(self.feature_blend_mode)))
+        except Exception:
+            pass
+        return True, ""
+
+
+def _as_result(result):
+    if isinstance(result, tuple):
+        ok = bool(result[0]) if len(result) >= 1 else False
+        msg = result[1] if len(result) >= 2 else ""
+        return ok, str(msg)
+    return bool(result), ""
+
+
+def get_template(path):
+    """Vrne predlogo za QML; ob spremembi datoteke jo zgradi znova."""
+    tpl = _templates.get(path)
+    if tpl is None or tpl.is_stale():
+        tpl = StyleTemplate(path)
+        _templates[path] = tpl
+    return tpl
+
+
+def apply_style(layer, name):
+    """Uporabi slog iz mape Resources. Vrne (ok, sporočilo)."""
+    path = resource_path(name)
+    if not os.path.exists(path):
+        return False, "Datoteka 'Resources/" + name + "' ni bila najdena."
+    try:
+        return get_template(path).apply(layer)
+    except Exception as e:
+        return False, str(e)
+
+
+def clear_cache():
+    _templates.clear()
+
+
+def matching_style(layer):
+    """Vrne ime QML, ki ustreza sloju po STYLE_RULES, ali None."""
+    if not isinstance(layer, QgsVectorLayer):
+        return None
+    field_names = set(layer.fields().names())
+    lname = layer.name().lower()
+    for qml, field, name_part in STYLE_RULES:
+        if field is not None and field in field_names:
+            return qml
+        if name_part is not None and name_part in lname:
+            return qml
+    return None
+
+
+def matching_layers():
+    """Vrne seznam (sloj, qml) za vse sloje v projektu, ki jim ustreza kateri slog."""
+    result = []
+    for lyr in QgsProject.instance().mapLayers().values():
+        qml = matching_style(lyr)
+        if qml is not None:
+            result.append((lyr, qml))
+    return result
+
+
+# ---------------- OPN: izris glede na merilo ----------------
+def _opn_group(value):
+    """Združena kategorija za oddaljen pogled (npr. SS, SK, SB -> S)."""
+    value = str(value)
+    return value[:1] if value else value
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _build_opn_scale_renderer(categorized, threshold):
+    root = QgsRuleBasedRenderer.Rule(None)
+    field = '"' + categorized.classAttribute() + '"'
+
+    # oddaljeno: enostavna polnila brez obrob, kategorije združene po prvi črki
+    far = QgsRuleBasedRenderer.Rule(None, threshold, 0, '', "Pregled (1:" + str(threshold) + " in manj)")
+    groups = {}
+    for cat in categorized.categories():
+        if not cat.renderState():
+            continue
+        key = _opn_group(cat.value())
+        entry = groups.setdefault(key, {'values': [], 'color': None})
+        entry['values'].append(cat.value())
+        if entry['color'] is None or str(cat.value()) == key:
+            entry['color'] = cat.symbol().color()
+    for key in sorted(groups):
+        entry = groups[key]
+        symbol = QgsFillSymbol.createSimple({
+            'color': entry['color'].name(),
+            'outline_style': 'no',
+        })
+        expr = field + " IN (" + ",".join(_quote(v) for v in entry['values']) + ")"
+        far.appendChild(QgsRuleBasedRenderer.Rule(symbol, 0, 0, expr, key))
+    root.appendChild(far)
+
+    # približano: polna simbologija iz OPN_PNRP_OZN.qml
+    near = QgsRuleBasedRenderer.Rule(None, 0, threshold, '', "Podrobno (nad 1:" + str(threshold) + ")")
+    for cat in categorized.categories():
+        if not cat.renderState():
+            continue
+        expr = field + " = " + _quote(cat.value())
+        near.appendChild(QgsRuleBasedRenderer.Rule(cat.symbol().clone(), 0, 0, expr, cat.label()))
+    root.appendChild(near)
+    return QgsRuleBasedRenderer(root)
+
+
+def opn_scale_renderer(threshold=OPN_DETAIL_SCALE):
+    """Pravilno-osnovan izrisovalnik z ravnmi po merilu, zgrajen iz predloge OPN."""
+    tpl = get_template(resource_path(OPN_QML))
+    key = (tpl.mtime, threshold)
+    renderer = _opn_scale_renderers.get(key)
+    if renderer is None:
+        if tpl.renderer is None or tpl.renderer.type() != 'categorizedSymbol':
+            return None
+        _opn_scale_renderers.clear()
+        renderer = _build_opn_scale_renderer(tpl.renderer, threshold)
+        _opn_scale_renderers[key] = renderer
+    return renderer
+
+
+def set_geometry_simplification(layer, enabled, tolerance=OPN_SIMPLIFY_TOLERANCE):
+    """Vklopi/izklopi sprotno poenostavljanje geometrij pri izrisu."""
+    method = QgsVectorSimplifyMethod()
+    if enabled:
+        method.setSimplifyHints(QgsVectorSimplifyMethod.GeometrySimplification)
+        method.setThreshold(tolerance)
+        method.setForceLocalOptimization(True)
+        method.setMaximumScale(1)
+    else:
+        method.setSimplifyHints(QgsVectorSimplifyMethod.NoSimplification)
+    layer.setSimplifyMethod(method)
+
+
+def apply_opn_style(layer, scale_dependent=False, simplify=False, threshold=OPN_DETAIL_SCALE):
+    """Uporabi OPN slog; po želji z ravnmi po merilu in poenostavljanjem geometrij."""
+    ok, msg = apply_style(layer, OPN_QML)
+    if not ok:
+        return ok, msg
+    if scale_dependent:
+        try:
+            renderer = opn_scale_renderer(threshold)
+        except Exception as e:
+            return False, str(e)
+        if renderer is None:
+            return False, "OPN_PNRP_OZN.qml nima kategoriziranega izrisovalnika."
+        layer.setRenderer(renderer.clone())
+    if simplify:
+        # sicer ostane način poenostavljanja, ki ga nastavi QML
+        set_geometry_simplification(layer, True)
+    return True, ""
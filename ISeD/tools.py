@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – register orodij
+
+Ena tabela opisuje vsa orodja (id, napis, ikona, metoda, zahtevan sloj,
+pogoj za omogočen gumb). Iz nje se zgradita dialog in dock; stanje gumbov
+se osveži ob menjavi aktivnega sloja, spremembi njegovih polj in ob spremembi
+izbora (aktivnega sloja ali slojev parcel in stavb).
+"""
+
+from qgis.core import QgsProject, QgsVectorLayer, QgsWkbTypes
+from qgis.PyQt.QtWidgets import (
+    QPushButton, QGroupBox, QHBoxLayout, QVBoxLayout, QLabel, QSizePolicy
+)
+
+# odvisnosti pogojev: ob kateri spremembi je treba stanje preveriti
+ON_LAYER = 'layer'
+ON_SELECTION = 'selection'
+ON_PROJECT = 'project'
+
+
+class ToolSpec:
+    """Opis enega orodja v panelu."""
+    def __init__(self, tool_id, label, icon, handler, group,
+                 layer_type=None, predicate=None, depends=(), hint=""):
+        self.tool_id = tool_id
+        self.label = label
+        self.icon = icon
+        self.handler = handler
+        self.group = group
+        self.layer_type = layer_type
+        self.predicate = predicate
+        self.depends = frozenset(depends) | (frozenset([ON_LAYER]) if layer_type else frozenset())
+        self.hint = hint
+
+
+# ---------------- Pogoji ----------------
+SOURCE_NAMES = ("parcele", "stavbe")
+
+
+def _has_selection(layer):
+    return layer.selectedFeatureCount() > 0
+
+
+def _has_one_selected(layer):
+    return layer.selectedFeatureCount() == 1
+
+
+def _has_edit_type(layer):
+    from . import core
+    return core.has_edit_type(layer)
+
+
+def _has_source_fields(layer):
+    from . import core
+    return layer.fields().indexOf(core.SOURCE_IDS_FIELD) >= 0
+
+
+def _lacks_edit_type(layer):
+    return not _has_edit_type(layer)
+
+
+def _can_copy_from(name_part):
+    def predicate(layer):
+        from . import core
+        src = core.find_layer(QgsProject.instance(), name_part=name_part)
+        if src is None or core.find_layer(QgsProject.instance(), exact=core.ISED_LAYER_NAME) is None:
+            return False
+        return isinstance(src, QgsVectorLayer) and src.selectedFeatureCount() > 0
+    return predicate
+
+
+def _can_report(layer):
+    from . import core
+    parcels = core.find_layer(QgsProject.instance(), name_part="parcele")
+    return parcels is not None and parcels.id() != layer.id()
+
+
+def _has_remote_layers(layer):
+    from .local_store import remote_layers
+    return len(remote_layers(QgsProject.instance())) > 0
+
+
+def _has_parcel_selection(layer):
+    from . import core
+    src = core.find_layer(QgsProject.instance(), name_part="parcele")
+    return isinstance(src, QgsVectorLayer) and src.selectedFeatureCount() > 0
+
+
+def _has_matching_layers(layer):
+    from .styles import matching_layers
+    return len(matching_layers()) > 0
+
+
+# ---------------- Skupine in orodja ----------------
+GROUP_LAYER = 'layer'
+GROUP_GURS = 'gurs'
+GROUP_IMPORT = 'import'
+GROUP_EDIT = 'edit'
+GROUP_SYM = 'sym'
+GROUP_EXPORT = 'export'
+GROUP_DIAG = 'diag'
+
+GROUP_TITLES = {
+    GROUP_LAYER: "Izdelava novega sloja ali dodajanje 'edit_type' obstoječemu",
+    GROUP_GURS: "GURS",
+    GROUP_IMPORT: None,
+    GROUP_EDIT: "Urejanje grafike",
+    GROUP_SYM: "Simbologija slojev",
+    GROUP_EXPORT: "Izvoz v SHP in ZIP",
+    GROUP_DIAG: "Diagnostika",
+}
+
+GROUP_HINTS = {
+    GROUP_EDIT: "Za uporabo spodnjih orodij morate imeti izbran sloj ISeD",
+}
+
+FLOW_GROUPS = (GROUP_EDIT,)
+
+TOOLS = [
+    ToolSpec('create', "Ustvari prazen sloj za ISeD", 'create',
+             'create_empty_ised_layer', GROUP_LAYER),
+    ToolSpec('add_field', "Dodaj polje 'edit_type' obstoječemu sloju", 'add_field',
+             'add_edit_type_field', GROUP_LAYER, 'vector', _lacks_edit_type,
+             hint="Aktivni sloj že ima polje 'edit_type'."),
+    ToolSpec('download', "Prenesi aktualne parcele GURS", 'download',
+             'download_parcels_from_gurs', GROUP_GURS),
+    ToolSpec('download_buildings', "Prenesi aktualne stavbe GURS", 'download_buildings',
+             'download_buildings_from_gurs', GROUP_GURS),
+    ToolSpec('freeze', "Shrani sloje GURS lokalno", 'download',
+             'freeze_gurs_layers', GROUP_GURS,
+             predicate=_has_remote_layers, depends=(ON_PROJECT,),
+             hint="V projektu ni slojev GURS WFS."),
+    ToolSpec('import', "Uvozi GURS podlage", 'import',
+             'import_from_wms', GROUP_IMPORT),
+    ToolSpec('select_area', "Izberi območje", 'select',
+             'activate_select_area_tool', GROUP_EDIT, 'vector'),
+    ToolSpec('neighbours', "Dodaj sosednje parcele", 'select',
+             'select_parcel_neighbours', GROUP_EDIT, None, _has_parcel_selection,
+             (ON_SELECTION, ON_PROJECT), hint="Ni označenih parcel."),
+    ToolSpec('grow', "Razširi izbor parcel za N obročev", 'select',
+             'grow_parcel_selection', GROUP_EDIT, None, _has_parcel_selection,
+             (ON_SELECTION, ON_PROJECT), hint="Ni označenih parcel."),
+    ToolSpec('enclosed', "Izberi parcele znotraj izbora", 'select',
+             'select_enclosed_parcels', GROUP_EDIT, None, _has_parcel_selection,
+             (ON_SELECTION, ON_PROJECT), hint="Ni označenih parcel."),
+    ToolSpec('copy', "Kopiraj izbrane parcele v sloj ISeD in jih združi", 'copy',
+             'copy_selected_parcels_to_ised', GROUP_EDIT, None, _can_copy_from("parcele"),
+             (ON_SELECTION, ON_PROJECT),
+             hint="Potrebna sta sloj ISeD in izbrane parcele."),
+    ToolSpec('copy_buildings', "Kopiraj izbrane stavbe v sloj ISeD", 'copy_buildings',
+             'copy_selected_buildings_to_ised', GROUP_EDIT, None, _can_copy_from("stavbe"),
+             (ON_SELECTION, ON_PROJECT),
+             hint="Potrebna sta sloj ISeD in izbrane stavbe."),
+    ToolSpec('clip', "Obreži vplivno območje s spomenikom", 'clip',
+             'clip_influence_area', GROUP_EDIT, 'polygon', _has_edit_type,
+             hint="Aktivni sloj nima polja 'edit_type'."),
+    ToolSpec('influence', "Ustvari vplivno območje po mejah parcel", 'buffer',
+             'generate_influence_area', GROUP_EDIT, 'polygon', _has_edit_type,
+             hint="Aktivni sloj nima polja 'edit_type'."),
+    ToolSpec('check_sources', "Preveri spremembe izvornih parcel", 'download',
+             'check_parcel_changes', GROUP_EDIT, 'polygon', _has_source_fields,
+             hint="Aktivni sloj nima podatkov o izvornih parcelah (vir_parc)."),
+    ToolSpec('edit', "Uredi grafiko", 'edit',
+             'start_edit_and_vertex_tool', GROUP_EDIT, 'vector'),
+    ToolSpec('select_vod', "Izberi cono VOD", 'select_vod',
+             'select_vod_zone', GROUP_EDIT, 'polygon'),
+    ToolSpec('clip_vod', "Obreži izbrano cono VOD", 'clip_vod',
+             'clip_selected_vod_zone', GROUP_EDIT, 'polygon', _has_one_selected, (ON_SELECTION,),
+             hint="Izberite natanko en poligon cone VOD."),
+    ToolSpec('buffer', "Dodaj buffer izbranemu poligonu v ISeD sloju", 'buffer',
+             'add_buffer', GROUP_EDIT, 'vector', _has_selection, (ON_SELECTION,),
+             hint="Ni označenih geometrij."),
+    ToolSpec('union', "Združi izbrane poligone parcel brez prenosa", 'union',
+             'union_selected_geometries', GROUP_EDIT, 'polygon', _has_selection, (ON_SELECTION,),
+             hint="Ni označenih geometrij."),
+    ToolSpec('sym', "Nastavi simbologijo ISeD", 'sym',
+             'apply_symbology', GROUP_SYM, 'vector'),
+    ToolSpec('sym_opn', "Nastavi simbologijo OPN_PNRP_OZN", 'sym_opn',
+             'apply_opn_symbology', GROUP_SYM, 'vector'),
+    ToolSpec('sym_all', "Nastavi simbologijo vsem ustreznim slojem", 'sym',
+             'apply_symbology_to_matching_layers', GROUP_SYM, None, _has_matching_layers, (ON_PROJECT,),
+             hint="V projektu ni slojev z ustrezno simbologijo."),
+    ToolSpec('qa', "Kontrola topologije", 'clip',
+             'check_topology', GROUP_EXPORT, 'polygon'),
+    ToolSpec('qa_fix', "Popravi drobce in neveljavne geometrije", 'clip',
+             'fix_topology', GROUP_EXPORT, 'polygon'),
+    ToolSpec('simplify', "Poenostavi oglišča (ohrani skupne meje)", 'edit',
+             'simplify_vertices', GROUP_EXPORT, 'polygon'),
+    ToolSpec('export', "Izvozi v shapefile + zip", 'export',
+             'export_to_shp_zip', GROUP_EXPORT, 'vector'),
+    ToolSpec('report', "Poročilo o parcelah (CSV/XLSX)", 'export',
+             'parcel_report', GROUP_EXPORT, 'polygon', _can_report,
+             (ON_PROJECT,), hint="Potrebna sta aktivni poligonski sloj in sloj parcel."),
+    ToolSpec('print', "Izriši liste spomenikov (PDF/PNG)", 'export',
+             'print_monument_sheets', GROUP_EXPORT, 'polygon', _has_edit_type,
+             hint="Aktivni sloj nima polja 'edit_type'."),
+    ToolSpec('metrics', "Dnevnik meritev orodij", 'edit',
+             'show_metrics_log', GROUP_DIAG),
+]
+
+
+def tools_in_group(group):
+    return [t for t in TOOLS if t.group == group]
+
+
+def tool_by_id(tool_id):
+    for t in TOOLS:
+        if t.tool_id == tool_id:
+            return t
+    return None
+
+
+def _layer_matches(layer, layer_type):
+    if layer_type is None:
+        return True
+    if not isinstance(layer, QgsVectorLayer):
+        return False
+    if layer_type == 'polygon':
+        return layer.geometryType() == QgsWkbTypes.PolygonGeometry
+    return True
+
+
+def is_enabled(spec, layer):
+    if not _layer_matches(layer, spec.layer_type):
+        return False
+    if spec.predicate is None:
+        return True
+    try:
+        return bool(spec.predicate(layer))
+    except Exception:
+        return False
+
+
+# ---------------- Panel ----------------
+class ToolPanel:
+    """Zgradi gumbe iz registra in skrbi za njihovo omogočenost."""
+    def __init__(self, plugin):
+        self.plugin = plugin
+        self._buttons = {}
+        self._watched = []
+        self._connected = False
+
+    def _make_button(self, spec):
+        btn = QPushButton(spec.label)
+        self.plugin._set_button_icon(btn, spec.icon)
+        btn.clicked.connect(lambda checked=False, s=spec: self.run(s))
+        self._buttons.setdefault(spec.tool_id, []).append(btn)
+        return btn
+
+    def run(self, spec):
+        """Zažene orodje z meritvijo časa, geometrij, omrežja in pomnilnika."""
+        from . import instrument
+        handler = getattr(self.plugin, spec.handler)
+        if spec.group == GROUP_DIAG:
+            return handler()
+        return instrument.run_tool(spec.tool_id, handler)
+
+    def group_widget(self, group):
+        """Vrne QGroupBox skupine (ali gumb, če skupina nima naslova)."""
+        specs = tools_in_group(group)
+        title = GROUP_TITLES.get(group)
+        if title is None:
+            btn = self._make_button(specs[0])
+            btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+            self._apply_state(specs[0], self._current_layer())
+            return btn
+        box = QGroupBox(title)
+        if group in FLOW_GROUPS:
+            from .MK import FlowLayout
+            outer = QVBoxLayout()
+            hint = GROUP_HINTS.get(group)
+            if hint:
+                label = QLabel(hint)
+                label.setWordWrap(True)
+                outer.addWidget(label)
+            inner = FlowLayout()
+            for spec in specs:
+                btn = self._make_button(spec)
+                btn.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+                inner.addWidget(btn)
+            outer.addLayout(inner)
+            box.setLayout(outer)
+        else:
+            row = QHBoxLayout()
+            for spec in specs:
+                row.addWidget(self._make_button(spec))
+            box.setLayout(row)
+        layer = self._current_layer()
+        for spec in specs:
+            self._apply_state(spec, layer)
+        return box
+
+    def _current_layer(self):
+        try:
+            return self.plugin.iface.activeLayer()
+        except Exception:
+            return None
+
+    def _apply_state(self, spec, layer):
+        enabled = is_enabled(spec, layer)
+        for btn in self._buttons.get(spec.tool_id, []):
+            if btn.isEnabled() != enabled:
+                btn.setEnabled(enabled)
+            btn.setToolTip("" if enabled else spec.hint)
+
+    def refresh(self, reasons=None):
+        """Preveri samo orodja, ki so odvisna od navedenih sprememb."""
+        layer = self._current_layer()
+        for spec in TOOLS:
+            if spec.tool_id not in self._buttons:
+                continue
+            if reasons is not None and not (spec.depends & frozenset(reasons)):
+                continue
+            self._apply_state(spec, layer)
+
+    # ---------------- Signali ----------------
+    def connect_signals(self):
+        if self._connected:
+            return
+        self.plugin.iface.currentLayerChanged.connect(self._on_layer_changed)
+        project = QgsProject.instance()
+        project.layersAdded.connect(self._on_project_changed)
+        project.layersRemoved.connect(self._on_project_changed)
+        self._connected = True
+        self._watch_layers(self._current_layer())
+
+    def disconnect_signals(self):
+        if not self._connected:
+            return
+        for signal, slot in (
+            (self.plugin.iface.currentLayerChanged, self._on_layer_changed),
+            (QgsProject.instance().layersAdded, self._on_project_changed),
+            (QgsProject.instance().layersRemoved, self._on_project_changed),
+        ):
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        self._unwatch()
+        self._connected = False
+
+    def _unwatch(self):
+        for signal, slot in self._watched:
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        self._watched = []
+
+    def _watch(self, signal, slot):
+        signal.connect(slot)
+        self._watched.append((signal, slot))
+
+    def _watch_layers(self, layer):
+        """Izbor in polja aktivnega sloja ter izbor slojev parcel in stavb."""
+        from . import core
+        self._unwatch()
+        if isinstance(layer, QgsVectorLayer):
+            self._watch(layer.selectionChanged, self._on_selection_changed)
+            self._watch(layer.updatedFields, self._on_fields_changed)
+        for name in SOURCE_NAMES:
+            src = core.find_layer(QgsProject.instance(), name_part=name)
+            if isinstance(src, QgsVectorLayer) and src is not layer:
+                self._watch(src.selectionChanged, self._on_selection_changed)
+
+    def _on_layer_changed(self, layer):
+        self._watch_layers(layer)
+        self.refresh((ON_LAYER, ON_SELECTION))
+
+    def _on_selection_changed(self, *args):
+        self.refresh((ON_SELECTION,))
+
+    def _on_fields_changed(self, *args):
+        # pogoji, ki berejo polja, so odvisni od sloja
+        self.refresh((ON_LAYER,))
+
+    def _on_project_changed(self, *args):
+        self._watch_layers(self._current_layer())
+        self.refresh((ON_PROJECT,))
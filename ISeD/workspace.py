@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+ISeD orodja – delovni sloj ISeD v GeoPackage z dnevnikom sprememb
+
+Namesto pomnilniškega sloja je delovni sloj lahko v GeoPackage (prostorski
+indeks, način WAL). Vsaka sprememba v urejevalnem medpomnilniku se v ozadju
+doda v tabelo ised_journal v isti datoteki (samo dodajanje). Ob shranitvi ali
+preklicu urejanja se zapiše oznaka; spremembe za zadnjo oznako po padcu
+QGIS ponovno uveljavimo v urejevalni medpomnilnik.
+"""
+
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+
+from qgis.core import (
+    QgsVectorLayer, QgsVectorFileWriter, QgsField, QgsFeature, QgsGeometry,
+    QgsCoordinateReferenceSystem
+)
+from qgis.PyQt.QtCore import QVariant
+
+from . import core
+
+TABLE = "ised"
+JOURNAL_TABLE = "ised_journal"
+
+OP_ADD = "add"
+OP_DELETE = "delete"
+OP_GEOMETRY = "geometry"
+OP_ATTRIBUTE = "attribute"
+OP_COMMIT = "commit"
+OP_ROLLBACK = "rollback"
+
+_JOURNAL_SQL = (
+    "CREATE TABLE IF NOT EXISTS " + JOURNAL_TABLE + " ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, op TEXT, fid INTEGER, "
+    "field TEXT, value TEXT, wkb BLOB)"
+)
+
+
+# ---------------- GeoPackage ----------------
+def _connect(path):
+    con = sqlite3.connect(path, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    return con
+
+
+def layer_path(layer):
+    """Pot do GeoPackage delovnega sloja ali None."""
+    if not isinstance(layer, QgsVectorLayer) or layer.providerType() != "ogr":
+        return None
+    path = layer.source().split("|")[0]
+    if not path.lower().endswith(".gpkg") or not os.path.exists(path):
+        return None
+    return path
+
+
+def is_workspace(layer):
+    path = layer_path(layer)
+    if path is None:
+        return False
+    try:
+        con = sqlite3.connect(path, timeout=5)
+        try:
+            row = con.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?",
+                              (JOURNAL_TABLE,)).fetchone()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        return False
+    return row is not None
+
+
+def create(path, name=core.ISED_LAYER_NAME, crs=core.ISED_CRS):
+    """Ustvari GeoPackage s praznim slojem ISeD, indeksom, WAL in dnevnikom."""
+    template = QgsVectorLayer("Polygon?crs=" + crs, name, "memory")
+    pr = template.dataProvider()
+    pr.addAttributes([QgsField(core.EDIT_TYPE_FIELD, QVariant.Int)]
+                     + [QgsField(n, QVariant.String) for n in core.INTERNAL_FIELDS])
+    template.updateFields()
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = TABLE
+    options.fileEncoding = "UTF-8"
+    options.layerOptions = ["SPATIAL_INDEX=YES"]
+    if os.path.exists(path):
+        options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+    if hasattr(QgsVectorFileWriter, "writeAsVectorFormatV2"):
+        from qgis.core import QgsProject
+        result = QgsVectorFileWriter.writeAsVectorFormatV2(
+            template, path, QgsProject.instance().transformContext(), options)
+    else:
+        result = QgsVectorFileWriter.writeAsVectorFormat(template, path, options)
+    error = result[0] if isinstance(result, tuple) else result
+    if error != QgsVectorFileWriter.NoError:
+        raise core.IsedError("Napaka pri ustvarjanju GeoPackage:\n" + str(result))
+    con = _connect(path)
+    try:
+        con.execute(_JOURNAL_SQL)
+        con.execute("DELETE FROM " + JOURNAL_TABLE)
+        con.commit()
+    finally:
+        con.close()
+    return open_layer(path, name)
+
+
+def open_layer(path, name=core.ISED_LAYER_NAME):
+    layer = QgsVectorLayer(path + "|layername=" + TABLE, name, "ogr")
+    if not layer.isValid():
+        raise core.IsedError("Delovni sloj ni veljaven: " + path)
+    if not layer.crs().isValid():
+        layer.setCrs(QgsCoordinateReferenceSystem(core.ISED_CRS))
+    return layer
+
+
+# ---------------- Dnevnik ----------------
+def _value_text(value):
+    if value is None or (hasattr(value, "isNull") and value.isNull()):
+        return None
+    try:
+        return json.dumps(value)
+    except TypeError:
+        return json.dumps(str(value))
+
+
+def pending(path):
+    """Zapisi dnevnika za zadnjo oznako shranitve/preklica (nepotrjene spremembe)."""
+    con = _connect(path)
+    try:
+        con.execute(_JOURNAL_SQL)
+        row = con.execute("SELECT MAX(id) FROM " + JOURNAL_TABLE + " WHERE op IN (?, ?)",
+                          (OP_COMMIT, OP_ROLLBACK)).fetchone()
+        last = row[0] or 0
+        return con.execute("SELECT op, fid, field, value, wkb FROM " + JOURNAL_TABLE
+                           + " WHERE id > ? ORDER BY id", (last,)).fetchall()
+    finally:
+        con.close()
+
+
+def compact(path):
+    """Odstrani zapise dnevnika do zadnje oznake (ko ni nepotrjenih sprememb)."""
+    con = _connect(path)
+    try:
+        row = con.execute("SELECT MAX(id) FROM " + JOURNAL_TABLE + " WHERE op IN (?, ?)",
+                          (OP_COMMIT, OP_ROLLBACK)).fetchone()
+        if row[0]:
+            con.execute("DELETE FROM " + JOURNAL_TABLE + " WHERE id < ?", (row[0],))
+            con.commit()
+    finally:
+        con.close()
+
+
+def replay(layer, records):
+    """Nepotrjene spremembe ponovno uveljavi v urejevalni medpomnilnik sloja."""
+    if not layer.isEditable():
+        layer.startEditing()
+    fids = {}
+    count = 0
+    for op, fid, field, value, wkb in records:
+        target = fids.get(fid, fid)
+        if op == OP_ADD:
+            feat = QgsFeature(layer.fields())
+            if wkb:
+                geom = QgsGeometry()
+                geom.fromWkb(bytes(wkb))
+                feat.setGeometry(geom)
+            for name, val in (json.loads(value) if value else {}).items():
+                if layer.fields().indexOf(name) >= 0:
+                    feat.setAttribute(name, val)
+            layer.addFeature(feat)
+            fids[fid] = feat.id()
+        elif op == OP_DELETE:
+            layer.deleteFeature(target)
+        elif op == OP_GEOMETRY:
+            geom = QgsGeometry()
+            geom.fromWkb(bytes(wkb))
+            layer.changeGeometry(target, geom)
+        elif op == OP_ATTRIBUTE:
+            idx = layer.fields().indexOf(field)
+            if idx >= 0:
+                layer.changeAttributeValue(target, idx, json.loads(value) if value else None)
+        else:
+            continue
+        count += 1
+    layer.triggerRepaint()
+    return count
+
+
+class Journal:
+    """Dnevnik sprememb sloja; zapisuje ga nit v ozadju (samo dodajanje)."""
+    def __init__(self, layer):
+        self.layer = layer
+        self.path = layer_path(layer)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="ised-journal", daemon=True)
+        self._connections = []
+
+    def start(self):
+        self._thread.start()
+        lyr = self.layer
+        for signal, slot in (
+            (lyr.featureAdded, self._on_added),
+            (lyr.featureDeleted, self._on_deleted),
+            (lyr.geometryChanged, self._on_geometry),
+            (lyr.attributeValueChanged, self._on_attribute),
+            (lyr.afterCommitChanges, self._on_commit),
+            (lyr.afterRollBack, self._on_rollback),
+        ):
+            signal.connect(slot)
+            self._connections.append((signal, slot))
+        return self
+
+    def stop(self):
+        for signal, slot in self._connections:
+            try:
+                signal.disconnect(slot)
+            except Exception:
+                pass
+        self._connections = []
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(5)
+
+    def checkpoint(self):
+        """Oznaka: starejši zapisi dnevnika ne veljajo več (npr. po obnovi)."""
+        self._put(OP_ROLLBACK)
+
+    # ---------------- signali (glavna nit) ----------------
+    def _put(self, op, fid=None, field=None, value=None, wkb=None):
+        self._queue.put((time.time(), op, fid, field, value, wkb))
+
+    def _on_added(self, fid):
+        feat = self.layer.getFeature(fid)
+        attrs = {}
+        for fld in self.layer.fields():
+            text = _value_text(feat[fld.name()])
+            if text is not None:
+                attrs[fld.name()] = json.loads(text)
+        wkb = bytes(feat.geometry().asWkb()) if feat.hasGeometry() else None
+        self._put(OP_ADD, fid, value=json.dumps(attrs), wkb=wkb)
+
+    def _on_deleted(self, fid):
+        self._put(OP_DELETE, fid)
+
+    def _on_geometry(self, fid, geom):
+        self._put(OP_GEOMETRY, fid, wkb=bytes(geom.asWkb()))
+
+    def _on_attribute(self, fid, idx, value):
+        self._put(OP_ATTRIBUTE, fid, self.layer.fields().at(idx).name(), _value_text(value))
+
+    def _on_commit(self):
+        self._put(OP_COMMIT)
+
+    def _on_rollback(self):
+        self._put(OP_ROLLBACK)
+
+    # ---------------- zapis (nit v ozadju) ----------------
+    def _writer(self):
+        con = _connect(self.path)
+        con.execute(_JOURNAL_SQL)
+        con.commit()
+        sql = ("INSERT INTO " + JOURNAL_TABLE + " (ts, op, fid, field, value, wkb) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+        try:
+            while True:
+                item = self._queue.get()
+                batch = []
+                stop = item is None
+                if item is not None:
+                    batch.append(item)
+                # izprazni vrsto in zapiši v eni transakciji
+                while not stop:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                    else:
+                        batch.append(item)
+                if batch:
+                    con.executemany(sql, batch)
+                    con.commit()
+                if stop:
+                    break
+        finally:
+            con.close()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Sintetični katastrski podatki za meritve (EPSG:3794).
+
+- grid: pravilna mreža kvadratnih parcel
+- irregular: zamaknjena mreža z zgoščenimi, skupnimi mejami (sosednje
+  parcele delijo ista vmesna vozlišča, kot pri GURS)
+
+Vsaka parcela ima atributa KO_ID in ST_PARCELE.
+"""
+
+import math
+import random
+
+from qgis.core import (
+    QgsVectorLayer, QgsFeature, QgsGeometry, QgsPointXY, QgsField
+)
+from qgis.PyQt.QtCore import QVariant
+
+ORIGIN_X = 460000.0
+ORIGIN_Y = 100000.0
+CELL = 20.0
+PARCELS_PER_KO = 5000
+BATCH = 20000
+
+
+def grid_shape(n):
+    cols = int(math.ceil(math.sqrt(n)))
+    rows = int(math.ceil(n / float(cols)))
+    return cols, rows
+
+
+def _parcel_layer(name):
+    layer = QgsVectorLayer("Polygon?crs=EPSG:3794", name, "memory")
+    layer.dataProvider().addAttributes([
+        QgsField("KO_ID", QVariant.Int),
+        QgsField("ST_PARCELE", QVariant.String),
+    ])
+    layer.updateFields()
+    return layer
+
+
+def _attributes(index):
+    ko = 1000 + index // PARCELS_PER_KO
+    return [ko, str(index % PARCELS_PER_KO + 1)]
+
+
+def _add_all(layer, features):
+    pr = layer.dataProvider()
+    batch = []
+    for f in features:
+        batch.append(f)
+        if len(batch) >= BATCH:
+            pr.addFeatures(batch)
+            batch = []
+    if batch:
+        pr.addFeatures(batch)
+    layer.updateExtents()
+    return layer
+
+
+def grid_parcels(n, name="parcele_grid"):
+    layer = _parcel_layer(name)
+    cols, rows = grid_shape(n)
+    fields = layer.fields()
+
+    def gen():
+        for i in range(n):
+            c, r = i % cols, i // cols
+            x0 = ORIGIN_X + c * CELL
+            y0 = ORIGIN_Y + r * CELL
+            f = QgsFeature(fields)
+            f.setGeometry(QgsGeometry.fromPolygonXY([[
+                QgsPointXY(x0, y0), QgsPointXY(x0 + CELL, y0),
+                QgsPointXY(x0 + CELL, y0 + CELL), QgsPointXY(x0, y0 + CELL),
+                QgsPointXY(x0, y0)]]))
+            f.setAttributes(_attributes(i))
+            yield f
+    return _add_all(layer, gen())
+
+
+def irregular_parcels(n, name="parcele_irregular", seed=3794, edge_points=(2, 12), jitter=0.3):
+    """Nepravilne parcele z gostimi skupnimi mejami."""
+    rnd = random.Random(seed)
+    layer = _parcel_layer(name)
+    cols, rows = grid_shape(n)
+    fields = layer.fields()
+    j = CELL * jitter
+
+    corners = {}
+
+    def corner(c, r):
+        key = (c, r)
+        pt = corners.get(key)
+        if pt is None:
+            on_edge = c in (0, cols) or r in (0, rows)
+            dx = 0.0 if on_edge else rnd.uniform(-j, j)
+            dy = 0.0 if on_edge else rnd.uniform(-j, j)
+            pt = (ORIGIN_X + c * CELL + dx, ORIGIN_Y + r * CELL + dy)
+            corners[key] = pt
+        return pt
+
+    edges = {}
+
+    def edge(a, b):
+        """Vmesna vozlišča med vogaloma a in b (enaka za obe sosednji parceli)."""
+        key = (a, b) if a <= b else (b, a)
+        row_edges = edges.setdefault(min(a[1], b[1]), {})
+        pts = row_edges.get(key)
+        if pts is None:
+            p0, p1 = corner(*key[0]), corner(*key[1])
+            k = rnd.randint(edge_points[0], edge_points[1])
+            pts = []
+            for t in range(1, k + 1):
+                u = t / float(k + 1)
+                wobble = rnd.uniform(-0.5, 0.5)
+                pts.append((p0[0] + (p1[0] - p0[0]) * u + wobble * (p1[1] - p0[1]) * 0.02,
+                            p0[1] + (p1[1] - p0[1]) * u - wobble * (p1[0] - p0[0]) * 0.02))
+            row_edges[key] = pts
+        return pts if (a <= b) else list(reversed(pts))
+
+    def ring(c, r):
+        cs = [(c, r), (c + 1, r), (c + 1, r + 1), (c, r + 1)]
+        pts = []
+        for k in range(4):
+            a, b = cs[k], cs[(k + 1) % 4]
+            pts.append(corner(*a))
+            pts.extend(edge(a, b))
+        pts.append(pts[0])
+        return [QgsPointXY(x, y) for x, y in pts]
+
+    def gen():
+        for i in range(n):
+            c, r = i % cols, i // cols
+            f = QgsFeature(fields)
+            f.setGeometry(QgsGeometry.fromPolygonXY([ring(c, r)]))
+            f.setAttributes(_attributes(i))
+            # vogali in robovi zaključene vrstice niso več potrebni
+            if c == cols - 1:
+                edges.pop(r, None)
+                for cc in range(cols + 1):
+                    corners.pop((cc, r), None)
+            yield f
+    return _add_all(layer, gen())
+
+
+def ised_layer(name="priprava_grafike_za_ISeD"):
+    layer = QgsVectorLayer("Polygon?crs=EPSG:3794", name, "memory")
+    layer.dataProvider().addAttributes([QgsField("edit_type", QVariant.Int)])
+    layer.updateFields()
+    return layer
+
+
+def ised_features(layer, geoms_with_types):
+    fields = layer.fields()
+    feats = []
+    for geom, edit_type in geoms_with_types:
+        f = QgsFeature(fields)
+        f.setGeometry(geom)
+        f.setAttributes([edit_type])
+        feats.append(f)
+    layer.dataProvider().addFeatures(feats)
+    layer.updateExtents()
+    return layer
+
+
+def block_ids(layer, n, count):
+    """ID-ji parcel v strnjenem kvadratnem bloku (približno count parcel)."""
+    cols, rows = grid_shape(n)
+    side = max(1, int(math.sqrt(count)))
+    c0 = max(0, cols // 2 - side // 2)
+    r0 = max(0, rows // 2 - side // 2)
+    wanted = set()
+    for r in range(r0, min(rows, r0 + side)):
+        for c in range(c0, min(cols, c0 + side)):
+            wanted.add(r * cols + c)
+    # ID-ji v pomnilniškem sloju so zaporedni od 1 naprej
+    return [i + 1 for i in sorted(wanted) if i < n]
@@ -0,0 +1,524 @@
+# -*- coding: utf-8 -*-
+"""
+Lokalni nadomestni strežnik za GURS WFS/WMS (brez QGIS, samo standardna knjižnica).
+
+Streže:
+- /wfs-si-gurs-kn/wfs  GetCapabilities, DescribeFeatureType in ostranjen
+  GetFeature (GML 3.2) za SI.GURS.KN:PARCELE in SI.GURS.KN:STAVBE_OBRIS;
+  FILTER podpira And/Or/Not, PropertyIsEqualTo in BBOX (kot ga pošljeta
+  izbor parcel po parih KO/parcela in preverjanje izvora)
+- /wms-si-gurs-dts/wms GetCapabilities (1.1.1) in GetMap (PNG ploščice)
+- /stats               števci zahtevkov in prenesenih bajtov (JSON)
+
+Zakasnitev, pasovna širina, delež napak in velikost strani so nastavljivi.
+Vtičnik usmerimo nanj s spremenljivkama okolja:
+
+    python benchmarks/gurs_mock.py --port 8765 --latency 150 --page-size 1000
+    ISED_GURS_WFS_URL=http://127.0.0.1:8765/wfs-si-gurs-kn/wfs
+    ISED_GURS_WMS_URL=http://127.0.0.1:8765/wms-si-gurs-dts/wms
+"""
+
+import sys
+import json
+import math
+import time
+import zlib
+import struct
+import random
+import argparse
+import threading
+import urllib.parse
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+NS = "SI.GURS.KN"
+NS_URI = "http://www.gu.gov.si/SI.GURS.KN"
+EPSG = 3794
+ORIGIN_X = 460000.0
+ORIGIN_Y = 100000.0
+CELL = 20.0
+
+WFS_PATH = "/wfs-si-gurs-kn/wfs"
+WMS_PATH = "/wms-si-gurs-dts/wms"
+
+FEATURE_TYPES = {
+    "PARCELE": [("KO_ID", "int"), ("ST_PARCELE", "string"), ("POVRSINA", "double")],
+    "STAVBE_OBRIS": [("KO_ID", "int"), ("ST_STAVBE", "string")],
+}
+
+WMS_LAYERS = [
+    ("SI.GURS.DTS:PODLAGA", "Podlaga (nadomestni strežnik)"),
+    ("SI.GURS.DTS:ORTOFOTO", "Ortofoto (nadomestni strežnik)"),
+]
+
+
+class Config:
+    def __init__(self, args):
+        self.latency = args.latency / 1000.0
+        self.jitter = args.jitter / 1000.0
+        self.bandwidth = args.bandwidth
+        self.error_rate = args.error_rate
+        self.page_size = args.page_size
+        self.parcels = args.parcels
+        self.cols = int(math.ceil(math.sqrt(args.parcels)))
+        self.rnd = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0, "by_request": {}}
+
+    def count(self, request, nbytes, error=False):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += nbytes
+            self.stats["by_request"][request] = self.stats["by_request"].get(request, 0) + 1
+            if error:
+                self.stats["errors"] += 1
+
+    def should_fail(self):
+        with self.lock:
+            return self.rnd.random() < self.error_rate
+
+    def delay(self):
+        with self.lock:
+            extra = self.rnd.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + extra
+
+
+# ---------------- Podatki ----------------
+def parcel_ring(i, cols):
+    c, r = i % cols, i // cols
+    x0 = ORIGIN_X + c * CELL
+    y0 = ORIGIN_Y + r * CELL
+    return [(x0, y0), (x0 + CELL, y0), (x0 + CELL, y0 + CELL), (x0, y0 + CELL), (x0, y0)]
+
+
+def building_ring(i, cols):
+    c, r = i % cols, i // cols
+    x0 = ORIGIN_X + c * CELL + CELL * 0.25
+    y0 = ORIGIN_Y + r * CELL + CELL * 0.25
+    s = CELL * 0.5
+    return [(x0, y0), (x0 + s, y0), (x0 + s, y0 + s), (x0, y0 + s), (x0, y0)]
+
+
+def feature_ids_in_bbox(cfg, bbox):
+    """Indeksi parcel, katerih celica seka BBOX (ali vse, če ga ni)."""
+    rows = int(math.ceil(cfg.parcels / float(cfg.cols)))
+    if bbox is None:
+        return range(cfg.parcels)
+    minx, miny, maxx, maxy = bbox
+    c0 = max(0, int((minx - ORIGIN_X) // CELL))
+    c1 = min(cfg.cols - 1, int((maxx - ORIGIN_X) // CELL))
+    r0 = max(0, int((miny - ORIGIN_Y) // CELL))
+    r1 = min(rows - 1, int((maxy - ORIGIN_Y) // CELL))
+    ids = []
+    for r in range(r0, r1 + 1):
+        for c in range(c0, c1 + 1):
+            i = r * cfg.cols + c
+            if i < cfg.parcels:
+                ids.append(i)
+    return ids
+
+
+def attributes(type_name, i):
+    ko = 1000 + i // 5000
+    if type_name == "PARCELE":
+        return [ko, str(i % 5000 + 1), CELL * CELL]
+    return [ko, str(i + 1)]
+
+
+# ---------------- WFS ----------------
+def wfs_capabilities(cfg, base_url):
+    ext = (ORIGIN_X, ORIGIN_Y, ORIGIN_X + cfg.cols * CELL, ORIGIN_Y + cfg.cols * CELL)
+    types = []
+    for name in FEATURE_TYPES:
+        types.append(
+            "<FeatureType><Name>%s:%s</Name><Title>%s</Title>"
+            "<DefaultCRS>urn:ogc:def:crs:EPSG::%d</DefaultCRS>"
+            "<ows:WGS84BoundingBox><ows:LowerCorner>13.3 45.4</ows:LowerCorner>"
+            "<ows:UpperCorner>16.6 46.9</ows:UpperCorner></ows:WGS84BoundingBox>"
+            "</FeatureType>" % (NS, name, name, EPSG))
+    ops = []
+    for op in ("GetCapabilities", "DescribeFeatureType", "GetFeature"):
+        ops.append(
+            '<ows:Operation name="%s"><ows:DCP><ows:HTTP><ows:Get xlink:href="%s?"/>'
+            '</ows:HTTP></ows:DCP></ows:Operation>' % (op, escape(base_url)))
+    ops.append(
+        '<ows:Constraint name="ImplementsResultPaging"><ows:NoValues/>'
+        '<ows:DefaultValue>TRUE</ows:DefaultValue></ows:Constraint>'
+        '<ows:Constraint name="CountDefault"><ows:NoValues/>'
+        '<ows:DefaultValue>%d</ows:DefaultValue></ows:Constraint>' % cfg.page_size)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<wfs:WFS_Capabilities version="2.0.0" xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+        'xmlns:ows="http://www.opengis.net/ows/1.1" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        'xmlns:fes="http://www.opengis.net/fes/2.0" xmlns="http://www.opengis.net/wfs/2.0">'
+        '<ows:ServiceIdentification><ows:Title>GURS KN (nadomestni)</ows:Title>'
+        '<ows:ServiceType>WFS</ows:ServiceType><ows:ServiceTypeVersion>2.0.0</ows:ServiceTypeVersion>'
+        '</ows:ServiceIdentification>'
+        '<ows:OperationsMetadata>%s</ows:OperationsMetadata>'
+        '<FeatureTypeList>%s</FeatureTypeList>'
+        '<fes:Filter_Capabilities><fes:Conformance>'
+        '<fes:Constraint name="ImplementsQuery"><ows:NoValues/><ows:DefaultValue>TRUE</ows:DefaultValue></fes:Constraint>'
+        '<fes:Constraint name="ImplementsAdHocQuery"><ows:NoValues/><ows:DefaultValue>TRUE</ows:DefaultValue></fes:Constraint>'
+        '<fes:Constraint name="ImplementsMinStandardFilter"><ows:NoValues/><ows:DefaultValue>TRUE</ows:DefaultValue></fes:Constraint>'
+        '<fes:Constraint name="ImplementsStandardFilter"><ows:NoValues/><ows:DefaultValue>TRUE</ows:DefaultValue></fes:Constraint>'
+        '<fes:Constraint name="ImplementsMinSpatialFilter"><ows:NoValues/><ows:DefaultValue>TRUE</ows:DefaultValue></fes:Constraint>'
+        '</fes:Conformance>'
+        '<fes:Scalar_Capabilities><fes:LogicalOperators/><fes:ComparisonOperators>'
+        '<fes:ComparisonOperator name="PropertyIsEqualTo"/></fes:ComparisonOperators>'
+        '</fes:Scalar_Capabilities>'
+        '<fes:Spatial_Capabilities><fes:GeometryOperands>'
+        '<fes:GeometryOperand name="gml:Envelope"/></fes:GeometryOperands>'
+        '<fes:SpatialOperators><fes:SpatialOperator name="BBOX"/></fes:SpatialOperators>'
+        '</fes:Spatial_Capabilities></fes:Filter_Capabilities>'
+        '</wfs:WFS_Capabilities>' % ("".join(ops), "".join(types))
+    ).encode("utf-8"), ext
+
+
+def wfs_describe(type_names):
+    elements = []
+    for full in type_names:
+        name = full.split(":")[-1]
+        fields = FEATURE_TYPES.get(name)
+        if fields is None:
+            continue
+        seq = "".join('<xsd:element name="%s" type="xsd:%s" minOccurs="0"/>' % (f, t) for f, t in fields)
+        seq += '<xsd:element name="GEOM" type="gml:SurfacePropertyType"/>'
+        elements.append(
+            '<xsd:complexType name="%sType"><xsd:complexContent>'
+            '<xsd:extension base="gml:AbstractFeatureType"><xsd:sequence>%s</xsd:sequence>'
+            '</xsd:extension></xsd:complexContent></xsd:complexType>'
+            '<xsd:element name="%s" type="%s:%sType" substitutionGroup="gml:AbstractFeature"/>'
+            % (name, seq, name, NS, name))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:gml="http://www.opengis.net/gml/3.2" '
+        'xmlns:%s="%s" targetNamespace="%s" elementFormDefault="qualified">'
+        '<xsd:import namespace="http://www.opengis.net/gml/3.2" '
+        'schemaLocation="http://schemas.opengis.net/gml/3.2.1/gml.xsd"/>%s</xsd:schema>'
+        % (NS, NS_URI, NS_URI, "".join(elements))
+    ).encode("utf-8")
+
+
+def parse_bbox(value):
+    if not value:
+        return None
+    parts = value.split(",")
+    try:
+        return tuple(float(p) for p in parts[:4])
+    except ValueError:
+        return None
+
+
+# ---------------- FILTER ----------------
+class FilterError(ValueError):
+    pass
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_filter(text):
+    """FES/OGC Filter v drevo: ('and'|'or', [..]), ('not', x), ('eq', polje, vrednost), ('bbox', (…))."""
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError as e:
+        raise FilterError("Neveljaven FILTER: " + str(e))
+    if _local(root.tag) != "Filter" or len(root) != 1:
+        raise FilterError("FILTER mora imeti en korenski operator.")
+    return _parse_node(root[0])
+
+
+def _parse_node(el):
+    name = _local(el.tag)
+    if name in ("And", "Or"):
+        return (name.lower(), [_parse_node(child) for child in el])
+    if name == "Not":
+        return ("not", _parse_node(el[0]))
+    if name == "PropertyIsEqualTo":
+        prop = value = None
+        for child in el:
+            kind = _local(child.tag)
+            if kind in ("ValueReference", "PropertyName"):
+                prop = (child.text or "").strip().split(":")[-1]
+            elif kind == "Literal":
+                value = (child.text or "").strip()
+        if prop is None or value is None:
+            raise FilterError("PropertyIsEqualTo potrebuje polje in vrednost.")
+        return ("eq", prop, value)
+    if name == "BBOX":
+        for env in el.iter():
+            if _local(env.tag) == "Envelope":
+                corners = {}
+                for corner in env:
+                    corners[_local(corner.tag)] = [float(v) for v in (corner.text or "").split()]
+                try:
+                    (x0, y0), (x1, y1) = corners["lowerCorner"], corners["upperCorner"]
+                except (KeyError, ValueError):
+                    break
+                return ("bbox", (x0, y0, x1, y1))
+        raise FilterError("BBOX potrebuje gml:Envelope.")
+    raise FilterError("Nepodprt operator: " + name)
+
+
+def _equal(attr, literal):
+    if str(attr) == literal:
+        return True
+    try:
+        return float(attr) == float(literal)
+    except (TypeError, ValueError):
+        return False
+
+
+def _matches(node, values, ring):
+    op = node[0]
+    if op == "and":
+        return all(_matches(n, values, ring) for n in node[1])
+    if op == "or":
+        return any(_matches(n, values, ring) for n in node[1])
+    if op == "not":
+        return not _matches(node[1], values, ring)
+    if op == "eq":
+        return node[1] in values and _equal(values[node[1]], node[2])
+    minx, miny, maxx, maxy = node[1]
+    xs = [x for x, _ in ring]
+    ys = [y for _, y in ring]
+    return min(xs) <= maxx and max(xs) >= minx and min(ys) <= maxy and max(ys) >= miny
+
+
+def _candidates(cfg, type_name, node):
+    """Množica indeksov, ki lahko ustrezajo, ali None (vsi)."""
+    op = node[0]
+    if op == "or":
+        parts = [_candidates(cfg, type_name, n) for n in node[1]]
+        if any(p is None for p in parts):
+            return None
+        return set().union(*parts)
+    if op == "and":
+        known = [c for c in (_candidates(cfg, type_name, n) for n in node[1]) if c is not None]
+        return min(known, key=len) if known else None
+    if op == "bbox":
+        return set(feature_ids_in_bbox(cfg, node[1]))
+    if op != "eq":
+        return None
+    try:
+        value = int(float(node[2]))
+    except ValueError:
+        return set()
+    if node[1] == "KO_ID":
+        start = (value - 1000) * 5000
+        return set(range(max(0, start), min(cfg.parcels, start + 5000)))
+    if node[1] == "ST_PARCELE" and type_name == "PARCELE":
+        return set(range(value - 1, cfg.parcels, 5000)) if value >= 1 else set()
+    if node[1] == "ST_STAVBE":
+        return {value - 1} if 1 <= value <= cfg.parcels else set()
+    return None
+
+
+def filtered_ids(cfg, type_name, node, bbox=None):
+    ids = _candidates(cfg, type_name, node)
+    if ids is None:
+        ids = range(cfg.parcels)
+    if bbox is not None:
+        ids = set(ids) & set(feature_ids_in_bbox(cfg, bbox))
+    names = [f for f, _ in FEATURE_TYPES[type_name]]
+    ring_fn = parcel_ring if type_name == "PARCELE" else building_ring
+    out = []
+    for i in sorted(ids):
+        values = dict(zip(names, attributes(type_name, i)))
+        if _matches(node, values, ring_fn(i, cfg.cols)):
+            out.append(i)
+    return out
+
+
+def wfs_get_feature(cfg, params):
+    type_name = (params.get("TYPENAMES") or params.get("TYPENAME") or "").split(":")[-1]
+    if type_name not in FEATURE_TYPES:
+        return None
+    start = int(params.get("STARTINDEX", "0") or 0)
+    count = int(params.get("COUNT") or params.get("MAXFEATURES") or cfg.page_size)
+    count = min(count, cfg.page_size)
+    if params.get("FILTER"):
+        ids = filtered_ids(cfg, type_name, parse_filter(params["FILTER"]), parse_bbox(params.get("BBOX")))
+    else:
+        ids = feature_ids_in_bbox(cfg, parse_bbox(params.get("BBOX")))
+    total = len(ids)
+    page = [] if (params.get("RESULTTYPE") or "").lower() == "hits" else list(ids[start:start + count])
+    ring_fn = parcel_ring if type_name == "PARCELE" else building_ring
+    fields = FEATURE_TYPES[type_name]
+    members = []
+    for i in page:
+        attrs = "".join("<%s:%s>%s</%s:%s>" % (NS, f, escape(str(v)), NS, f)
+                        for (f, _), v in zip(fields, attributes(type_name, i)))
+        pos = " ".join("%.3f %.3f" % xy for xy in ring_fn(i, cfg.cols))
+        members.append(
+            '<wfs:member><%s:%s gml:id="%s.%d">%s<%s:GEOM>'
+            '<gml:Polygon gml:id="%s.%d.g" srsName="urn:ogc:def:crs:EPSG::%d">'
+            '<gml:exterior><gml:LinearRing><gml:posList>%s</gml:posList></gml:LinearRing>'
+            '</gml:exterior></gml:Polygon></%s:GEOM></%s:%s></wfs:member>'
+            % (NS, type_name, type_name, i + 1, attrs, NS, type_name, i + 1, EPSG, pos, NS, NS, type_name))
+    body = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+        'xmlns:gml="http://www.opengis.net/gml/3.2" xmlns:%s="%s" '
+        'numberMatched="%d" numberReturned="%d" timeStamp="%s">%s</wfs:FeatureCollection>'
+        % (NS, NS_URI, total, len(page), time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "".join(members)))
+    return body.encode("utf-8")
+
+
+# ---------------- WMS ----------------
+def wms_capabilities(base_url):
+    layers = "".join(
+        "<Layer queryable=\"0\"><Name>%s</Name><Title>%s</Title><SRS>EPSG:%d</SRS></Layer>"
+        % (escape(n), escape(t), EPSG) for n, t in WMS_LAYERS)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<WMT_MS_Capabilities version="1.1.1"><Service><Name>OGC:WMS</Name>'
+        '<Title>GURS DTS (nadomestni)</Title></Service><Capability><Request>'
+        '<GetCapabilities><Format>application/vnd.ogc.wms_xml</Format></GetCapabilities>'
+        '<GetMap><Format>image/png</Format><DCPType><HTTP><Get>'
+        '<OnlineResource xmlns:xlink="http://www.w3.org/1999/xlink" xlink:href="%s?"/>'
+        '</Get></HTTP></DCPType></GetMap></Request>'
+        '<Layer><Title>GURS</Title><SRS>EPSG:%d</SRS>%s</Layer></Capability></WMT_MS_Capabilities>'
+        % (escape(base_url), EPSG, layers)
+    ).encode("utf-8")
+
+
+def png_tile(width, height, rgb):
+    """Enobarvna PNG ploščica (brez zunanjih knjižnic)."""
+    row = b"\x00" + bytes(rgb) * width
+    raw = row * height
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data +
+                struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff))
+    return (b"\x89PNG\r\n\x1a\n" +
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(raw, 6)) +
+            chunk(b"IEND", b""))
+
+
+# ---------------- HTTP ----------------
+def make_handler(cfg):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status, ctype, body, request):
+            time.sleep(cfg.delay())
+            self.send_response(status)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if cfg.bandwidth > 0:
+                chunk = max(1024, int(cfg.bandwidth / 20))
+                for i in range(0, len(body), chunk):
+                    self.wfile.write(body[i:i + chunk])
+                    time.sleep(len(body[i:i + chunk]) / float(cfg.bandwidth))
+            else:
+                self.wfile.write(body)
+            cfg.count(request, len(body), error=status >= 400)
+
+        def _exception(self, request, text, status=400):
+            body = ('<?xml version="1.0" encoding="UTF-8"?><ows:ExceptionReport '
+                    'xmlns:ows="http://www.opengis.net/ows/1.1" version="2.0.0">'
+                    '<ows:Exception exceptionCode="InvalidParameterValue"><ows:ExceptionText>%s'
+                    '</ows:ExceptionText></ows:Exception></ows:ExceptionReport>' % escape(text)).encode("utf-8")
+            self._send(status, "application/xml", body, request)
+
+        def do_GET(self):
+            parsed = urllib.parse.urlsplit(self.path)
+            params = {k.upper(): v[-1] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+            request = params.get("REQUEST", "")
+            base_url = "http://%s%s" % (self.headers.get("Host", "127.0.0.1"), parsed.path)
+
+            if parsed.path == "/stats":
+                with cfg.lock:
+                    body = json.dumps(cfg.stats).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            if parsed.path not in (WFS_PATH, WMS_PATH):
+                self._send(404, "text/plain", b"not found", "404")
+                return
+            if request != "GetCapabilities" and cfg.should_fail():
+                self._send(503, "text/plain", b"Service temporarily unavailable", request or "error")
+                return
+
+            if parsed.path == WFS_PATH:
+                if request == "GetCapabilities":
+                    body, _ = wfs_capabilities(cfg, base_url)
+                    self._send(200, "application/xml", body, request)
+                elif request == "DescribeFeatureType":
+                    names = (params.get("TYPENAMES") or params.get("TYPENAME") or
+                             ",".join(NS + ":" + n for n in FEATURE_TYPES)).split(",")
+                    self._send(200, "application/xml", wfs_describe(names), request)
+                elif request == "GetFeature":
+                    try:
+                        body = wfs_get_feature(cfg, params)
+                    except FilterError as e:
+                        self._exception(request, str(e))
+                        return
+                    if body is None:
+                        self._exception(request, "Neznan tip: " + str(params.get("TYPENAMES")))
+                    else:
+                        self._send(200, "application/gml+xml; version=3.2", body, request)
+                else:
+                    self._exception(request, "Nepodprt zahtevek: " + request)
+                return
+
+            if request == "GetCapabilities":
+                self._send(200, "application/vnd.ogc.wms_xml", wms_capabilities(base_url), request)
+            elif request == "GetMap":
+                try:
+                    w = min(4096, int(params.get("WIDTH", "256")))
+                    h = min(4096, int(params.get("HEIGHT", "256")))
+                except ValueError:
+                    w = h = 256
+                self._send(200, "image/png", png_tile(w, h, (230, 225, 210)), request)
+            else:
+                self._exception(request, "Nepodprt zahtevek: " + request)
+
+    return Handler
+
+
+def serve(args):
+    cfg = Config(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cfg))
+    server.daemon_threads = True
+    return server, cfg
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nadomestni GURS WFS/WMS strežnik")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="zakasnitev v ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="naključni dodatek zakasnitve v ms")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bajtov/s (0 = brez omejitve)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="delež odgovorov 503 (0..1)")
+    parser.add_argument("--page-size", type=int, default=1000, help="največ geometrij na stran")
+    parser.add_argument("--parcels", type=int, default=100000, help="število parcel v mreži")
+    parser.add_argument("--seed", type=int, default=3794)
+    args = parser.parse_args(argv)
+    server, _ = serve(args)
+    host, port = server.server_address[:2]
+    print("GURS nadomestni strežnik: http://%s:%d%s in %s" % (host, port, WFS_PATH, WMS_PATH))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Zagon orodij MK brez GUI za meritve.
+
+Vtičnik se naloži z nadomestnim iface (aktivni sloj, karta) in tihimi
+dialogi, ki vrnejo vnaprej nastavljene odgovore.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_app = None
+
+
+def start_qgis():
+    """Zažene QgsApplication brez zaslona (offscreen)."""
+    global _app
+    if _app is not None:
+        return _app
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from qgis.core import QgsApplication
+    _app = QgsApplication([], False)
+    _app.initQgis()
+    return _app
+
+
+def stop_qgis():
+    global _app
+    if _app is not None:
+        _app.exitQgis()
+        _app = None
+
+
+class Answers:
+    """Odgovori tihih dialogov."""
+    buffer_distance = 10.0
+    item_index = 0
+    integer = 1
+    save_path = None
+    # odgovor na vprašanja Da/Ne (npr. izvoz kljub napakam topologije)
+    confirm = True
+
+
+class _SilentMessageBox:
+    # vrednosti QMessageBox.StandardButton
+    Yes = 0x00004000
+    No = 0x00010000
+    Ok = 0x00000400
+    Cancel = 0x00400000
+
+    @staticmethod
+    def information(*args, **kwargs):
+        return _SilentMessageBox.Ok
+
+    warning = information
+    critical = information
+
+    @staticmethod
+    def question(*args, **kwargs):
+        return _SilentMessageBox.Yes if Answers.confirm else _SilentMessageBox.No
+
+
+class _SilentInputDialog:
+    @staticmethod
+    def getDouble(*args, **kwargs):
+        return Answers.buffer_distance, True
+
+    @staticmethod
+    def getInt(*args, **kwargs):
+        return Answers.integer, True
+
+    @staticmethod
+    def getItem(parent, title, label, items, *args, **kwargs):
+        return items[Answers.item_index], True
+
+
+class _SilentFileDialog:
+    @staticmethod
+    def getSaveFileName(*args, **kwargs):
+        return Answers.save_path, ""
+
+    @staticmethod
+    def getExistingDirectory(*args, **kwargs):
+        return os.path.dirname(Answers.save_path or "")
+
+
+class _MessageBar:
+    def pushMessage(self, *args, **kwargs):
+        pass
+
+    pushInfo = pushMessage
+    pushWarning = pushMessage
+    pushCritical = pushMessage
+    pushSuccess = pushMessage
+
+
+class _Canvas:
+    def __init__(self):
+        self._scale = 5000.0
+
+    def scale(self):
+        return self._scale
+
+    def refresh(self):
+        pass
+
+
+class FakeIface:
+    """Najmanjši iface, ki ga potrebujejo orodja MK."""
+    def __init__(self):
+        self._layer = None
+        self._canvas = _Canvas()
+        self._bar = _MessageBar()
+
+    def setActiveLayer(self, layer):
+        self._layer = layer
+
+    def activeLayer(self):
+        return self._layer
+
+    def mapCanvas(self):
+        return self._canvas
+
+    def mainWindow(self):
+        return None
+
+    def messageBar(self):
+        return self._bar
+
+    def showAttributeTable(self, layer, *args):
+        pass
+
+
+def load_plugin():
+    """Vrne (plugin, iface) z utišanimi dialogi."""
+    start_qgis()
+    from ISeD import MK as mk_module
+    mk_module.QMessageBox = _SilentMessageBox
+    mk_module.QInputDialog = _SilentInputDialog
+    mk_module.QFileDialog = _SilentFileDialog
+    fake = FakeIface()
+    mk_module.iface = fake
+    return mk_module.MK(fake), fake
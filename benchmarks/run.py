@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Meritve zmogljivosti orodij ISeD (QGIS brez zaslona).
+
+Primeri:
+    python benchmarks/run.py --sizes 10000,100000 --out rezultati.json
+    python benchmarks/run.py --sizes 1000000 --datasets irregular
+    python benchmarks/run.py --compare stari.json --out novi.json
+
+Pri --compare se izpiše razmerje časov; izhodna koda je 1, če je katera
+meritev počasnejša od praga (--threshold, privzeto 1.2).
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+BENCHMARKS = [
+    'union_selected_geometries',
+    'add_buffer',
+    'clip_selected_vod_zone',
+    'clip_influence_area',
+    '_select_parcels_by_pairs',
+    'export_shp_zip',
+    'qa_check_layer',
+]
+
+SELECTION_SHARE = 0.01
+SELECTION_MAX = 5000
+
+
+def _timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        prepare = fn()
+        t0 = time.perf_counter()
+        prepare()
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+def _copy_layer(layer, name):
+    from qgis.core import QgsFeatureRequest
+    clone = layer.materialize(QgsFeatureRequest())
+    clone.setName(name)
+    return clone
+
+
+def bench_cases(plugin, iface, parcels, n, tmp_dir):
+    """Vrne {ime: funkcija}; funkcija pripravi podatke in vrne klic za merjenje."""
+    from qgis.core import QgsProject, QgsGeometry, QgsFeature
+    import datasets
+    selection = datasets.block_ids(parcels, n, min(SELECTION_MAX, max(4, int(n * SELECTION_SHARE))))
+
+    def union():
+        layer = _copy_layer(parcels, "union")
+        layer.selectByIds(selection)
+        iface.setActiveLayer(layer)
+        return plugin.union_selected_geometries
+
+    def buffer():
+        layer = _copy_layer(parcels, "buffer")
+        layer.selectByIds(selection)
+        iface.setActiveLayer(layer)
+        return plugin.add_buffer
+
+    def clip_vod():
+        # cona VOD prekriva izbrani blok, ostale parcele se obrežejo
+        layer = _copy_layer(parcels, "vod")
+        geom = QgsGeometry.unaryUnion([layer.getFeature(fid).geometry() for fid in selection])
+        f = QgsFeature(layer.fields())
+        f.setGeometry(geom)
+        layer.dataProvider().addFeatures([f])
+        layer.selectByIds([max(layer.allFeatureIds())])
+        iface.setActiveLayer(layer)
+        return plugin.clip_selected_vod_zone
+
+    def clip_influence():
+        geom = QgsGeometry.unaryUnion([parcels.getFeature(fid).geometry() for fid in selection])
+        layer = datasets.ised_features(datasets.ised_layer(), [
+            (geom, 1), (geom.buffer(50.0, 8), 3)])
+        iface.setActiveLayer(layer)
+        return plugin.clip_influence_area
+
+    def select_pairs():
+        ko_idx = parcels.fields().indexOf("KO_ID")
+        parc_idx = parcels.fields().indexOf("ST_PARCELE")
+        pairs = []
+        for fid in selection:
+            f = parcels.getFeature(fid)
+            pairs.append((f.attribute(ko_idx), f.attribute(parc_idx)))
+        return lambda: plugin._select_parcels_by_pairs(parcels, "KO_ID", "ST_PARCELE", pairs)
+
+    def export():
+        # samo zapis in ZIP; kontrola topologije se meri posebej
+        from ISeD import core
+        path = os.path.join(tmp_dir, "izvoz_%d.shp" % n)
+        return lambda: core.export_shp_zip(parcels, path)
+
+    def qa_check():
+        # neveljaven poligon (metuljček) čez prvo parcelo: kontrola ga mora javiti, ne pasti
+        from ISeD import qa
+        layer = _copy_layer(parcels, "qa")
+        box = layer.getFeature(1).geometry().boundingBox()
+        bowtie = QgsGeometry.fromWkt("POLYGON((%f %f, %f %f, %f %f, %f %f, %f %f))" % (
+            box.xMinimum(), box.yMinimum(), box.xMaximum(), box.yMaximum(),
+            box.xMaximum(), box.yMinimum(), box.xMinimum(), box.yMaximum(),
+            box.xMinimum(), box.yMinimum()))
+        feat = QgsFeature(layer.fields())
+        feat.setGeometry(bowtie)
+        layer.dataProvider().addFeatures([feat])
+
+        def check():
+            issues = qa.check_layer(layer)
+            if not any(i.kind == qa.ERR_INVALID for i in issues):
+                raise AssertionError("kontrola ni javila neveljavne geometrije")
+        return check
+
+    QgsProject.instance().addMapLayer(parcels, False)
+    return {
+        'union_selected_geometries': union,
+        'add_buffer': buffer,
+        'clip_selected_vod_zone': clip_vod,
+        'clip_influence_area': clip_influence,
+        '_select_parcels_by_pairs': select_pairs,
+        'export_shp_zip': export,
+        'qa_check_layer': qa_check,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=harness.ROOT,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run(sizes, dataset_names, benchmarks, repeat):
+    from qgis.core import Qgis, QgsProject
+    import datasets
+    plugin, iface = harness.load_plugin()
+    makers = {'grid': datasets.grid_parcels, 'irregular': datasets.irregular_parcels}
+    results = []
+    tmp_dir = tempfile.mkdtemp(prefix='ised_bench_')
+    try:
+        for ds in dataset_names:
+            for n in sizes:
+                t0 = time.perf_counter()
+                parcels = makers[ds](n)
+                build = time.perf_counter() - t0
+                print("%s n=%d: podatki %.2f s" % (ds, n, build))
+                cases = bench_cases(plugin, iface, parcels, n, tmp_dir)
+                for name in benchmarks:
+                    runs = _timed(cases[name], repeat)
+                    results.append({
+                        'benchmark': name,
+                        'dataset': ds,
+                        'size': n,
+                        'best_s': round(min(runs), 5),
+                        'runs_s': [round(r, 5) for r in runs],
+                    })
+                    print("  %-28s %.4f s" % (name, min(runs)))
+                QgsProject.instance().removeAllMapLayers()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git': _git_revision(),
+            'qgis': Qgis.QGIS_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(old, new, threshold):
+    """Izpiše razmerja časov. Vrne seznam počasnejših meritev."""
+    index = {(r['benchmark'], r['dataset'], r['size']): r for r in old['results']}
+    slower = []
+    for r in new['results']:
+        key = (r['benchmark'], r['dataset'], r['size'])
+        prev = index.get(key)
+        if prev is None or prev['best_s'] <= 0:
+            continue
+        ratio = r['best_s'] / prev['best_s']
+        mark = "  POČASNEJE" if ratio > threshold else ""
+        print("%-28s %-9s %8d  %.4f -> %.4f s  x%.2f%s" % (
+            key[0], key[1], key[2], prev['best_s'], r['best_s'], ratio, mark))
+        if ratio > threshold:
+            slower.append(key)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Meritve orodij ISeD")
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--datasets', default='grid,irregular')
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', default=None)
+    parser.add_argument('--compare', default=None)
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    names = [s.strip() for s in args.datasets.split(',') if s.strip()]
+    benchmarks = [s.strip() for s in args.benchmarks.split(',') if s.strip()]
+
+    harness.start_qgis()
+    try:
+        result = run(sizes, names, benchmarks, args.repeat)
+    finally:
+        harness.stop_qgis()
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        if compare(old, result, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())